@@ -1,14 +1,52 @@
 import frappe 
 from frappe import _
+from frappe.utils import flt
 import json
 
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+    RoomStatusConflict,
+    transition_status,
+)
+from havano_hotel_management.instrumentation import instrument
+
+CHARGE_KEY_FIELD = "custom_hotel_charge_key"
+
+
 def validate_check_in(doc, method):
     if frappe.db.exists("Check In", {"reservation": doc.reservation}):
         frappe.throw(_("Check In already exists for this reservation."))
 
 
+def get_charge_key(source_doctype, source_name, purpose):
+    return f"{source_doctype}::{source_name}::{purpose}"
+
+
+def get_existing_charge_invoice(source_doctype, source_name, purpose):
+    """
+    Lock the source document row and return the invoice already posted for
+    this (source doctype, name, purpose), if any.
+
+    Both reads are locking reads, so a concurrent request for the same charge
+    waits for the first one to commit and then sees its invoice.
+    """
+    frappe.db.get_value(source_doctype, source_name, "name", for_update=True)
+    return frappe.db.get_value(
+        "Sales Invoice",
+        {CHARGE_KEY_FIELD: get_charge_key(source_doctype, source_name, purpose), "docstatus": ["<", 2]},
+        "name",
+        for_update=True,
+    )
+
+
+def release_charge_key(doc, method=None):
+    """Free the charge key of a cancelled invoice so the charge can be posted again."""
+    if doc.get(CHARGE_KEY_FIELD):
+        frappe.db.set_value("Sales Invoice", doc.name, CHARGE_KEY_FIELD, None, update_modified=False)
+
+
 @frappe.whitelist()
-def create_sales_invoice(doc, method=None, charge=0):
+@instrument
+def create_sales_invoice(doc, method=None, charge=0, purpose="Room Charge"):
     try:
         # If doc is a string (when called via whitelist), convert to JSON
         if isinstance(doc, str):
@@ -17,12 +55,27 @@ def create_sales_invoice(doc, method=None, charge=0):
         else:
             doc_name = doc.name
 
+        existing_invoice = get_existing_charge_invoice("Check In", doc_name, purpose)
+        if existing_invoice:
+            return {
+                "sales_invoice": existing_invoice,
+                "existing": True,
+                "refresh": True
+            }
+
         charge = float(charge) if charge else 0
         amount = 0
         if charge > 0:
             amount = charge
         else:
             amount = doc.total_charge
+
+        # Claim the room before invoicing; a room another stay got first is a conflict, not an overwrite
+        transition_status(
+            "Room", doc.room, "Occupied", holder=doc_name,
+            values={"current_guest": doc.guest_name, "checkout_date": doc.check_out_date},
+        )
+
         # Get room details
         room = frappe.get_doc("Room", doc.room)
         
@@ -41,6 +94,7 @@ def create_sales_invoice(doc, method=None, charge=0):
         si.due_date = doc.check_out_date
         si.company = company
         si.debit_to = debit_to
+        si.set(CHARGE_KEY_FIELD, get_charge_key("Check In", doc_name, purpose))
         
         # Add item
         si.append("items", {
@@ -60,13 +114,6 @@ def create_sales_invoice(doc, method=None, charge=0):
         # Save and submit the invoice
         si.insert(ignore_permissions=True)
         si.submit()
-        
-        # Update room status
-        frappe.db.set_value("Room", doc.room, "status", "Occupied")
-        frappe.db.set_value("Room", doc.room, "current_checkin", doc.name)
-
-        frappe.db.set_value("Room", doc.room, "current_guest", doc.guest_name)
-        frappe.db.set_value("Room", doc.room, "checkout_date", doc.check_out_date)
 
         frappe.db.set_value("Check In", doc_name, "sales_invoice_number", si.name)
 
@@ -80,8 +127,6 @@ def create_sales_invoice(doc, method=None, charge=0):
         # })
         # check_in_doc.save(ignore_permissions=True)
 
-        frappe.db.commit()
-        
         frappe.msgprint(_("Sales Invoice {0} created and room status updated to Occupied").format(
             frappe.bold(si.name)
         ))
@@ -90,12 +135,15 @@ def create_sales_invoice(doc, method=None, charge=0):
             "sales_invoice": si.name,
             "refresh": True
         }   
+    except RoomStatusConflict:
+        raise
     except Exception as e:
         frappe.log_error(message=str(e), title="Error Creating Sales Invoice")
         frappe.throw(_("An error occurred while creating the Sales Invoice: {0}").format(str(e)))
 
 @frappe.whitelist()
-def create_additional_sales_invoice_with_items(doc, method=None, charge=0):
+@instrument
+def create_additional_sales_invoice_with_items(doc, method=None, charge=0, purpose=None):
     try:
         # If doc is a string (when called via whitelist), convert to JSON
         if isinstance(doc, str):
@@ -104,14 +152,34 @@ def create_additional_sales_invoice_with_items(doc, method=None, charge=0):
         else:
             doc_name = doc.name
 
+        # Retries of the same extension carry the same purpose and get the same invoice back
+        purpose = purpose or "Room Extension to {0}".format(doc.get("check_out_date"))
+        existing_invoice = get_existing_charge_invoice("Check In", doc_name, purpose)
+        if existing_invoice:
+            return {
+                "sales_invoice": existing_invoice,
+                "existing": True,
+                "refresh": True
+            }
+
         charge = float(charge) if charge else 0
         amount = 0
         if charge > 0:
             amount = charge
         else:
             amount = doc.total_charge
+
         # Get room details
         room = frappe.get_doc("Room", doc.room)
+
+        # With consolidated folios the extension waits on the folio for the checkout invoice
+        from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import (
+            add_folio_charge,
+            is_folio_mode,
+        )
+
+        if is_folio_mode():
+            return add_folio_charge("Check In", doc_name, room.room_item, amount, purpose, description=purpose)
         
         # Get income account and cost center
         company = frappe.defaults.get_user_default("company")
@@ -128,6 +196,7 @@ def create_additional_sales_invoice_with_items(doc, method=None, charge=0):
         si.due_date = doc.check_out_date
         si.company = company
         si.debit_to = debit_to
+        si.set(CHARGE_KEY_FIELD, get_charge_key("Check In", doc_name, purpose))
         
         # Add item
         si.append("items", {
@@ -183,7 +252,8 @@ def create_additional_sales_invoice_with_items(doc, method=None, charge=0):
 
 
 @frappe.whitelist()
-def create_additional_sales_invoice_with_booking(doc, method=None, charge=0):
+@instrument
+def create_additional_sales_invoice_with_booking(doc, method=None, charge=0, purpose=None):
     try:
         # If doc is a string (when called via whitelist), convert to JSON
         if isinstance(doc, str):
@@ -192,6 +262,16 @@ def create_additional_sales_invoice_with_booking(doc, method=None, charge=0):
         else:
             doc_name = doc.name
 
+        # Retries of the same extension carry the same purpose and get the same invoice back
+        purpose = purpose or "Venue Extension to {0}".format(doc.get("check_out_date"))
+        existing_invoice = get_existing_charge_invoice("Booking", doc_name, purpose)
+        if existing_invoice:
+            return {
+                "sales_invoice": existing_invoice,
+                "existing": True,
+                "refresh": True
+            }
+
         charge = float(charge) if charge else 0
         amount = 0
         if charge > 0:
@@ -200,6 +280,15 @@ def create_additional_sales_invoice_with_booking(doc, method=None, charge=0):
             amount = doc.total_charge
         # Get room details
         venue = frappe.get_doc("Venue", doc.venue)
+
+        # With consolidated folios the extension waits on the folio for the checkout invoice
+        from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import (
+            add_folio_charge,
+            is_folio_mode,
+        )
+
+        if is_folio_mode():
+            return add_folio_charge("Booking", doc_name, venue.venue_item, amount, purpose, description=purpose)
         
         # Get income account and cost center
         company = frappe.defaults.get_user_default("company")
@@ -216,6 +305,7 @@ def create_additional_sales_invoice_with_booking(doc, method=None, charge=0):
         si.due_date = doc.check_out_time
         si.company = company
         si.debit_to = debit_to
+        si.set(CHARGE_KEY_FIELD, get_charge_key("Booking", doc_name, purpose))
         
         # Add item
         si.append("items", {
@@ -272,6 +362,7 @@ def create_additional_sales_invoice_with_booking(doc, method=None, charge=0):
 
 
 @frappe.whitelist()
+@instrument
 def get_payment_entries_for_invoices(invoice_names):
     """
     Get payment entries for a list of sales invoices
@@ -319,40 +410,70 @@ def get_payment_entries_for_invoices(invoice_names):
     return result
 
 @frappe.whitelist()
+@instrument
 def update_check_in_payment_entries(check_in, payment_entries, room_sales, room_payments, room_folio_balance):
-    """Update payment entries in Check In document without changing docstatus"""
+    """Sync payment rows and folio totals on a Check In, writing only what changed"""
     if isinstance(payment_entries, str):
         payment_entries = json.loads(payment_entries)
-    
-    # Get the document
-    doc = frappe.get_doc("Check In", check_in)
-    # check_in_doc = frappe.get_doc("Check In", check_in)
-    doc.room_sales = room_sales
-    doc.room_payments = room_payments
-    doc.room_folio_balance = room_folio_balance
-    
-    # Clear existing entries
-    doc.sales_invoices_payments = []
-    
-    # Add new entries
+
+    fields = ["sales_invoice", "payment_entry", "payment_date", "amount", "payment_type", "mode_of_payment"]
+    incoming = {}
     for payment in payment_entries:
-        doc.append("sales_invoices_payments", {
-            "sales_invoice": payment.get("sales_invoice"),
-            "payment_entry": payment.get("payment_entry"),
-            "payment_date": payment.get("payment_date"),
-            "amount": payment.get("amount"),
-            "payment_type": payment.get("payment_type"),
-            "mode_of_payment": payment.get("mode_of_payment")
+        incoming[(payment.get("payment_entry"), payment.get("sales_invoice"))] = payment
+
+    existing = frappe.get_all(
+        "Hotel Payments",
+        filters={"parent": check_in, "parenttype": "Check In", "parentfield": "sales_invoices_payments"},
+        fields=["name", "idx"] + fields,
+        order_by="idx asc"
+    )
+
+    stale = []
+    for row in existing:
+        payment = incoming.pop((row.payment_entry, row.sales_invoice), None)
+        if payment is None:
+            stale.append(row.name)
+            continue
+
+        changes = {
+            field: payment.get(field) for field in ("payment_date", "payment_type", "mode_of_payment")
+            if str(payment.get(field) or "") != str(row.get(field) or "")
+        }
+        if flt(payment.get("amount")) != flt(row.amount):
+            changes["amount"] = payment.get("amount")
+        if changes:
+            frappe.db.set_value("Hotel Payments", row.name, changes, update_modified=False)
+
+    if stale:
+        frappe.db.delete("Hotel Payments", {"name": ["in", stale]})
+
+    idx = max([row.idx for row in existing] or [0])
+    for payment in incoming.values():
+        idx += 1
+        row = frappe.get_doc({
+            "doctype": "Hotel Payments",
+            "parent": check_in,
+            "parenttype": "Check In",
+            "parentfield": "sales_invoices_payments",
+            "idx": idx,
+            **{field: payment.get(field) for field in fields}
         })
-    
-    # Save without validations to avoid docstatus issues
-    doc.flags.ignore_validate = True
-    doc.flags.ignore_validate_update_after_submit = True
-    doc.save(ignore_permissions=True)
-    
+        row.db_insert()
+
+    totals = {
+        "room_sales": flt(room_sales),
+        "room_payments": flt(room_payments),
+        "room_folio_balance": flt(room_folio_balance)
+    }
+    current = frappe.db.get_value("Check In", check_in, list(totals), as_dict=True) or {}
+    totals = {field: value for field, value in totals.items() if flt(current.get(field)) != value}
+    if totals:
+        frappe.db.set_value("Check In", check_in, totals, update_modified=False)
+
     return True
 
 @frappe.whitelist()
+@instrument
 def check_sales_invoices_payment_status(invoice_name, check_in):
     """Check and update payment status of sales invoices in Check In document"""
     # if isinstance(invoice_names, str):
@@ -388,6 +509,7 @@ def check_sales_invoices_payment_status(invoice_name, check_in):
     return {"updated": updated}
 
 @frappe.whitelist()
+@instrument
 def check_sales_invoices_payment_status_for_booking(invoice_name, check_in):
     """Check and update payment status of sales invoices in Check In document"""
     # if isinstance(invoice_names, str):
@@ -424,6 +546,7 @@ def check_sales_invoices_payment_status_for_booking(invoice_name, check_in):
 
 
 @frappe.whitelist()
+@instrument
 def make_payment_entry(check_in, sales_invoice, payment_method, amount, payment_date, reference_no=None, reference_date=None, remarks=None):
     """
     Create a Payment Entry for a Sales Invoice related to a Check In
@@ -538,6 +661,7 @@ def update_check_in_payment_status(check_in_doc, invoice):
 from erpnext.accounts.report.general_ledger.general_ledger import execute
 from frappe.utils import getdate
 @frappe.whitelist()
+@instrument
 def get_check_in_gl_entries(check_in):
     """Get General Ledger entries related to this Check In"""
     check_in_doc = frappe.get_doc("Check In", check_in)
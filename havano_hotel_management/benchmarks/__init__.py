@@ -0,0 +1,9 @@
+# Benchmarks for the hotel hot paths.
+#
+# Run them on a dedicated site with `allow_tests` enabled, never on a live one:
+#
+#   bench --site bench.local execute havano_hotel_management.benchmarks.run.run \
+#       --kwargs "{'rooms': 200, 'floors': 10, 'years': 2}"
+#
+# Synthetic records are named with the BENCH- prefix and can be removed with
+# havano_hotel_management.benchmarks.generator.clear.
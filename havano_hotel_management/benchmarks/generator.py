@@ -0,0 +1,219 @@
+import random
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import add_years, getdate, now_datetime, today
+
+PREFIX = "BENCH-"
+ROOM_TYPES = (("Standard", 80), ("Deluxe", 120), ("Suite", 250))
+
+# Children first so clear() never leaves orphans behind
+DOCTYPES = (
+    "GL Entry", "Check Out", "Check In", "Booking", "Reservation",
+    "Room", "Venue", "Room Type", "Room Floor", "Hotel Guest", "Customer", "Item",
+)
+
+
+def plan_stays(rng, rooms, start, end, max_gap=3, max_nights=7):
+    """
+    Yield (room, arrival date, nights) back to back for every room between
+    `start` and `end`, with a random gap of empty nights between stays.
+    """
+    for room in rooms:
+        day = start + timedelta(days=rng.randint(0, max_gap))
+        while day < end:
+            nights = rng.randint(1, max_nights)
+            yield room, day, nights
+            day += timedelta(days=nights + rng.randint(0, max_gap))
+
+
+def plan_bookings(rng, venues, start, end, max_gap=4, max_hours=8):
+    """Yield (venue, start datetime, hours) for every venue between `start` and `end`."""
+    for venue in venues:
+        day = start + timedelta(days=rng.randint(0, max_gap))
+        while day < end:
+            hours = rng.randint(2, max_hours)
+            yield venue, datetime.combine(day, time(rng.randint(8, 14))), hours
+            day += timedelta(days=rng.randint(1, max_gap))
+
+
+def generate(rooms=100, floors=5, years=1, venues=5, guests=None, payment_ratio=0.9, seed=42):
+    """
+    Insert a synthetic hotel: `rooms` rooms over `floors` floors with `years`
+    years of reservations, check-ins, check-outs, venue bookings and the
+    receivable GL entries of their invoices and payments.
+
+    The same arguments always produce the same rows.
+    """
+    rng = random.Random(seed)
+    guests = guests or max(rooms * 3, 10)
+    company = frappe.defaults.get_global_default("company") or frappe.db.get_value("Company", {}, "name")
+    receivable = frappe.get_cached_value("Company", company, "default_receivable_account") if company else None
+    now = now_datetime()
+    end = getdate(today())
+    start = getdate(add_years(end, -int(years)))
+
+    counts = {}
+
+    def insert(doctype, rows, docstatus=0):
+        if not rows:
+            return
+        fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"] + [
+            key for key in rows[0] if key != "name"
+        ]
+        values = [
+            (row["name"], now, now, "Administrator", "Administrator", docstatus)
+            + tuple(row[key] for key in fields[6:])
+            for row in rows
+        ]
+        frappe.db.bulk_insert(doctype, fields=fields, values=values, ignore_duplicates=True)
+        counts[doctype] = counts.get(doctype, 0) + len(rows)
+
+    insert(
+        "Item",
+        [
+            {
+                "name": f"{PREFIX}{item}", "item_code": f"{PREFIX}{item}", "item_name": f"{PREFIX}{item}",
+                "item_group": "Hotel Rooms", "stock_uom": "Nos", "is_stock_item": 0, "is_sales_item": 1,
+            }
+            for item in ("ROOM", "VENUE")
+        ],
+    )
+
+    floor_names = [f"{PREFIX}F{n:02d}" for n in range(1, floors + 1)]
+    insert("Room Floor", [{"name": name, "room_floor": name} for name in floor_names])
+
+    insert(
+        "Room Type",
+        [
+            {"name": f"{PREFIX}{name}", "room_type_name": f"{PREFIX}{name}", "default_price": price}
+            for name, price in ROOM_TYPES
+        ],
+    )
+
+    room_rows = []
+    for n in range(rooms):
+        floor = floor_names[n % floors]
+        room_type, price = ROOM_TYPES[rng.randrange(len(ROOM_TYPES))]
+        name = f"{PREFIX}R{n % floors + 1:02d}{n // floors + 1:03d}"
+        room_rows.append(
+            {
+                "name": name, "room_number": name, "room_name": name, "title": name,
+                "floor": floor, "room_type": f"{PREFIX}{room_type}", "price": price,
+                "status": "Available", "housekeeping_status": "Clean", "company": company,
+                "room_item": f"{PREFIX}ROOM",
+            }
+        )
+    insert("Room", room_rows)
+
+    venue_rows = [
+        {
+            "name": f"{PREFIX}V{n:02d}", "venue_name": f"{PREFIX}V{n:02d}", "title": f"{PREFIX}V{n:02d}",
+            "price": rng.choice((50, 75, 100)), "status": "Available", "company": company,
+            "maximum_capacity": rng.choice((20, 50, 200)), "venue_item": f"{PREFIX}VENUE",
+        }
+        for n in range(1, venues + 1)
+    ]
+    insert("Venue", venue_rows)
+
+    guest_names = [f"{PREFIX}G{n:06d}" for n in range(1, guests + 1)]
+    insert(
+        "Customer",
+        [
+            {
+                "name": name, "customer_name": name, "customer_type": "Individual",
+                "customer_group": "Hotel Customers", "territory": "All Territories",
+            }
+            for name in guest_names
+        ],
+    )
+    insert("Hotel Guest", [{"name": name, "full_name": name, "guest_customer": name} for name in guest_names])
+
+    reservations, check_ins, check_outs, gl_entries = [], [], [], []
+
+    def add_ledger(n, guest, posting_date, amount):
+        if not receivable:
+            return
+        invoice = f"{PREFIX}SINV-{n:07d}"
+        gl_entries.append(gl_row(f"{PREFIX}GLE-I{n:07d}", guest, posting_date, amount, 0, "Sales Invoice", invoice, invoice))
+        if rng.random() < payment_ratio:
+            gl_entries.append(
+                gl_row(f"{PREFIX}GLE-P{n:07d}", guest, posting_date, 0, amount, "Payment Entry", f"{PREFIX}PE-{n:07d}", invoice)
+            )
+
+    def gl_row(name, guest, posting_date, debit, credit, voucher_type, voucher_no, against_voucher):
+        return {
+            "name": name, "posting_date": posting_date, "account": receivable, "company": company,
+            "party_type": "Customer", "party": guest, "debit": debit, "credit": credit,
+            "debit_in_account_currency": debit, "credit_in_account_currency": credit,
+            "voucher_type": voucher_type, "voucher_no": voucher_no,
+            "against_voucher_type": "Sales Invoice", "against_voucher": against_voucher, "is_cancelled": 0,
+        }
+
+    prices = {row["name"]: row["price"] for row in room_rows}
+    for n, (room, arrival, nights) in enumerate(plan_stays(rng, [row["name"] for row in room_rows], start, end), 1):
+        guest = guest_names[rng.randrange(guests)]
+        departure = arrival + timedelta(days=nights)
+        checked_in = datetime.combine(arrival, time(14))
+        amount = prices[room] * nights
+
+        reservations.append(
+            {
+                "name": f"{PREFIX}RES-{n:07d}", "guest": guest, "room": room, "reservation_type": "Room",
+                "check_in_date": checked_in, "check_out_date": departure, "nights": nights, "company": company,
+            }
+        )
+        check_ins.append(
+            {
+                "name": f"{PREFIX}CIN-{n:07d}", "reservation": f"{PREFIX}RES-{n:07d}", "guest_name": guest,
+                "room": room, "check_in_date": checked_in, "check_out_date": departure, "nights": nights,
+                "total_charge": amount, "company": company,
+                "actual_checkout_date": datetime.combine(departure, time(10)) if departure <= end else None,
+            }
+        )
+        if departure <= end:
+            check_outs.append(
+                {
+                    "name": f"{PREFIX}CT-{n:07d}", "check_in": f"{PREFIX}CIN-{n:07d}", "guest": guest,
+                    "room": room, "actual_check_out_time": datetime.combine(departure, time(10)),
+                    "total_charges": amount, "room_condition": "Dirty",
+                }
+            )
+        add_ledger(n, guest, arrival, amount)
+
+    bookings = []
+    offset = len(check_ins)
+    venue_prices = {row["name"]: row["price"] for row in venue_rows}
+    for n, (venue, starts, hours) in enumerate(plan_bookings(rng, [row["name"] for row in venue_rows], start, end), 1):
+        guest = guest_names[rng.randrange(guests)]
+        ends = starts + timedelta(hours=hours)
+        amount = venue_prices[venue] * hours
+        bookings.append(
+            {
+                "name": f"{PREFIX}BK-{n:07d}", "guest_name": guest, "venue": venue,
+                "check_in_date": starts.date(), "check_in_time": starts.time(), "hours": hours,
+                "check_out_time": ends, "total_charge": amount, "company": company,
+                "status": "Checked Out" if ends.date() < end else "Booked",
+            }
+        )
+        add_ledger(offset + n, guest, starts.date(), amount)
+
+    insert("Reservation", reservations, docstatus=1)
+    insert("Check In", check_ins, docstatus=1)
+    insert("Check Out", check_outs, docstatus=1)
+    insert("Booking", bookings, docstatus=1)
+    insert("GL Entry", gl_entries, docstatus=1)
+
+    frappe.db.commit()
+    return counts
+
+
+def get_sample(doctype, order_by="name asc"):
+    return frappe.db.get_value(doctype, {"name": ["like", f"{PREFIX}%"]}, "name", order_by=order_by)
+
+
+def clear():
+    """Delete every synthetic record."""
+    for doctype in DOCTYPES:
+        frappe.db.delete(doctype, {"name": ["like", f"{PREFIX}%"]})
+    frappe.db.commit()
@@ -0,0 +1,291 @@
+import importlib
+import json
+import os
+import statistics
+import threading
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_years, get_datetime_str, now_datetime, today
+
+from havano_hotel_management.benchmarks import generator
+
+REPORT_PACKAGE = "havano_hotel_management.havano_hotel_management_system.report"
+
+# name -> (function, setup); setup runs before every timed call
+BENCHMARKS = {}
+
+
+def benchmark(name, setup=None):
+    def wrapper(fn):
+        BENCHMARKS[name] = (fn, setup)
+        return fn
+
+    return wrapper
+
+
+def get_report_modules():
+    path = os.path.dirname(importlib.import_module(REPORT_PACKAGE).__file__)
+    for folder in sorted(os.listdir(path)):
+        if os.path.exists(os.path.join(path, folder, f"{folder}.py")):
+            yield folder, importlib.import_module(f"{REPORT_PACKAGE}.{folder}.{folder}")
+
+
+def register_reports():
+    filters = {"from_date": add_years(today(), -1), "to_date": today()}
+    for folder, module in get_report_modules():
+        benchmark(f"report:{folder}")(lambda module=module: module.execute(frappe._dict(filters)))
+
+
+def rollback_after(fn):
+    """Time a call that writes documents, then undo whatever it wrote."""
+
+    def wrapped():
+        frappe.db.savepoint("hotel_benchmark")
+        try:
+            return fn()
+        finally:
+            frappe.db.rollback(save_point="hotel_benchmark")
+
+    return wrapped
+
+
+@benchmark("invoice:check_in")
+def bench_check_in_invoice():
+    from havano_hotel_management.api import create_sales_invoice
+
+    doc = frappe.get_doc("Check In", generator.get_sample("Check In", "name desc"))
+    return rollback_after(lambda: create_sales_invoice(doc, purpose=f"Benchmark {frappe.generate_hash(length=8)}"))()
+
+
+@benchmark("invoice:booking")
+def bench_booking_invoice():
+    from havano_hotel_management.havano_hotel_management_system.doctype.booking.booking import create_sales_invoice
+
+    doc = frappe.get_doc("Booking", generator.get_sample("Booking", "name desc"))
+    return rollback_after(lambda: create_sales_invoice(doc, purpose=f"Benchmark {frappe.generate_hash(length=8)}"))()
+
+
+@benchmark("guest_ledger")
+def bench_guest_ledger():
+    from havano_hotel_management.havano_hotel_management_system.doctype.hotel_guest.hotel_guest import get_guest_ledger
+
+    guest = frappe.db.sql(
+        """
+        SELECT guest_name FROM `tabCheck In`
+        WHERE name LIKE %s
+        GROUP BY guest_name
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """,
+        f"{generator.PREFIX}%",
+    )[0][0]
+    return get_guest_ledger(guest)
+
+
+@benchmark("room_history")
+def bench_room_history():
+    from havano_hotel_management.havano_hotel_management_system.doctype.room.room import get_room_history
+
+    return get_room_history(generator.get_sample("Room"))
+
+
+@benchmark("tape_chart")
+def bench_tape_chart():
+    from havano_hotel_management.tape_chart import get_tape_chart
+
+    return get_tape_chart(days=60)
+
+
+@benchmark("venue_free_slots")
+def bench_venue_free_slots():
+    from havano_hotel_management.venue_schedule import get_free_slots
+
+    booking = frappe.db.get_value(
+        "Booking", generator.get_sample("Booking", "name desc"), ["venue", "check_in_date"], as_dict=True
+    )
+    return get_free_slots(booking.venue, booking.check_in_date)
+
+
+@benchmark("venue_timeline")
+def bench_venue_timeline():
+    from frappe.utils import get_datetime
+
+    from havano_hotel_management.venue_schedule import build_venue_timeline, get_week_start
+
+    return build_venue_timeline(get_datetime(get_week_start(today())), 60)
+
+
+def reopen_bookings():
+    # The cron only works on bookings still marked Booked, so give it the same backlog every round
+    frappe.db.sql(
+        """
+        UPDATE `tabBooking` SET status = 'Booked'
+        WHERE name LIKE %s AND check_out_time < %s
+    """,
+        (f"{generator.PREFIX}%", now_datetime()),
+    )
+
+
+@benchmark("booking_cron", setup=reopen_bookings)
+def bench_booking_cron():
+    from havano_hotel_management.havano_hotel_management_system.doctype.booking.booking import (
+        check_and_update_bookings,
+    )
+
+    return check_and_update_bookings()
+
+
+def time_call(fn, setup=None, repeat=5):
+    timings, error = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            error = str(e)
+            break
+        timings.append((time.perf_counter() - start) * 1000)
+        frappe.clear_messages()
+
+    result = {"runs": len(timings), "error": error}
+    if timings:
+        result.update(
+            {
+                "min_ms": round(min(timings), 3),
+                "median_ms": round(statistics.median(timings), 3),
+                "max_ms": round(max(timings), 3),
+            }
+        )
+    return result
+
+
+def run(rooms=100, floors=5, years=1, venues=5, seed=42, repeat=5, only=None, output=None, regenerate=True, force=False):
+    """
+    Generate the synthetic dataset, time every registered benchmark and write
+    the results as JSON. Returns the path of the results file.
+
+    `only` limits the run to benchmark names starting with one of the given prefixes.
+    """
+    if not (frappe.conf.allow_tests or force):
+        frappe.throw(_("Benchmarks write synthetic data. Run them on a site with allow_tests enabled."))
+
+    dataset = {"rooms": rooms, "floors": floors, "years": years, "venues": venues, "seed": seed}
+    if regenerate:
+        generator.clear()
+        dataset["rows"] = generator.generate(**dataset)
+
+    register_reports()
+    if isinstance(only, str):
+        only = [only]
+
+    results = {}
+    for name, (fn, setup) in BENCHMARKS.items():
+        if only and not name.startswith(tuple(only)):
+            continue
+        results[name] = time_call(fn, setup, repeat=repeat)
+        # Nothing a benchmark writes should outlive it
+        frappe.db.rollback()
+
+    payload = {
+        "timestamp": get_datetime_str(now_datetime()),
+        "site": frappe.local.site,
+        "versions": {app: importlib.import_module(app).__version__ for app in ("frappe", "havano_hotel_management")},
+        "dataset": dataset,
+        "repeat": repeat,
+        "results": results,
+    }
+
+    output = output or frappe.get_site_path(
+        "private", "files", f"hotel-benchmark-{now_datetime().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(output, "w") as f:
+        json.dump(payload, f, indent=1, default=str)
+
+    print(json.dumps(results, indent=1))
+    return output
+
+
+def compare(baseline, current, threshold=0.2):
+    """Return the benchmarks whose median got slower than `threshold` (20%) between two result files."""
+    with open(baseline) as f:
+        before = json.load(f)["results"]
+    with open(current) as f:
+        after = json.load(f)["results"]
+
+    regressions = {}
+    for name, result in after.items():
+        old = before.get(name, {}).get("median_ms")
+        new = result.get("median_ms")
+        if old and new and new > old * (1 + threshold):
+            regressions[name] = {"before_ms": old, "after_ms": new, "change": round(new / old - 1, 3)}
+
+    return regressions
+
+
+def stress_room_transitions(workers=50, room=None, force=False):
+    """
+    Have `workers` connections try to check into the same room at once.
+    Exactly one should win and every other one should get a conflict back
+    promptly, rather than an overwrite or a lock wait timeout.
+    """
+    from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+        RoomStatusConflict,
+        transition_status,
+    )
+
+    if not (frappe.conf.allow_tests or force):
+        frappe.throw(_("Benchmarks write synthetic data. Run them on a site with allow_tests enabled."))
+
+    site = frappe.local.site
+    room = room or generator.get_sample("Room")
+    transition_status("Room", room, "Available")
+    frappe.db.commit()
+
+    outcomes = []
+    barrier = threading.Barrier(workers)
+
+    def check_in(worker):
+        frappe.init(site=site)
+        frappe.connect()
+        try:
+            barrier.wait()
+            start = time.perf_counter()
+            try:
+                transition_status("Room", room, "Occupied", holder=f"{generator.PREFIX}stress-{worker}")
+                frappe.db.commit()
+                outcome = "claimed"
+            except RoomStatusConflict:
+                frappe.db.rollback()
+                outcome = "conflict"
+            except Exception as e:
+                frappe.db.rollback()
+                outcome = type(e).__name__
+            outcomes.append((outcome, (time.perf_counter() - start) * 1000))
+        finally:
+            frappe.destroy()
+
+    threads = [threading.Thread(target=check_in, args=(worker,)) for worker in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    transition_status("Room", room, "Available")
+    frappe.db.commit()
+
+    timings = [ms for _outcome, ms in outcomes]
+    result = {
+        "room": room,
+        "workers": workers,
+        "outcomes": {name: sum(1 for outcome, _ms in outcomes if outcome == name) for name in {o for o, _ms in outcomes}},
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+    print(json.dumps(result, indent=1))
+    if result["outcomes"].get("claimed") != 1 or len(result["outcomes"]) > 2:
+        frappe.throw(_("Expected exactly one check-in to win and the rest to conflict, got {0}").format(result["outcomes"]))
+    return result
@@ -0,0 +1,191 @@
+import csv
+import importlib
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, now_datetime
+
+from havano_hotel_management.instrumentation import instrument
+
+REPORT_PACKAGE = "havano_hotel_management.havano_hotel_management_system.report"
+FORMATS = ("csv", "parquet")
+CHUNK_SIZE = 5000
+NUMERIC_TYPES = ("Currency", "Float", "Percent")
+INTEGER_TYPES = ("Int", "Check")
+
+
+def get_report_module(report_name):
+    module = frappe.scrub(report_name)
+    return importlib.import_module(f"{REPORT_PACKAGE}.{module}.{module}")
+
+
+def get_report_rows(module, filters):
+    """
+    Return (columns, rows) for a hotel report, rows being an iterator of
+    dicts. Reports that define `iter_rows(filters)` are streamed; any other
+    report is run once and its data walked.
+    """
+    if hasattr(module, "iter_rows"):
+        return get_columns(module.get_columns()), module.iter_rows(filters)
+
+    columns, data = module.execute(filters)[:2]
+    columns = get_columns(columns)
+    fieldnames = [column["fieldname"] for column in columns]
+    return columns, (row if isinstance(row, dict) else dict(zip(fieldnames, row)) for row in data)
+
+
+def get_columns(columns):
+    """Normalise report columns, which may be dicts or "Label:Type/Options:Width" strings."""
+    normalised = []
+    for column in columns:
+        if isinstance(column, str):
+            label, _sep, rest = column.partition(":")
+            fieldtype = rest.split("/")[0].split(":")[0] or "Data"
+            column = {"label": label, "fieldname": frappe.scrub(label), "fieldtype": fieldtype}
+        normalised.append(column)
+    return normalised
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CSVWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.fieldnames = [column["fieldname"] for column in columns]
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([_(column.get("label") or column["fieldname"]) for column in columns])
+
+    def write(self, chunk):
+        self.writer.writerows([[row.get(fieldname) for fieldname in self.fieldnames] for row in chunk])
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(column["fieldname"], self.get_type(column)) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def get_type(self, column):
+        if column.get("fieldtype") in NUMERIC_TYPES:
+            return self.pa.float64()
+        if column.get("fieldtype") in INTEGER_TYPES:
+            return self.pa.int64()
+        return self.pa.string()
+
+    def convert(self, column, value):
+        if column.get("fieldtype") in NUMERIC_TYPES:
+            return float(value or 0)
+        if column.get("fieldtype") in INTEGER_TYPES:
+            return cint(value)
+        return None if value is None else cstr(value)
+
+    def write(self, chunk):
+        arrays = {
+            column["fieldname"]: [self.convert(column, row.get(column["fieldname"])) for row in chunk]
+            for column in self.columns
+        }
+        self.writer.write_table(self.pa.Table.from_pydict(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {"csv": CSVWriter, "parquet": ParquetWriter}
+
+
+def check_format(file_format):
+    if file_format not in FORMATS:
+        frappe.throw(_("Export format must be one of {0}").format(", ".join(FORMATS)))
+
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            frappe.throw(_("Parquet export needs the pyarrow package installed on the server"))
+
+
+@frappe.whitelist()
+@instrument
+def export_report(report_name, filters=None, file_format="csv"):
+    """Queue a streaming export of a hotel report. The file is announced over realtime when ready."""
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else (filters or {})
+    report = frappe.get_doc("Report", report_name)
+    if report.module != "Havano Hotel Management System" or report.report_type != "Script Report":
+        frappe.throw(_("{0} is not a hotel script report").format(report_name))
+    if not report.is_permitted():
+        frappe.throw(_("Not permitted to export {0}").format(report_name), frappe.PermissionError)
+    check_format(file_format)
+
+    job = frappe.enqueue(
+        "havano_hotel_management.exports.run_export",
+        queue="long",
+        timeout=3600,
+        report_name=report_name,
+        filters=filters,
+        file_format=file_format,
+    )
+    return {"job_id": job.id if job else None}
+
+
+def run_export(report_name, filters, file_format="csv"):
+    """
+    Background job behind export_report. Rows go from the report's generator
+    to the file one chunk at a time, so only a chunk is ever held in memory.
+    """
+    module = get_report_module(report_name)
+    filters = frappe._dict(filters)
+    columns, rows = get_report_rows(module, filters)
+    total = module.count_rows(filters) if hasattr(module, "count_rows") else 0
+
+    file_name = f"{frappe.scrub(report_name)}-{now_datetime().strftime('%Y%m%d-%H%M%S')}.{file_format}"
+    path = frappe.get_site_path("private", "files", file_name)
+    title = _("Exporting {0}").format(_(report_name))
+
+    writer = WRITERS[file_format](path, columns)
+    written = 0
+    try:
+        for chunk in chunked(rows):
+            writer.write(chunk)
+            written += len(chunk)
+            percent = min(99, written * 100 / total) if total else 0
+            frappe.publish_progress(percent, title=title, description=_("{0} rows written").format(written))
+    except Exception:
+        writer.close()
+        os.remove(path)
+        raise
+    writer.close()
+
+    file_doc = frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": file_name,
+            "file_url": f"/private/files/{file_name}",
+            "is_private": 1,
+        }
+    ).insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    frappe.publish_progress(100, title=title, description=_("{0} rows written").format(written))
+    frappe.publish_realtime(
+        "hotel_report_export",
+        {"report_name": report_name, "file_url": file_doc.file_url, "rows": written},
+        user=frappe.session.user,
+    )
+    return file_doc.file_url
@@ -39,7 +39,7 @@ frappe.ui.form.on("Booking", {
 
         // general_ledger(frm);
         if(frm.doc.docstatus === 1) {
-            general_ledger(frm);
+            load_booking_context(frm);
             frm.set_df_property("hours", "read_only", 1);
             frm.set_df_property("check_out_time", "read_only", true);  
             frm.set_df_property("status", "read_only", true);
@@ -66,7 +66,6 @@ frappe.ui.form.on("Booking", {
         }
         
         if(frm.doc.docstatus === 1 && frm.doc.sales_invoice_number) {
-            update_sales_invoice_payment_status(frm);
             frm.add_custom_button(__('Extra Charges'), function() {
                 extra_charges(frm)      
             }, __("Actions"))
@@ -86,6 +85,10 @@ frappe.ui.form.on("Booking", {
             let hours = frappe.datetime.get_hour_diff(checkOutTime, checkInDateTime);
             frm.set_value('hours', hours);
         }
+        check_venue_availability(frm);
+    },
+    check_in_date: function(frm) {
+        check_venue_availability(frm);
     },
     check_out_time: function(frm) {
         if (frm.doc.check_out_time && frm.doc.check_in_time && frm.doc.check_in_date) {
@@ -99,6 +102,7 @@ frappe.ui.form.on("Booking", {
                 frm.set_value('hours', hours);
             }
         }
+        check_venue_availability(frm);
     },
     hours: function(frm) {
         if (frm.doc.hours && frm.doc.check_in_time && frm.doc.check_in_date) {
@@ -112,130 +116,52 @@ frappe.ui.form.on("Booking", {
     },
     price_list: function(frm) {
         if(frm.doc.price_list && frm.doc.venue) {
-            // Get the item code from the venue
-            frappe.db.get_value("Venue", frm.doc.venue, "venue_item", function(venue_data) {
-                if(venue_data && venue_data.venue_item) { // Updated from venue_item to venue_item
-                    // Fetch the price list rate for the venue's item
-                    frappe.call({
-                        method: "frappe.client.get_value",
-                        args: {
-                            doctype: "Item Price",
-                            filters: {
-                                item_code: venue_data.venue_item,
-                                price_list: frm.doc.price_list,
-                                selling: 1
-                            },
-                            fieldname: "price_list_rate"
-                        },
-                        callback: function(r) {
-                            if(r.message && r.message.price_list_rate) {
-                                console.log(r.message.price_list_rate);
-                                // Set the price list rate
-                                frm.set_value("price_list_rate", r.message.price_list_rate);
-                                
-                                // Calculate total charge based on hours and price list rate
-                                if(frm.doc.hours) {
-                                    let total = r.message.price_list_rate * frm.doc.number_of_people;
-                                    frm.set_value("total_charge", total);
-                                }
-                            } else {
-                                frappe.msgprint(__("No price found for this venue in the selected price list. Please select a different price list or update the Venue item price."));
-                                frm.set_value("price_list_rate", 0);
-                            }
-                        }
-                    });
-                } else {
+            get_venue_rate(frm).then(venue => {
+                if(!venue || !venue.venue_item) {
                     frappe.msgprint(__("No item is linked to this venue. Please link an item to the venue first."));
+                } else if(venue.price_list_rate) {
+                    // Set the price list rate
+                    frm.set_value("price_list_rate", venue.price_list_rate);
+
+                    // Calculate total charge based on hours and price list rate
+                    if(frm.doc.hours) {
+                        frm.set_value("total_charge", venue.price_list_rate * frm.doc.number_of_people);
+                    }
+                } else {
+                    frappe.msgprint(__("No price found for this venue in the selected price list. Please select a different price list or update the Venue item price."));
+                    frm.set_value("price_list_rate", 0);
                 }
             });
         }
     },
     validate: function(frm) {
-        // console.log("I am here")
-         frappe.call({
-                method: "frappe.client.get_list",
-                args: {
-                    doctype: "Booking",
-                    filters: [
-                        ["venue", "=", frm.doc.venue],
-                        ["docstatus", "=", 1], // Submitted bookings
-                        ["status", "=", "Booked"], // Active bookings
-                        ["check_in_date", "=", frm.doc.check_in_date] // Same date
-                    ],
-                    fields: ["name", "check_out_time"]
-                },
-                callback: function(r) {
-                    // console.log(r)
-                    if (r.message && r.message.length > 0) {
-                        let conflictingBooking = r.message.find(booking => {
-                            // console.log(Fbooking)
-                            let existingCheckOutTime = frappe.datetime.str_to_obj(booking.check_out_time);
-                            let newCheckInTime = frappe.datetime.str_to_obj(`${frm.doc.check_in_date} ${frm.doc.check_in_time}`);
-                            return existingCheckOutTime > newCheckInTime; // Conflict if checkout time is after new check-in time
-                        });
-
-                        if (conflictingBooking) {
-                            frm.set_value("venue", ""); // Clear the venue field
-                            frappe.throw(__("Venue {0} is already booked for the selected date and time (Booking: {1}). Please select a different venue or time.", 
-                                [frm.doc.venue, conflictingBooking.name]));
-                        }
-                    }
+        // One call for the clash check, one for the price; both must finish before saving
+        let checks = [];
+        if(frm.doc.venue && frm.doc.check_in_date && frm.doc.check_in_time && frm.doc.check_out_time) {
+            checks.push(frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.get_venue_conflicts", {
+                venue: frm.doc.venue,
+                check_in_date: frm.doc.check_in_date,
+                check_in_time: frm.doc.check_in_time,
+                check_out_time: frm.doc.check_out_time,
+                booking: frm.is_new() ? null : frm.doc.name
+            }).then(conflicts => {
+                if (conflicts && conflicts.length) {
+                    frm.set_value("venue", ""); // Clear the venue field
+                    frappe.throw(__("Venue {0} is already booked for the selected date and time (Booking: {1}). Please select a different venue or time.", 
+                        [frm.doc.venue, conflicts[0].name]));
                 }
-            });
-        // We need to use a Promise to handle the asynchronous DB call
+            }));
+        }
         if(frm.doc.venue && frm.doc.hours) {
-            return new Promise(resolve => {
-                frappe.db.get_value("Venue", frm.doc.venue, "price", function(data) {
-                    if(data && frm.doc.price_list_rate) {
-                        let total = frm.doc.price_list_rate * frm.doc.number_of_people;
-                        frm.set_value("total_charge", total);
-                        
-                        // Now update the balance_due after total_charge is set
-                        resolve();
-                    }
-                    else if(data && data.price) {
-                        let total = data.price * frm.doc.hours;
-                        frm.set_value("total_charge", total);
-                        
-                        // Now update the balance_due after total_charge is set
-                        resolve();
-                    } else {
-                        resolve();
-                    }
-                });
-            });
-        } 
-        // if (!frm.doc.status) {
-            frappe.call({
-                method: "frappe.client.get_list",
-                args: {
-                    doctype: "Booking",
-                    filters: [
-                        ["venue", "=", frm.doc.venue],
-                        // ["docstatus", "=", 1], // Submitted bookings
-                        // ["status", "=", "Booked"], // Active bookings
-                        // ["check_in_date", "=", frm.doc.check_in_date] // Same date
-                    ],
-                    fields: ["name", "check_out_time"]
-                },
-                callback: function(r) {
-                    if (r.message && r.message.length > 0) {
-                        let conflictingBooking = r.message.find(booking => {
-                            console.log(booking)
-                            let existingCheckOutTime = frappe.datetime.str_to_obj(booking.check_out_time);
-                            let newCheckInTime = frappe.datetime.str_to_obj(`${frm.doc.check_in_date} ${frm.doc.check_in_time}`);
-                            return existingCheckOutTime > newCheckInTime; // Conflict if checkout time is after new check-in time
-                        });
-
-                        if (conflictingBooking) {
-                            frm.set_value("venue", ""); // Clear the venue field
-                            frappe.throw(__("Venue {0} is already booked for the selected date and time (Booking: {1}). Please select a different venue or time.", 
-                                [frm.doc.venue, conflictingBooking.name]));
-                        }
-                    }
+            checks.push(get_venue_rate(frm).then(venue => {
+                if(venue && frm.doc.price_list_rate) {
+                    frm.set_value("total_charge", frm.doc.price_list_rate * frm.doc.number_of_people);
+                } else if(venue && venue.price) {
+                    frm.set_value("total_charge", venue.price * frm.doc.hours);
                 }
-            });
-        // }
+            }));
+        }
+        return Promise.all(checks);
     },
     guest_name: function(frm) {
         if(frm.doc.guest_name) {
@@ -263,73 +189,18 @@ frappe.ui.form.on("Booking", {
     },
     venue: function(frm) {
         if(frm.doc.venue) {
-            frappe.call({
-                method: "frappe.client.get_value",
-                args: {
-                    doctype: "Venue",
-                    filters: { name: frm.doc.venue },
-                    fieldname: ["status", "venue_item"]
-                },
-                callback: function(r) {
-                    // if(r.message && r.message.status !== "Available") {
-                    //     frm.set_value("venue", "");
-                    //     frappe.msgprint(__("Venue {0} is not available. Please select an available venue.", [frm.doc.venue]));
-                    // }else {
-                        // If price list is selected, fetch price from price list
-                        if(frm.doc.price_list && r.message.venue_item) {
-                            frappe.call({
-                                method: "frappe.client.get_value",
-                                args: {
-                                    doctype: "Item Price",
-                                    filters: {
-                                        item_code: r.message.venue_item,
-                                        price_list: frm.doc.price_list,
-                                        selling: 1
-                                    },
-                                    fieldname: "price_list_rate"
-                                },
-                                callback: function(price_data) {
-                                    if(price_data.message && price_data.message.price_list_rate) {
-                                        frm.set_value("price_list_rate", price_data.message.price_list_rate);
-                                        
-                                        // Calculate total charge if hours is set
-                                        if(frm.doc.hours) {
-                                            let total = price_data.message.price_list_rate * frm.doc.number_of_people;
-                                            frm.set_value("total_charge", total);
-                                            
-                                            // Update balance due
-                                        }
-                                    } else {
-                                        // If no price list rate found, use the default venue price
-                                        if(r.message.price) {
-                                            frm.set_value("price_list_rate", r.message.price);
-                                            
-                                            if(frm.doc.hours) {
-                                                let total = r.message.price * frm.doc.number_of_people;
-                                                frm.set_value("total_charge", total);
-                                                
-                                            }
-                                        }
-                                    }
-                                }
-                            });
-                        } else {
-                            // Use default venue price if no price list is selected
-                            if(r.message.price) {
-                                frm.set_value("price_list_rate", r.message.price);
-                                
-                                if(frm.doc.hours) {
-                                    let total = r.message.price * frm.doc.number_of_people;
-                                    frm.set_value("total_charge", total);
-                                    
-                                }
-                            }
-                        }
-                    // }
-                
+            get_venue_rate(frm).then(venue => {
+                // Price list rate when there is one, otherwise the default venue price
+                if(venue && venue.rate) {
+                    frm.set_value("price_list_rate", venue.rate);
+
+                    if(frm.doc.hours) {
+                        frm.set_value("total_charge", venue.rate * frm.doc.number_of_people);
+                    }
                 }
             });
         }
+        check_venue_availability(frm);
     },
     on_submit(frm){
         frm.reload_doc()
@@ -355,6 +226,63 @@ frappe.ui.form.on("Booking", {
     }
 });
 
+function get_venue_rate(frm) {
+    return frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.get_venue_rate", {
+        venue: frm.doc.venue,
+        price_list: frm.doc.price_list
+    });
+}
+
+// Time fields set each other, so one edit fires several events; only the last one asks the server
+const check_venue_availability = frappe.utils.debounce(function(frm) {
+    if (frm.doc.docstatus !== 0 || !(frm.doc.venue && frm.doc.check_in_date && frm.doc.check_in_time && frm.doc.check_out_time)) {
+        return;
+    }
+    frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.get_venue_conflicts", {
+        venue: frm.doc.venue,
+        check_in_date: frm.doc.check_in_date,
+        check_in_time: frm.doc.check_in_time,
+        check_out_time: frm.doc.check_out_time,
+        booking: frm.is_new() ? null : frm.doc.name
+    }).then(conflicts => {
+        if (!conflicts || !conflicts.length) {
+            frm.dashboard.clear_headline();
+            return;
+        }
+        return frappe.xcall("havano_hotel_management.venue_schedule.get_free_slots", {
+            venue: frm.doc.venue,
+            date: frm.doc.check_in_date
+        }).then(slots => {
+            let free = (slots || []).map(slot =>
+                `${frappe.datetime.str_to_user(slot.from)} - ${frappe.datetime.str_to_user(slot.to)}`
+            );
+            frm.dashboard.set_headline_alert(
+                __("Venue {0} is booked by {1} at this time.", [frm.doc.venue, conflicts.map(c => c.name).join(", ")]) +
+                " " + (free.length ? __("Free on this day: {0}", [free.join(", ")]) : __("No free time on this day.")),
+                "red"
+            );
+        });
+    });
+}, 300);
+
+function load_booking_context(frm) {
+    frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.get_booking_context", {
+        name: frm.doc.name
+    }).then(context => {
+        frm.hotel_context = context;
+        general_ledger(frm, context.totals);
+        if (context.payment_status_stale) {
+            update_sales_invoice_payment_status(frm);
+        }
+        if (context.conflicts && context.conflicts.length) {
+            frm.dashboard.set_headline_alert(
+                __("Overlaps with {0}", [context.conflicts.map(c => c.name).join(", ")]),
+                "orange"
+            );
+        }
+    });
+}
+
 function update_sales_invoice_payment_status(frm) {
     
     frappe.call({
@@ -387,7 +315,16 @@ function checkout(frm) {
             frappe.call({
                 method: "havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.checkout",
                 args: {
-                    "venue": frm.doc.venue
+                    "venue": frm.doc.venue,
+                    "booking": frm.doc.name
+                },
+                callback: function(r) {
+                    if (r.message && r.message.sales_invoice && !r.message.existing) {
+                        frappe.show_alert({
+                            message: __('Folio invoiced on {0}', [r.message.sales_invoice]),
+                            indicator: 'green'
+                        });
+                    }
                 }
             })
             
@@ -524,16 +461,25 @@ function extend_checkout_date(frm) {
                         additional_hours: parseInt(values.additional_hours),
                         price_list_rate: frm.doc.price_list_rate
                     },
-                    charge: parseFloat(values.additional_charge)
+                    charge: parseFloat(values.additional_charge),
+                    // Same extension, same key: a double click returns the first invoice
+                    purpose: "Extension to " + values.new_checkout_time
                 },
                 callback: function(r) {
-                    if (r.message) {
+                    if (r.message && r.message.room_folio) {
+                        frappe.show_alert({
+                            message: __('Charge added to Room Folio {0}', 
+                                ['<a href="/app/room-folio/' + r.message.room_folio + '">' + r.message.room_folio + '</a>']),
+                            indicator: 'green'
+                        });
+                    } else if (r.message) {
                         frappe.show_alert({
                             message: __('Sales Invoice {0} created successfully', 
                                 ['<a href="/app/sales-invoice/' + r.message.sales_invoice + '">' + r.message.sales_invoice + '</a>']),
                             indicator: 'green'
                         });
-                        
+                    }
+                    if (r.message) {
                         // Save the document to update the checkout date
                         frm.save('Update').then(() => {
                             frappe.show_alert({
@@ -572,7 +518,7 @@ function extend_checkout_date(frm) {
 }
 
 
-function general_ledger(frm) {
+function general_ledger(frm, totals) {
     let $container = frm.get_field('general_ledger').$wrapper;
     $container.empty();
     
@@ -595,14 +541,15 @@ function general_ledger(frm) {
                     <h4 class="panel-title" style="margin: 0; font-weight: bold;">Venue Folio - General Ledger</h4>
                     <div>
                         <button class="btn btn-xs btn-default refresh-ledger" style="margin-right: 5px;">
-                            <i class="fa fa-refresh"></i> Refresh
+                            <i class="fa fa-list"></i> Show Ledger
                         </button>
                         <button class="btn btn-xs btn-default open-in-new-tab">
                             <i class="fa fa-external-link"></i> Open in New Tab
                         </button>
                     </div>
                 </div>
-                <div class="panel-body" style="padding: 0; height: 600px;">
+                <div class="panel-body folio-summary" style="padding: 10px 15px; border-bottom: 1px solid #ddd;"></div>
+                <div class="panel-body" style="padding: 0; height: 600px; display: none;">
                     <div class="iframe-container" style="height: 100%; width: 100%; position: relative;"></div>
                 </div>
             </div>
@@ -745,24 +692,21 @@ function general_ledger(frm) {
         });
     }
     
-    // Initial load
-    load_general_ledger();
-    
-    // Set up auto-refresh every 30 seconds
-    let refresh_interval = setInterval(function() {
-        if (!frm.doc || frm.is_dirty()) {
-            // Don't refresh if the form is dirty (has unsaved changes)
-            return;
-        }
-        load_general_ledger();
-    }, 50000); // 30 seconds
-    
-    // Clear interval when the form is unloaded
-    $(document).on('form-unload', function(e, unload_frm) {
-        if (unload_frm.docname === frm.docname && unload_frm.doctype === frm.doctype) {
-            clearInterval(refresh_interval);
-        }
-    });
+    // The folio totals come with the form context; the full report only loads when asked for
+    let $summary = $report_container.find('.folio-summary');
+    if (totals) {
+        let format = value => format_currency(value, frappe.defaults.get_default("currency"));
+        $summary.html(`
+            <div class="row">
+                <div class="col-xs-3"><div class="text-muted">${__('Charges')}</div><b>${format(totals.charges)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Payments')}</div><b>${format(totals.payments)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Unbilled')}</div><b>${format(totals.unbilled)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Outstanding')}</div><b>${format(totals.outstanding)}</b></div>
+            </div>
+        `);
+    } else {
+        $summary.hide();
+    }
     
     // Handle the "Open in New Tab" button
     $report_container.find('.open-in-new-tab').on('click', function() {
@@ -779,6 +723,7 @@ function general_ledger(frm) {
     
     // Handle the "Refresh" button
     $report_container.find('.refresh-ledger').on('click', function() {
+        $iframe_container.parent().show();
         load_general_ledger();
         frappe.show_alert({
             message: __('Refreshing General Ledger...'),
@@ -7,21 +7,93 @@ from frappe import _
 import json
 from frappe.utils import now_datetime
 
+from havano_hotel_management.api import CHARGE_KEY_FIELD, get_charge_key, get_existing_charge_invoice
+from havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation import set_arrival
+from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import (
+    get_stay_totals,
+    post_stay_folio,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+    RoomStatusConflict,
+    transition_status,
+)
+from havano_hotel_management.instrumentation import instrument
+from havano_hotel_management.venue_schedule import (
+    clear_venue_schedule,
+    clear_venue_timeline,
+    get_booking_slot,
+    get_venue_schedule,
+)
+
 
 class Booking(Document):
-	pass
-	# pass
-	# def on_submit(self):
-	# 	"""Override the submit method to add custom logic."""
-	# 	# super().on_submit()
-	# 	create_sales_invoice(doc=self, charge=self.total_charge)
+	def validate(self):
+		self.validate_venue_availability()
+
+	def before_update_after_submit(self):
+		# An extended checkout must not run into the next booking
+		self.validate_venue_availability()
+
+	def on_submit(self):
+		if self.reservation:
+			set_arrival(self.reservation)
+		self.clear_venue_caches()
+
+	def on_update_after_submit(self):
+		# An extension moves the end, so the weeks of the old slot go as well as the new one
+		self.clear_venue_caches(self.get_doc_before_save())
+
+	def on_cancel(self):
+		if self.reservation:
+			set_arrival(self.reservation, arrived=False)
+		self.clear_venue_caches()
+
+	def clear_venue_caches(self, before=None):
+		clear_venue_schedule(self.venue)
+		for slot in (self, before):
+			if slot and slot.check_in_date and slot.check_in_time and slot.check_out_time:
+				clear_venue_timeline(*get_booking_slot(slot.check_in_date, slot.check_in_time, slot.check_out_time))
+
+	def validate_venue_availability(self):
+		if not (self.venue and self.check_in_date and self.check_in_time and self.check_out_time):
+			return
+
+		starts, ends = get_booking_slot(self.check_in_date, self.check_in_time, self.check_out_time)
+		if ends <= starts:
+			frappe.throw(_("Check-out time must be after check-in time."))
+
+		if self._action == "submit":
+			# Submits of the same venue queue here, and each checks the bookings as committed
+			frappe.db.get_value("Venue", self.venue, "name", for_update=True)
+			schedule = get_venue_schedule(self.venue, cached=False)
+		else:
+			schedule = get_venue_schedule(self.venue)
+
+		conflicts = schedule.overlapping(starts, ends, exclude=self.name)
+		if conflicts:
+			first = conflicts[0]
+			frappe.throw(
+				_("Venue {0} is already booked from {1} to {2} by {3}").format(
+					frappe.bold(self.venue),
+					schedule.starts[first],
+					schedule.ends[first],
+					frappe.bold(schedule.names[first]),
+				),
+				title=_("Venue Unavailable"),
+			)
+
 
 @frappe.whitelist()
-def checkout(venue):
-    frappe.db.set_value("Venue", venue, "status", "Available")
+@instrument
+def checkout(venue, booking=None):
+    # Only the booking holding the venue may release it
+    transition_status("Venue", venue, "Available", holder=booking)
+    if booking:
+        return post_stay_folio("Booking", booking)
 
 @frappe.whitelist()
-def create_sales_invoice(doc, method=None, charge=0):
+@instrument
+def create_sales_invoice(doc, method=None, charge=0, purpose="Venue Charge"):
     try:
         # If doc is a string (when called via whitelist), convert to JSON
         if isinstance(doc, str):
@@ -30,12 +102,27 @@ def create_sales_invoice(doc, method=None, charge=0):
         else:
             doc_name = doc.name
 
+        existing_invoice = get_existing_charge_invoice("Booking", doc_name, purpose)
+        if existing_invoice:
+            return {
+                "sales_invoice": existing_invoice,
+                "existing": True,
+                "refresh": True
+            }
+
         charge = float(charge) if charge else 0
         amount = 0
         if charge > 0:
             amount = charge
         else:
             amount = doc.total_charge
+
+        # Claim the venue before invoicing; a venue another booking got first is a conflict, not an overwrite
+        transition_status(
+            "Venue", doc.venue, "Occupied", holder=doc_name,
+            values={"current_guest": doc.guest_name, "checkout_date": doc.check_out_time},
+        )
+
         # Get venue details
         venue = frappe.get_doc("Venue", doc.venue)
         
@@ -54,6 +141,7 @@ def create_sales_invoice(doc, method=None, charge=0):
         si.due_date = doc.check_out_time
         si.company = company
         si.debit_to = debit_to 
+        si.set(CHARGE_KEY_FIELD, get_charge_key("Booking", doc_name, purpose))
         
         # Add item
         si.append("items", {
@@ -73,13 +161,6 @@ def create_sales_invoice(doc, method=None, charge=0):
         # Save and submit the invoice
         si.insert(ignore_permissions=True)
         si.submit()
-        
-        # Update venue status
-        frappe.db.set_value("Venue", doc.venue, "status", "Occupied")
-        frappe.db.set_value("Venue", doc.venue, "current_booking", doc.name)
-
-        frappe.db.set_value("Venue", doc.venue, "current_guest", doc.guest_name)
-        frappe.db.set_value("Venue", doc.venue, "checkout_date", doc.check_out_time)
 
         frappe.db.set_value("Booking", doc_name, "sales_invoice_number", si.name)
         frappe.db.set_value("Booking", doc_name, "status", "Booked")  # Un-commenting this line to update status
@@ -87,8 +168,6 @@ def create_sales_invoice(doc, method=None, charge=0):
 
         check_in_doc.save(ignore_permissions=True)
 
-        frappe.db.commit()
-        
         frappe.msgprint(_("Sales Invoice {0} created and venue status updated to Occupied").format(
             frappe.bold(si.name)
         ))
@@ -97,11 +176,14 @@ def create_sales_invoice(doc, method=None, charge=0):
             "sales_invoice": si.name,
             "refresh": True
         }   
+    except RoomStatusConflict:
+        raise
     except Exception as e:
         frappe.log_error(message=str(e), title="Error Creating Sales Invoice")
         frappe.throw(_("An error occurred while creating the Sales Invoice: {0}").format(str(e)))
 
 @frappe.whitelist()
+@instrument
 def check_and_update_bookings():
     """Cron job to check and update bookings with status 'Booked' to 'Checked Out'."""
     try:
@@ -116,22 +198,99 @@ def check_and_update_bookings():
                 "docstatus": 1,  # Only submitted bookings
                 "check_out_time": ["<", current_time]
             },
-            fields=["name", "venue"]
+            fields=["name", "venue", "check_in_date", "check_in_time", "check_out_time"]
         )
 
         for booking in bookings:
             # Update booking status to 'Checked Out'
             frappe.db.set_value("Booking", booking.name, "status", "Checked Out")
+            clear_venue_schedule(booking.venue)
+            clear_venue_timeline(*get_booking_slot(booking.check_in_date, booking.check_in_time, booking.check_out_time))
+
+            # Free the venue, unless a later booking has already taken it over
+            transition_status("Venue", booking.venue, "Available", holder=booking.name, raise_exception=False)
 
-            # Update venue status to 'Available'
-            frappe.db.set_value("Venue", booking.venue, "status", "Available")
-            frappe.db.set_value("Venue", booking.venue, "current_booking", None)
-            frappe.db.set_value("Venue", booking.venue, "current_guest", None)
-            frappe.db.set_value("Venue", booking.venue, "checkout_date", None)
+            post_stay_folio("Booking", booking.name)
 
         # Commit changes to the database
         frappe.db.commit()
 
         frappe.logger().info(f"{len(bookings)} bookings updated to 'Checked Out' status.")
     except Exception as e:
-        frappe.log_error(message=str(e), title="Error in Booking Cron Job")
\ No newline at end of file
+        frappe.log_error(message=str(e), title="Error in Booking Cron Job")
+
+
+@frappe.whitelist()
+@instrument
+def get_venue_rate(venue, price_list=None):
+    """Venue status, item and the rate to charge, falling back to the venue price."""
+    venue_data = frappe.db.get_value("Venue", venue, ["status", "venue_item", "price"], as_dict=True)
+    if not venue_data:
+        return None
+
+    venue_data.price_list_rate = None
+    if venue_data.venue_item and price_list:
+        venue_data.price_list_rate = frappe.db.get_value(
+            "Item Price",
+            {"item_code": venue_data.venue_item, "price_list": price_list, "selling": 1},
+            "price_list_rate",
+        )
+    venue_data.rate = venue_data.price_list_rate or venue_data.price
+    return venue_data
+
+
+@frappe.whitelist()
+@instrument
+def get_venue_conflicts(venue, check_in_date, check_in_time, check_out_time, booking=None):
+    """Active bookings of `venue` that overlap the given slot, from the venue's cached schedule."""
+    if not (venue and check_in_date and check_in_time and check_out_time):
+        return []
+
+    starts, ends = get_booking_slot(check_in_date, check_in_time, check_out_time)
+    schedule = get_venue_schedule(venue)
+    return [
+        frappe._dict(
+            name=schedule.names[i], guest_name=schedule.guests[i], starts=schedule.starts[i], ends=schedule.ends[i]
+        )
+        for i in schedule.overlapping(starts, ends, exclude=booking)
+    ]
+
+
+def on_doctype_update():
+    frappe.db.add_index("Booking", ["venue", "status"])
+
+
+@frappe.whitelist()
+@instrument
+def get_booking_context(name):
+    """Everything the Booking form needs on load, in one round trip."""
+    doc = frappe.db.get_value(
+        "Booking",
+        name,
+        [
+            "name", "venue", "price_list", "sales_invoice_number", "sales_invoice_status",
+            "check_in_date", "check_in_time", "check_out_time",
+        ],
+        as_dict=True,
+    )
+    if not doc:
+        frappe.throw(_("Booking {0} not found").format(name), frappe.DoesNotExistError)
+
+    context = frappe._dict(
+        venue=get_venue_rate(doc.venue, doc.price_list) if doc.venue else None,
+        conflicts=get_venue_conflicts(doc.venue, doc.check_in_date, doc.check_in_time, doc.check_out_time, name),
+        totals=get_stay_totals("Booking", name, doc.sales_invoice_number),
+    )
+
+    context.invoice_outstanding = None
+    if doc.sales_invoice_number:
+        context.invoice_outstanding = frappe.db.get_value(
+            "Sales Invoice", doc.sales_invoice_number, "outstanding_amount"
+        )
+    paid = context.invoice_outstanding is not None and context.invoice_outstanding <= 0
+    context.sales_invoice_status = ("Paid" if paid else "Unpaid") if doc.sales_invoice_number else None
+    context.payment_status_stale = bool(doc.sales_invoice_number) and (
+        (doc.sales_invoice_status == "Paid") != paid
+    )
+
+    return context
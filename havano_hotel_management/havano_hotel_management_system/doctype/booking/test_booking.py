@@ -1,9 +1,61 @@
 # Copyright (c) 2025, Alphazen Technologies and Contributors
 # See license.txt
 
-# import frappe
+from datetime import datetime
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from havano_hotel_management.venue_schedule import TIMELINE_CACHE_KEY, VenueSchedule
+
+
+def at(hour, day=1):
+	return datetime(2026, 3, day, hour)
+
 
 class TestBooking(FrappeTestCase):
-	pass
+	def test_overlapping_bookings(self):
+		schedule = VenueSchedule(
+			[
+				(at(14), at(18), "BK-2", "Bob"),
+				(at(8), at(23), "BK-1", "Ann"),
+				(at(20), at(2, day=2), "BK-3", "Cy"),
+			]
+		)
+
+		self.assertEqual([schedule.names[i] for i in schedule.overlapping(at(19), at(20))], ["BK-1"])
+		self.assertEqual([schedule.names[i] for i in schedule.overlapping(at(23), at(1, day=2))], ["BK-3"])
+		self.assertEqual(schedule.overlapping(at(23), at(1, day=2), exclude="BK-3"), [])
+		# Touching bookings do not clash
+		self.assertEqual(schedule.overlapping(at(2, day=2), at(5, day=2)), [])
+
+	def test_free_slots(self):
+		schedule = VenueSchedule([(at(9), at(12), "BK-1", "Ann"), (at(13), at(15), "BK-2", "Bob")])
+
+		self.assertEqual(
+			schedule.free_slots(at(0), at(0, day=2)),
+			[(at(0), at(9)), (at(12), at(13)), (at(15), at(0, day=2))],
+		)
+		self.assertEqual(schedule.free_slots(at(0), at(0, day=2), min_hours=2), [(at(0), at(9)), (at(15), at(0, day=2))])
+
+	def test_submit_and_cancel_drop_the_cached_week(self):
+		# 2026-03-02 is a Monday; the booking runs into the next week
+		weeks = [TIMELINE_CACHE_KEY.format("2026-03-02"), TIMELINE_CACHE_KEY.format("2026-03-09")]
+		booking = frappe.get_doc(
+			{
+				"doctype": "Booking",
+				"venue": "_Test Venue",
+				"check_in_date": "2026-03-08",
+				"check_in_time": "20:00:00",
+				"check_out_time": "2026-03-09 02:00:00",
+			}
+		)
+
+		for event in ("on_submit", "on_cancel"):
+			for key in weeks:
+				frappe.cache().hset(key, 60, {"_Test Venue": {}})
+
+			getattr(booking, event)()
+
+			for key in weeks:
+				self.assertIsNone(frappe.cache().hget(key, 60), f"{event} left {key} cached")
@@ -4,19 +4,13 @@
 frappe.ui.form.on("Check In", {
     setup: function(frm) {
         frm.set_query("room", function(doc) {
-            if (doc.reservation) {
-                return {
-                    "filters": {
-                        "status": ["!=", "Occupied"]
-                    }
-                };
-            }else{
-                return {
-                    "filters": {
-                        "status": "Available"
-                    }
-                };
-            }     
+            // Prefix search over the reservation's rooms, or over available rooms without one
+            return {
+                "query": "havano_hotel_management.havano_hotel_management_system.doctype.check_in.check_in.get_rooms_from_reservation",
+                "filters": {
+                    "reservation": doc.reservation || ""
+                }
+            };
         });
 
         frm.set_query("reservation", function() {
@@ -68,39 +62,20 @@ frappe.ui.form.on("Check In", {
     },
     price_list: function(frm) {
         if(frm.doc.price_list && frm.doc.room) {
-            // Get the item code from the room
-            frappe.db.get_value("Room", frm.doc.room, "room_item", function(room_data) {
-                if(room_data && room_data.room_item) {
-                    // Fetch the price list rate for the room's item
-                    frappe.call({
-                        method: "frappe.client.get_value",
-                        args: {
-                            doctype: "Item Price",
-                            filters: {
-                                item_code: room_data.room_item,
-                                price_list: frm.doc.price_list,
-                                selling: 1
-                            },
-                            fieldname: "price_list_rate"
-                        },
-                        callback: function(r) {
-                            if(r.message && r.message.price_list_rate) {
-                                // Set the price list rate
-                                frm.set_value("price_list_rate", r.message.price_list_rate);
-                                
-                                // Calculate total charge based on nights and price list rate
-                                if(frm.doc.nights) {
-                                    let total = r.message.price_list_rate * frm.doc.nights;
-                                    frm.set_value("total_charge", total);
-                                                                    }
-                            } else {
-                                frappe.msgprint(__("No price found for this room in the selected price list. Please select a different price list or update the Room item price."));
-                                frm.set_value("price_list_rate", 0);
-                            }
-                        }
-                    });
-                } else {
+            get_room_rate(frm).then(room => {
+                if(!room || !room.room_item) {
                     frappe.msgprint(__("No item is linked to this room. Please link an item to the room first."));
+                } else if(room.price_list_rate) {
+                    // Set the price list rate
+                    frm.set_value("price_list_rate", room.price_list_rate);
+
+                    // Calculate total charge based on nights and price list rate
+                    if(frm.doc.nights) {
+                        frm.set_value("total_charge", room.price_list_rate * frm.doc.nights);
+                    }
+                } else {
+                    frappe.msgprint(__("No price found for this room in the selected price list. Please select a different price list or update the Room item price."));
+                    frm.set_value("price_list_rate", 0);
                 }
             });
         }
@@ -131,7 +106,7 @@ frappe.ui.form.on("Check In", {
         } 
     },
 	refresh(frm) {
-        general_ledger(frm);
+        load_check_in_context(frm);
         if(frm.doc.docstatus === 1) {
             frm.set_df_property("nights", "read_only", 1);
             frm.set_df_property("check_out_date", "read_only", true);
@@ -167,7 +142,6 @@ frappe.ui.form.on("Check In", {
         }
         
         if(frm.doc.docstatus === 1 && frm.doc.sales_invoice_number) {
-            update_sales_invoice_payment_status(frm);
             frm.add_custom_button(__('Extra Charges'), function() {
                 extra_charges(frm)      
             }, __("Actions"))
@@ -205,70 +179,17 @@ frappe.ui.form.on("Check In", {
     },
     room: function(frm) {
         if(frm.doc.room) {
-            frappe.call({
-                method: "frappe.client.get_value",
-                args: {
-                    doctype: "Room",
-                    filters: { name: frm.doc.room },
-                    fieldname: ["status", "room_item"]
-                },
-                callback: function(r) {
-                    if(r.message && r.message.status === "Occupied") {
-                        frm.set_value("room", "");
-                        frappe.msgprint(__("Room {0} is not available. Please select an available room.", [frm.doc.room]));
-                    }else {
-                        // If price list is selected, fetch price from price list
-                        if(frm.doc.price_list && r.message.room_item) {
-                            frappe.call({
-                                method: "frappe.client.get_value",
-                                args: {
-                                    doctype: "Item Price",
-                                    filters: {
-                                        item_code: r.message.room_item,
-                                        price_list: frm.doc.price_list,
-                                        selling: 1
-                                    },
-                                    fieldname: "price_list_rate"
-                                },
-                                callback: function(price_data) {
-                                    if(price_data.message && price_data.message.price_list_rate) {
-                                        frm.set_value("price_list_rate", price_data.message.price_list_rate);
-                                        
-                                        // Calculate total charge if nights is set
-                                        if(frm.doc.nights) {
-                                            let total = price_data.message.price_list_rate * frm.doc.nights;
-                                            frm.set_value("total_charge", total);
-                                            
-                                            // Update balance due
-                                        }
-                                    } else {
-                                        // If no price list rate found, use the default room price
-                                        if(r.message.price) {
-                                            frm.set_value("price_list_rate", r.message.price);
-                                            
-                                            if(frm.doc.nights) {
-                                                let total = r.message.price * frm.doc.nights;
-                                                frm.set_value("total_charge", total);
-                                                
-                                            }
-                                        }
-                                    }
-                                }
-                            });
-                        } else {
-                            // Use default room price if no price list is selected
-                            if(r.message.price) {
-                                frm.set_value("price_list_rate", r.message.price);
-                                
-                                if(frm.doc.nights) {
-                                    let total = r.message.price * frm.doc.nights;
-                                    frm.set_value("total_charge", total);
-                                    
-                                }
-                            }
-                        }
+            get_room_rate(frm).then(room => {
+                if(room && room.status === "Occupied") {
+                    frm.set_value("room", "");
+                    frappe.msgprint(__("Room {0} is not available. Please select an available room.", [frm.doc.room]));
+                } else if(room && room.rate) {
+                    // Price list rate when there is one, otherwise the default room price
+                    frm.set_value("price_list_rate", room.rate);
+
+                    if(frm.doc.nights) {
+                        frm.set_value("total_charge", room.rate * frm.doc.nights);
                     }
-                
                 }
             });
         }
@@ -299,84 +220,103 @@ frappe.ui.form.on("Check In", {
 
 
 async function checkout(frm) {
-    // Confirm checkout
-    frappe.call({
-        method: "frappe.client.get_list",
-        args: {
-            doctype: "Check Out",
-            filters: {
-                "check_in": frm.doc.name
-            },
-            fields: ["name"]
-        },
-        callback: function(r) {
-            if (r.message && r.message.length > 0) {
-                frappe.msgprint(__("Check out already exists for this check-in."));
-                return;
-            }else{
-                frappe.confirm(
-                    __('Are you sure you want to check out this guest?'),
-                    async function() {
-                        const dtime = await frappe.db.get_single_value('Hotel Settings', 'default_check_out_time')
-                        let checkout_date;
-                        if(!dtime){
-                            checkout_date = frm.doc.check_out_date;
-                        }else{
-                            checkout_date = moment(frm.doc.check_out_date+ " " + dtime).format("YYYY-MM-DD HH:mm:ss");
-                        }
-                   
-                        // Set checkout date to today
-                        
-                        // Update the current check-in document with checkout date
-                        
+    const context = await get_check_in_context(frm);
+    if (context.check_out) {
+        frappe.msgprint(__("Check out already exists for this check-in."));
+        return;
+    }
 
-                        // Calculate number of days
-                        let check_in_date = moment(frm.doc.check_in_date);
-                        let check_out_date = moment(checkout_date);
-                        let days = Math.max(1, check_out_date.diff(check_in_date, 'days'));
-                        
-                        // Get room rate
-                        frappe.call({
-                            method: "frappe.client.get_value",
-                            args: {
-                                doctype: "Room",
-                                filters: { name: frm.doc.room },
-                                fieldname: ["price", "room_type"]
-                            },
-                            callback: function(room_data) {
-                                if (room_data.message) {
-                                    let room_rate = room_data.message.price;
-                                    console.log(room_rate)
-                                    let room_type = room_data.message.room_type;
-                                    let total_charges = room_rate * days;
-                                    
-                                    // Create Check Out document
-                                    frappe.model.with_doctype("Check Out", function() {
-                                        let checkout_doc = frappe.model.get_new_doc("Check Out");
-                                        checkout_doc.check_in = frm.doc.name;
-                                        checkout_doc.guest = frm.doc.guest_name;
-                                        checkout_doc.room = frm.doc.room;
-                                        checkout_doc.actual_check_out_time = checkout_date;
-                                        checkout_doc.days_stayed = frm.doc.nights;
-                                        // checkout_doc.sales_invoice_number = frm.doc.sales_invoice_number;
-                                        // checkout_doc.total_charges = total_charges;
-                                        // checkout_doc.payment_entry = frm.doc.payment_entry
-                                        
-                                        frappe.set_route("Form", "Check Out", checkout_doc.name);
-                                    });
-                                    
-                                    // Update room status to Available
-                                    
-                                }
-                            }
-                        });
-                    }
-                );
+    frappe.confirm(
+        __('Are you sure you want to check out this guest?'),
+        function() {
+            const dtime = frappe.boot.hotel_settings && frappe.boot.hotel_settings.default_check_out_time;
+            let checkout_date;
+            if(!dtime){
+                checkout_date = frm.doc.check_out_date;
+            }else{
+                checkout_date = moment(frm.doc.check_out_date+ " " + dtime).format("YYYY-MM-DD HH:mm:ss");
             }
+
+            // Create Check Out document
+            frappe.model.with_doctype("Check Out", function() {
+                let checkout_doc = frappe.model.get_new_doc("Check Out");
+                checkout_doc.check_in = frm.doc.name;
+                checkout_doc.guest = frm.doc.guest_name;
+                checkout_doc.room = frm.doc.room;
+                checkout_doc.actual_check_out_time = checkout_date;
+                checkout_doc.days_stayed = frm.doc.nights;
+
+                frappe.set_route("Form", "Check Out", checkout_doc.name);
+            });
         }
-    })
-    
+    );
+}
+
+function get_room_rate(frm) {
+    return frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.check_in.check_in.get_room_rate", {
+        room: frm.doc.room,
+        price_list: frm.doc.price_list
+    });
+}
+
+function get_check_in_context(frm) {
+    // One round trip per refresh; the actions reuse what the form already loaded
+    if (frm.hotel_context && frm.hotel_context_for === frm.doc.modified) {
+        return Promise.resolve(frm.hotel_context);
+    }
+    return frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.check_in.check_in.get_check_in_context", {
+        name: frm.doc.name
+    }).then(context => {
+        frm.hotel_context = context;
+        frm.hotel_context_for = frm.doc.modified;
+        return context;
+    });
 }
+
+function load_check_in_context(frm) {
+    if (frm.is_new()) {
+        general_ledger(frm, null);
+        return;
+    }
+
+    get_check_in_context(frm).then(context => {
+        general_ledger(frm, context.totals);
+        // Only folio mode collects charges to invoice later
+        if (context.folio_mode && frm.doc.docstatus === 1 && !frm.doc.actual_checkout_date) {
+            add_post_folio_button(frm);
+        }
+        if (context.payment_status_stale) {
+            update_sales_invoice_payment_status(frm);
+        }
+    });
+}
+
+function add_post_folio_button(frm) {
+    frm.add_custom_button(__('Post Folio Invoice'), function() {
+        frappe.call({
+            method: "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.post_stay_folio",
+            args: {
+                reference_doctype: frm.doctype,
+                reference_name: frm.doc.name
+            },
+            callback: function(r) {
+                if (r.message && r.message.sales_invoice) {
+                    frappe.show_alert({
+                        message: __('Folio invoiced on {0}', [r.message.sales_invoice]),
+                        indicator: 'green'
+                    });
+                    frm.reload_doc();
+                } else {
+                    frappe.show_alert({
+                        message: __('No unbilled folio charges'),
+                        indicator: 'orange'
+                    });
+                }
+            }
+        });
+    }, __("Actions"))
+}
+
 function extra_charges(frm) {
     // Create a new Sales Invoice with the guest as customer
     frappe.model.with_doctype("Sales Invoice", function() {
@@ -536,7 +476,7 @@ function make_payment(frm){
     d.show();
 }
 
-function general_ledger(frm) {
+function general_ledger(frm, totals) {
     let $container = frm.get_field('general_ledger').$wrapper;
     $container.empty();
     
@@ -559,14 +499,15 @@ function general_ledger(frm) {
                     <h4 class="panel-title" style="margin: 0; font-weight: bold;">Room Folio - General Ledger</h4>
                     <div>
                         <button class="btn btn-xs btn-default refresh-ledger" style="margin-right: 5px;">
-                            <i class="fa fa-refresh"></i> Refresh
+                            <i class="fa fa-list"></i> Show Ledger
                         </button>
                         <button class="btn btn-xs btn-default open-in-new-tab">
                             <i class="fa fa-external-link"></i> Open in New Tab
                         </button>
                     </div>
                 </div>
-                <div class="panel-body" style="padding: 0; height: 600px;">
+                <div class="panel-body folio-summary" style="padding: 10px 15px; border-bottom: 1px solid #ddd;"></div>
+                <div class="panel-body" style="padding: 0; height: 600px; display: none;">
                     <div class="iframe-container" style="height: 100%; width: 100%; position: relative;"></div>
                 </div>
             </div>
@@ -709,24 +650,21 @@ function general_ledger(frm) {
         });
     }
     
-    // Initial load
-    load_general_ledger();
-    
-    // Set up auto-refresh every 30 seconds
-    let refresh_interval = setInterval(function() {
-        if (!frm.doc || frm.is_dirty()) {
-            // Don't refresh if the form is dirty (has unsaved changes)
-            return;
-        }
-        load_general_ledger();
-    }, 50000); // 30 seconds
-    
-    // Clear interval when the form is unloaded
-    $(document).on('form-unload', function(e, unload_frm) {
-        if (unload_frm.docname === frm.docname && unload_frm.doctype === frm.doctype) {
-            clearInterval(refresh_interval);
-        }
-    });
+    // The folio totals come with the form context; the full report only loads when asked for
+    let $summary = $report_container.find('.folio-summary');
+    if (totals) {
+        let format = value => format_currency(value, frappe.defaults.get_default("currency"));
+        $summary.html(`
+            <div class="row">
+                <div class="col-xs-3"><div class="text-muted">${__('Charges')}</div><b>${format(totals.charges)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Payments')}</div><b>${format(totals.payments)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Unbilled')}</div><b>${format(totals.unbilled)}</b></div>
+                <div class="col-xs-3"><div class="text-muted">${__('Outstanding')}</div><b>${format(totals.outstanding)}</b></div>
+            </div>
+        `);
+    } else {
+        $summary.hide();
+    }
     
     // Handle the "Open in New Tab" button
     $report_container.find('.open-in-new-tab').on('click', function() {
@@ -743,6 +681,7 @@ function general_ledger(frm) {
     
     // Handle the "Refresh" button
     $report_container.find('.refresh-ledger').on('click', function() {
+        $iframe_container.parent().show();
         load_general_ledger();
         frappe.show_alert({
             message: __('Refreshing General Ledger...'),
@@ -811,16 +750,25 @@ function extend_checkout_date(frm) {
                         additional_nights: parseInt(values.additional_nights),
                         price_list_rate: frm.doc.price_list_rate
                     },
-                    charge: parseFloat(values.additional_charge)
+                    charge: parseFloat(values.additional_charge),
+                    // Same extension, same key: a double click returns the first invoice
+                    purpose: "Extension to " + values.new_checkout_date
                 },
                 callback: function(r) {
-                    if (r.message) {
+                    if (r.message && r.message.room_folio) {
+                        frappe.show_alert({
+                            message: __('Charge added to Room Folio {0}', 
+                                ['<a href="/app/room-folio/' + r.message.room_folio + '">' + r.message.room_folio + '</a>']),
+                            indicator: 'green'
+                        });
+                    } else if (r.message) {
                         frappe.show_alert({
                             message: __('Sales Invoice {0} created successfully', 
                                 ['<a href="/app/sales-invoice/' + r.message.sales_invoice + '">' + r.message.sales_invoice + '</a>']),
                             indicator: 'green'
                         });
-                        
+                    }
+                    if (r.message) {
                         // Save the document to update the checkout date
                         frm.save('Update').then(() => {
                             frappe.show_alert({
@@ -888,35 +836,22 @@ function move_to_another_room(frm) {
                     ],
                     primary_action_label: __("Move"),
                     primary_action(values) {
-                        let old_room = frm.doc.room;
-                        let new_room = values.new_room;
-
+                        // The server claims the new room before freeing the old one, and fails if it was just taken
                         frappe.call({
-                            method: "frappe.client.set_value",
+                            method: "havano_hotel_management.havano_hotel_management_system.doctype.room.room.move_room",
                             args: {
-                                doctype: "Room",
-                                name: old_room,
-                                fieldname: { status: "Available", current_checkin: "" }
+                                check_in: frm.doc.name,
+                                new_room: values.new_room
                             },
-                            callback: function() {
-                                frappe.call({
-                                    method: "frappe.client.set_value",
-                                    args: {
-                                        doctype: "Room",
-                                        name: new_room,
-                                        fieldname: { status: "Occupied", current_checkin: frm.doc.name }
-                                    },
-                                    callback: function() {
-                                        frm.set_value("room", new_room);
-                                        frm.save("Update").then(() => {
-                                            frappe.show_alert({
-                                                message: __("Room changed successfully."),
-                                                indicator: "green"
-                                            });
-                                            frm.reload_doc();
-                                        });
-                                    }
-                                });
+                            freeze: true,
+                            callback: function(r) {
+                                if (!r.exc) {
+                                    frappe.show_alert({
+                                        message: __("Room changed successfully."),
+                                        indicator: "green"
+                                    });
+                                    frm.reload_doc();
+                                }
                             }
                         });
                         d.hide();
@@ -4,6 +4,27 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import cint
+
+from havano_hotel_management.api import CHARGE_KEY_FIELD, get_charge_key, get_existing_charge_invoice
+from havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation import (
+    get_reservation_rooms,
+    set_arrival,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+    RoomStatusConflict,
+    transition_status,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import (
+    get_stay_totals,
+    is_folio_mode,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+    extend_stay,
+    get_stay_room_type,
+    update_stay_inventory,
+)
+from havano_hotel_management.instrumentation import instrument
 
 class CheckIn(Document):
     # def before_submit(self):
@@ -12,7 +33,30 @@ class CheckIn(Document):
         # 	if self.room:
         # 		frappe.db.set_value("Room", self.room, "status", "Occupied")
 
+    def on_submit(self):
+        if self.reservation:
+            set_arrival(self.reservation)
+        update_stay_inventory(self)
+
+    def on_update_after_submit(self):
+        # Extending a stay saves the new checkout date; the nights it adds are sold too
+        before = self.get_doc_before_save()
+        if before and before.check_out_date != self.check_out_date:
+            extend_stay(get_stay_room_type(self), before.check_out_date, self.check_out_date)
+
+    def on_cancel(self):
+        update_stay_inventory(self, -1)
+        if self.reservation:
+            # The reservation only counted its own nights; an extension counted the rest here
+            extend_stay(
+                get_stay_room_type(self),
+                self.check_out_date,
+                frappe.db.get_value("Reservation", self.reservation, "check_out_date"),
+            )
+            set_arrival(self.reservation, arrived=False)
+
     @frappe.whitelist()
+    @instrument
     def create_sales_invoice(self):
         try:
             # If doc is a string (when called via whitelist), convert to JSON
@@ -21,7 +65,21 @@ class CheckIn(Document):
             #     doc_name = self.get("name")
             # else:
             #     doc_name = self.name
-            
+
+            existing_invoice = get_existing_charge_invoice("Check In", self.name, "Room Charge")
+            if existing_invoice:
+                return {
+                    "sales_invoice": existing_invoice,
+                    "existing": True,
+                    "refresh": True
+                }
+
+            # Claim the room before invoicing; a room another stay got first is a conflict, not an overwrite
+            transition_status(
+                "Room", self.room, "Occupied", holder=self.name,
+                values={"current_guest": self.guest_name, "checkout_date": self.check_out_date},
+            )
+
             # Get room details
             room = frappe.get_doc("Room", self.room)
             
@@ -40,6 +98,7 @@ class CheckIn(Document):
             si.due_date = self.check_out_date
             si.company = company
             si.debit_to = debit_to
+            si.set(CHARGE_KEY_FIELD, get_charge_key("Check In", self.name, "Room Charge"))
             #si.set_warehouse = "Stores - H"
             
             # room_item = frappe.db.get_value("Room", self.room, "room_item")
@@ -71,9 +130,6 @@ class CheckIn(Document):
             si.submit()
             # self.reload()
             
-            # Update room status
-            frappe.db.set_value("Room", self.room, "status", "Occupied")
-            
             frappe.db.set_value("Check In", self.name, "sales_invoice_number", si.name)
 
             # self.save()
@@ -89,6 +145,8 @@ class CheckIn(Document):
                 "refresh": True
             }
             
+        except RoomStatusConflict:
+            raise
         except Exception as e:
             frappe.log_error(message=str(e), title="Error Creating Sales Invoice")
             frappe.throw(_("An error occurred while creating the Sales Invoice: {0}").format(str(e)))
@@ -96,6 +154,7 @@ class CheckIn(Document):
 
     #Additional Sales Invoice
     @frappe.whitelist()
+    @instrument
     def create_addtional_sales_invoice(self, amount):
         try:
             # If doc is a string (when called via whitelist), convert to JSON
@@ -168,21 +227,54 @@ class CheckIn(Document):
             frappe.throw(_("An error occurred while creating the Sales Invoice: {0}").format(str(e)))
 
 
+def on_doctype_update():
+    # The tape chart reads a room's stays by date range
+    frappe.db.add_index("Check In", ["room", "check_in_date"])
+
+
 @frappe.whitelist()
+@instrument
 def get_rooms_from_reservation(doctype, txt, searchfield, start, page_len, filters):
-    reservation = filters.get('reservation')
-    
-    # Query to get rooms from reservation
-    return frappe.db.sql("""
-        SELECT room.name, room.room_number, room.room_type
-        FROM `tabRoom` room
-        INNER JOIN `tabReservation Room` res_room ON room.name = res_room.room
-        WHERE res_room.parent = %s
-        AND (room.name LIKE %s OR room.room_number LIKE %s)
-    """, (reservation, "%" + txt + "%", "%" + txt + "%"))
+    """
+    Room link query for Check In. With a reservation, match the rooms it holds
+    from the cached candidate list; otherwise, or if it holds none, prefix-match
+    rooms that are not occupied. Both paths only use prefix matches, so the
+    name and room_number indexes serve the search.
+    """
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else (filters or {})
+    txt = (txt or "").strip()
+    start, page_len = cint(start), cint(page_len) or 20
+
+    if filters.get("reservation"):
+        rooms = get_reservation_rooms(filters.get("reservation"))
+        if rooms:
+            prefix = txt.lower()
+            matches = [
+                room for room in rooms
+                if room[0].lower().startswith(prefix) or (room[1] or "").lower().startswith(prefix)
+            ]
+            return matches[start:start + page_len]
+
+    prefix = txt.replace("%", "\\%").replace("_", "\\_") + "%"
+    status_condition = "status != 'Occupied'" if filters.get("reservation") else "status = 'Available'"
+    return frappe.db.sql(
+        f"""
+        SELECT name, room_number, room_type FROM (
+            SELECT name, room_number, room_type FROM `tabRoom`
+            WHERE name LIKE %(txt)s AND {status_condition}
+            UNION
+            SELECT name, room_number, room_type FROM `tabRoom`
+            WHERE room_number LIKE %(txt)s AND {status_condition}
+        ) rooms
+        ORDER BY name
+        LIMIT %(start)s, %(page_len)s
+    """,
+        {"txt": prefix, "start": start, "page_len": page_len},
+    )
 
 
 @frappe.whitelist()
+@instrument
 def get_general_ledger_entries(check_in):
     """Get General Ledger entries related to this Check In"""
     check_in_doc = frappe.get_doc("Check In", check_in)
@@ -206,3 +298,58 @@ def get_general_ledger_entries(check_in):
         "data": data
     }
 
+
+def get_item_rate(item_code, price_list):
+    if not (item_code and price_list):
+        return None
+    return frappe.db.get_value(
+        "Item Price", {"item_code": item_code, "price_list": price_list, "selling": 1}, "price_list_rate"
+    )
+
+
+@frappe.whitelist()
+@instrument
+def get_room_rate(room, price_list=None):
+    """Room status, item and the rate to charge, falling back to the room price."""
+    room_data = frappe.db.get_value("Room", room, ["status", "room_item", "price", "room_type"], as_dict=True)
+    if not room_data:
+        return None
+
+    room_data.price_list_rate = get_item_rate(room_data.room_item, price_list)
+    room_data.rate = room_data.price_list_rate or room_data.price
+    return room_data
+
+
+@frappe.whitelist()
+@instrument
+def get_check_in_context(name):
+    """Everything the Check In form needs on load, in one round trip."""
+    doc = frappe.db.get_value(
+        "Check In",
+        name,
+        ["name", "docstatus", "room", "reservation", "price_list", "sales_invoice_number", "sales_invoice_status"],
+        as_dict=True,
+    )
+    if not doc:
+        frappe.throw(_("Check In {0} not found").format(name), frappe.DoesNotExistError)
+
+    context = frappe._dict(
+        room=get_room_rate(doc.room, doc.price_list) if doc.room else None,
+        reservation_room=frappe.db.get_value("Reservation", doc.reservation, "room") if doc.reservation else None,
+        check_out=frappe.db.get_value("Check Out", {"check_in": name, "docstatus": ["<", 2]}, "name"),
+        totals=get_stay_totals("Check In", name, doc.sales_invoice_number),
+        folio_mode=is_folio_mode(),
+    )
+
+    context.invoice_outstanding = None
+    if doc.sales_invoice_number:
+        context.invoice_outstanding = frappe.db.get_value(
+            "Sales Invoice", doc.sales_invoice_number, "outstanding_amount"
+        )
+    paid = context.invoice_outstanding is not None and context.invoice_outstanding <= 0
+    context.sales_invoice_status = ("Paid" if paid else "Unpaid") if doc.sales_invoice_number else None
+    context.payment_status_stale = bool(doc.sales_invoice_number) and (
+        (doc.sales_invoice_status == "Paid") != paid
+    )
+
+    return context
@@ -14,7 +14,7 @@ frappe.ui.form.on("Check Out", {
 
 	refresh(frm) {
         $('.dropdown-menu > li:last-child').hide();
-        if(frm.is_new()) get_balance_from_general_ledger(frm);
+        if(frm.is_new()) get_checkout_summary(frm);
         // if(!frm.is_new() && frm.doc.docstatus != 1 && !frm.doc.payment_entry){
         //     frm.add_custom_button(__('Make Payment'), function() {
         //         create_payment_for_sales_invoice(frm.doc.sales_invoice_number)
@@ -84,151 +84,38 @@ frappe.ui.form.on("Check Out", {
     // },
     
     on_submit(frm){
-        frappe.call({
-            method: "frappe.client.set_value",
-            args: {
-                doctype: "Room",
-                name: frm.doc.room,
-                fieldname: {
-                    "name": frm.doc.room,
-                    "status": "Available",
-                    "current_checkin": "",
-                    "current_guest": "",
-                    "checkout_date": "",
-                    "checkout_status": "",
-                },
-            },
-            callback: function() {
-                frappe.call({
-                    method: "frappe.client.set_value",
-                    args: {
-                        doctype: "Check In",
-                        name: frm.doc.check_in,
-                        fieldname: {
-                            "actual_checkout_date": frm.doc.actual_check_out_time,
-                            // "total_charge": frm.doc.total_charges,
-                            // "balance_due": frm.doc.balance_due
-                        }
-                    },
-                    callback: function(r) {
-                        if (r.message) {
-                            frappe.show_alert({
-                                message: __("Room {0} is now availablefd", [frm.doc.room]),
-                                indicator: 'green'
-                            });
-                            // if(frm.doc.payment_entry){
-                            //     frappe.call({
-                            //         method: "frappe.client.set_value",
-                            //         args: {
-                            //             doctype: "Check In",
-                            //             name: frm.doc.check_in,
-                            //             fieldname: "payment_entry",
-                            //             value: frm.doc.payment_entry
-                            //         },
-                            //         callback: function(r) {
-                            //             if (r.message) {
-                            //                 frappe.show_alert({
-                            //                     message: __("Payment Entry Updated for checkin"),
-                            //                     indicator: 'green'
-                            //                 });
-                                            
-                            //             }
-                            //         }
-                            //     });
-                            // }
-                        }
-                    }
-                });
-               
-            }
-        });
-
-        
+        // The room is released and the stay closed on the server when the Check Out is submitted
         frappe.show_alert({
-            message: __("Guest checked out successfullys"),
+            message: __("Guest checked out successfully"),
             indicator: 'green'
         });
     }
 });
 
-function get_balance_from_general_ledger(frm) {
-    // Use default company if not specified in the form
-    let company = frm.doc.company || frappe.defaults.get_default("company") || "Havano";
-    
-    if (!frm.doc.guest) {
-        frappe.throw(__("Please select a Guest first"));
+function get_checkout_summary(frm) {
+    if (!frm.doc.check_in) {
         return;
     }
-    
-    // Get check-in date from the check_in document
+
+    // Totals come from the stay's invoices and folio, not from running the General Ledger
     frappe.call({
-        method: "frappe.client.get",
+        method: "havano_hotel_management.havano_hotel_management_system.doctype.check_out.check_out.get_checkout_summary",
         args: {
-            doctype: "Check In",
-            name: frm.doc.check_in
+            check_in: frm.doc.check_in
         },
         callback: function(r) {
-            if (r.message) {
-                let check_in_doc = r.message;
-                let from_date = check_in_doc.check_in_date;
-                let to_date = check_in_doc.check_out_date;
-                
-                // Query General Ledger for balance
-                frappe.call({
-                    method: "frappe.desk.query_report.run",
-                    args: {
-                        report_name: "General Ledger",
-                        filters: {
-                            company: company,
-                            from_date: frappe.datetime.obj_to_str(frappe.datetime.str_to_obj(from_date)),
-                            to_date: frappe.datetime.obj_to_str(frappe.datetime.str_to_obj(to_date ||frappe.datetime.get_today())),
-                            party_type: "Customer",
-                            party: [frm.doc.guest], // Ensure proper JSON formatting
-                            // group_by: "Group by Voucher (Consolidated)"
-                        }
-                    },
-                    callback: function(r) {
-                        if (r.message && r.message.result && r.message.result.length > 0) {
-                            let result = r.message.result;
-                            
-                            // Get the last row with a balance (which should be the final balance)
-                            let lastRowWithBalance = null;
-                            
-                            // Loop through the results in reverse to find the last row with a balance
-                            for (let i = result.length - 1; i >= 0; i--) {
-                                if (result[i].balance !== undefined) {
-                                    lastRowWithBalance = result[i];
-                                    break;
-                                }
-                            }
-                            
-                            if (lastRowWithBalance) {                                
-                                // Use the balance from the last row
-                                let final_balance = Math.abs(flt(lastRowWithBalance.balance));
-                                
-                                // Set the balance_due field
-                                frm.set_value("balance_due", final_balance);
-                                frm.refresh_field("balance_due");
-                                frappe.show_alert({
-                                    message: __("Balance updated from General Ledger"),
-                                    indicator: 'green'
-                                });
-                            } else {
-                                frappe.show_alert({
-                                    message: __("No balance found in General Ledger entries"),
-                                    indicator: 'orange'
-                                });
-                                frm.set_value("balance_due", 0);
-                            }
-                        } else {
-                            frappe.show_alert({
-                                message: __("No General Ledger entries found for this guest"),
-                                indicator: 'orange'
-                            });
-                            frm.set_value("balance_due", 0);
-                        }
-                    }
-                });
+            if (!r.message) return;
+
+            let summary = r.message;
+            frm.set_value("total_charges", summary.total_charges);
+            frm.set_value("payment_collected", summary.payment_collected);
+            frm.set_value("balance_due", summary.balance_due);
+            frm.set_value("days_stayed", String(summary.days_stayed));
+            if (summary.room_folio) {
+                frm.set_value("room_folio", summary.room_folio);
+            }
+            if (summary.sales_invoice_number) {
+                frm.set_value("sales_invoice_number", summary.sales_invoice_number);
             }
         }
     });
@@ -1,9 +1,242 @@
 # Copyright (c) 2025, Alphazen Technologies and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import date_diff, flt, getdate, now_datetime, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.housekeeping.housekeeping import (
+	DEPARTURE,
+	create_departure_task,
+	create_tasks,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+	transition_status,
+	update_derived_fields,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import (
+	FOLIO_FIELD,
+	get_stay_totals,
+	post_stay_folio,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+	release_early_departure,
+)
+from havano_hotel_management.instrumentation import instrument
 
 
 class CheckOut(Document):
-	pass
+	def on_submit(self):
+		if self.flags.express_checkout:
+			# run_express_checkout releases rooms and queues housekeeping for the whole batch
+			return
+
+		if self.check_in:
+			frappe.db.set_value("Check In", self.check_in, "actual_checkout_date", self.actual_check_out_time or now_datetime())
+		release_early_departure(self)
+		if self.room:
+			# A room someone else has already been checked into is left alone
+			transition_status("Room", self.room, "Available", holder=self.check_in, raise_exception=False)
+
+		create_departure_task(self)
+		if self.check_in:
+			post_stay_folio("Check In", self.check_in)
+
+
+@frappe.whitelist()
+@instrument
+def get_checkout_summary(check_in):
+	"""Charges, payments, outstanding and days stayed for a Check In, from its invoices."""
+	stay = frappe.db.get_value(
+		"Check In", check_in, ["name", "check_in_date", "sales_invoice_number"], as_dict=True
+	)
+	if not stay:
+		frappe.throw(_("Check In {0} not found").format(check_in), frappe.DoesNotExistError)
+
+	totals = get_stay_totals("Check In", check_in, stay.sales_invoice_number)
+	return {
+		"total_charges": totals.charges,
+		"payment_collected": totals.payments,
+		"balance_due": totals.outstanding,
+		"days_stayed": max(1, date_diff(today(), getdate(stay.check_in_date))),
+		"room_folio": totals.room_folio,
+		"sales_invoice_number": stay.sales_invoice_number,
+	}
+
+
+@frappe.whitelist()
+@instrument
+def express_checkout(date=None):
+	"""Queue a checkout of every zero-balance departure due on `date` (default today)."""
+	if not frappe.has_permission("Check Out", "submit"):
+		frappe.throw(_("Not permitted to submit Check Out"), frappe.PermissionError)
+
+	date = str(getdate(date or today()))
+	frappe.enqueue(
+		"havano_hotel_management.havano_hotel_management_system.doctype.check_out.check_out.run_express_checkout",
+		queue="long",
+		timeout=1800,
+		job_id=f"hotel_express_checkout::{frappe.local.site}::{date}",
+		deduplicate=True,
+		date=date,
+	)
+	return {"queued": True, "date": date}
+
+
+def get_express_departures(date):
+	"""
+	Submitted stays departing on `date` that are not checked out yet, with
+	their charges and outstanding summed from invoices and unbilled folio rows.
+	"""
+	stays = frappe.db.sql(
+		"""
+		SELECT ci.name, ci.room, ci.guest_name, ci.check_in_date, ci.sales_invoice_number,
+			folio.name AS room_folio
+		FROM `tabCheck In` ci
+		LEFT JOIN `tabRoom Folio` folio
+			ON folio.reference_doctype = 'Check In' AND folio.reference_name = ci.name
+		WHERE ci.docstatus = 1
+			AND ci.check_out_date = %(date)s
+			AND ci.actual_checkout_date IS NULL
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabCheck Out` co
+				WHERE co.check_in = ci.name AND co.docstatus = 1
+			)
+		ORDER BY ci.room
+	""",
+		{"date": date},
+		as_dict=True,
+	)
+	if not stays:
+		return []
+
+	invoices = {stay.sales_invoice_number: stay for stay in stays if stay.sales_invoice_number}
+	folios = {stay.room_folio: stay for stay in stays if stay.room_folio}
+	for stay in stays:
+		stay.update(charges=0, outstanding=0, unbilled=0)
+
+	# An invoice can match both by name and by folio; count it once
+	for invoice in frappe.db.sql(
+		f"""
+		SELECT name, {FOLIO_FIELD} AS room_folio,
+			IF(rounded_total, base_rounded_total, base_grand_total) AS total, outstanding_amount
+		FROM `tabSales Invoice`
+		WHERE docstatus = 1
+			AND (name IN %(invoices)s OR {FOLIO_FIELD} IN %(folios)s)
+	""",
+		{"invoices": tuple(invoices) or ("",), "folios": tuple(folios) or ("",)},
+		as_dict=True,
+	):
+		stay = invoices.get(invoice.name) or folios.get(invoice.room_folio)
+		stay.charges += flt(invoice.total)
+		stay.outstanding += flt(invoice.outstanding_amount)
+
+	if folios:
+		for folio, amount in frappe.db.sql(
+			"""
+			SELECT parent, SUM(amount)
+			FROM `tabTransactions Child Table`
+			WHERE parenttype = 'Room Folio' AND parent IN %(folios)s AND IFNULL(sales_invoice, '') = ''
+			GROUP BY parent
+		""",
+			{"folios": tuple(folios)},
+		):
+			folios[folio].unbilled = flt(amount)
+
+	return stays
+
+
+def run_express_checkout(date, batch_size=50):
+	"""
+	Background job behind express_checkout. Submits one Check Out per
+	zero-balance departure, then releases the rooms, stamps the stays and
+	queues departure cleaning for each batch with set-based updates.
+	"""
+	result = {"date": date, "checked_out": [], "skipped": [], "failed": []}
+	departures = []
+	for stay in get_express_departures(date):
+		# Anything still owed, or unbilled folio charges, needs the regular checkout at the desk
+		if flt(stay.outstanding, 2) > 0 or flt(stay.unbilled, 2):
+			result["skipped"].append({"check_in": stay.name, "room": stay.room, "balance": flt(stay.outstanding + stay.unbilled, 2)})
+		else:
+			departures.append(stay)
+
+	for start in range(0, len(departures), batch_size):
+		checked_out = {}
+		for stay in departures[start : start + batch_size]:
+			try:
+				frappe.db.savepoint("express_checkout")
+				checked_out[stay.name] = (stay.room, make_express_check_out(stay))
+			except Exception:
+				frappe.db.rollback(save_point="express_checkout")
+				frappe.log_error(title=_("Express checkout failed for {0}").format(stay.name))
+				result["failed"].append({"check_in": stay.name, "room": stay.room})
+
+		release_stays(checked_out)
+		frappe.db.commit()
+		result["checked_out"].extend(check_out for room, check_out in checked_out.values())
+
+	frappe.publish_realtime("hotel_express_checkout", result, user=frappe.session.user)
+	return result
+
+
+def make_express_check_out(stay):
+	check_out = frappe.get_doc(
+		{
+			"doctype": "Check Out",
+			"check_in": stay.name,
+			"guest": stay.guest_name,
+			"room": stay.room,
+			"room_folio": stay.room_folio,
+			"sales_invoice_number": stay.sales_invoice_number,
+			"actual_check_out_time": now_datetime(),
+			"total_charges": stay.charges,
+			"payment_collected": stay.charges - stay.outstanding,
+			"balance_due": stay.outstanding,
+			"days_stayed": str(max(1, date_diff(today(), getdate(stay.check_in_date)))),
+			"room_condition": "Dirty",
+			"check_out_by": frappe.session.user,
+		}
+	)
+	check_out.flags.express_checkout = True
+	check_out.insert()
+	check_out.submit()
+	return check_out.name
+
+
+def release_stays(checked_out):
+	"""Free the rooms and stamp the stays of {check_in: (room, check_out)} in a few statements."""
+	if not checked_out:
+		return
+
+	now = now_datetime()
+	check_ins = tuple(checked_out)
+	rooms = [room for room, check_out in checked_out.values() if room]
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabCheck In`
+		SET actual_checkout_date = %(now)s, modified = %(now)s
+		WHERE name IN %(check_ins)s
+	""",
+		{"now": now, "check_ins": check_ins},
+	)
+	if not rooms:
+		return
+
+	# Only a room these stays still occupy is freed; one since reserved or re-let keeps its holder
+	frappe.db.sql(
+		"""
+		UPDATE `tabRoom`
+		SET status = 'Available', current_checkin = NULL, current_guest = NULL,
+			checkout_date = NULL, checkout_status = NULL, modified = %(now)s
+		WHERE name IN %(rooms)s AND status = 'Occupied'
+			AND (IFNULL(current_checkin, '') = '' OR current_checkin IN %(check_ins)s)
+	""",
+		{"now": now, "rooms": tuple(rooms), "check_ins": check_ins},
+	)
+	update_derived_fields(rooms)
+	create_tasks(
+		rooms, DEPARTURE, "Check Out", {room: check_out for room, check_out in checked_out.values() if room}
+	)
@@ -2,5 +2,41 @@ frappe.listview_settings['Check Out'] = {
     onload: function(listview) {
         // Hide the "Add Check Out" button when list view loads
         $('.primary-action').hide();
+
+        listview.page.add_inner_button(__('Express Checkout'), function() {
+            frappe.confirm(
+                __("Check out every departure due today that has nothing left to pay? Rooms are released and queued for cleaning."),
+                function() {
+                    frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.check_out.check_out.express_checkout")
+                        .then(() => {
+                            frappe.show_alert({
+                                message: __("Express checkout started. You will be notified when it finishes."),
+                                indicator: 'blue'
+                            });
+                        });
+                }
+            );
+        });
+
+        frappe.realtime.off("hotel_express_checkout");
+        frappe.realtime.on("hotel_express_checkout", function(result) {
+            let message = __("{0} guests checked out.", [result.checked_out.length]);
+            if (result.skipped.length) {
+                message += "<br>" + __("Skipped with a balance due: {0}", [
+                    result.skipped.map(row => `${row.room || row.check_in} (${format_currency(row.balance)})`).join(", ")
+                ]);
+            }
+            if (result.failed.length) {
+                message += "<br>" + __("Failed, see Error Log: {0}", [
+                    result.failed.map(row => row.room || row.check_in).join(", ")
+                ]);
+            }
+            frappe.msgprint({
+                title: __("Express Checkout {0}", [frappe.datetime.str_to_user(result.date)]),
+                message: message,
+                indicator: result.failed.length ? 'orange' : 'green'
+            });
+            listview.refresh();
+        });
     }
 };
@@ -4,6 +4,10 @@
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from frappe.utils import cint
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import get_hotel_settings
+from havano_hotel_management.instrumentation import instrument
 
 
 class HotelGuest(Document):
@@ -20,7 +24,7 @@ class HotelGuest(Document):
 			# Check if a Customer already exists for this Guest
 			# if not frappe.db.exists("Customer", {"customer_name": self.full_name}):
 				# Create a new Customer linked to the Hotel Guest
-			hotel_customer_group = frappe.db.get_single_value("Hotel Settings", "hotel_customer_group")
+			hotel_customer_group = get_hotel_settings().hotel_customer_group
 
 			new_customer = frappe.get_doc({
 				"doctype": "Customer",
@@ -54,7 +58,8 @@ class HotelGuest(Document):
 import frappe
 
 @frappe.whitelist()
-def get_guest_ledger(guest):
+@instrument
+def get_guest_ledger(guest, include_archived=0):
     if not guest:
         return {"ledger": [], "guest_history": []}
     
@@ -122,6 +127,9 @@ def get_guest_ledger(guest):
             check_out_date DESC
     """, guest, as_dict=True)
 
+    if cint(include_archived):
+        add_archived_stays(guest, reservations, check_ins, check_outs)
+
     # Create a comprehensive guest history
     guest_history = []
 
@@ -228,6 +236,35 @@ def get_guest_ledger(guest):
         "guest_history": guest_history
     }
 
+
+def add_archived_stays(guest, reservations, check_ins, check_outs):
+    """Append the guest's stays from Stay Archive in the shape of the live rows."""
+    for row in frappe.get_all(
+        "Stay Archive",
+        filters={"guest": guest, "reference_doctype": ["in", ["Reservation", "Check In", "Check Out"]]},
+        fields=[
+            "reference_doctype", "reference_name", "room", "reservation", "check_in",
+            "check_in_date", "check_out_date", "closed_on", "amount",
+        ],
+        order_by="check_in_date desc",
+    ):
+        if row.reference_doctype == "Reservation":
+            reservations.append(frappe._dict(
+                reservation=row.reference_name, room=row.room,
+                check_in_date=row.check_in_date, check_out_date=row.check_out_date,
+            ))
+        elif row.reference_doctype == "Check In":
+            check_ins.append(frappe._dict(
+                check_in_id=row.reference_name, reservation=row.reservation, room=row.room,
+                check_in_date=row.check_in_date, total_charge=row.amount, actual_checkout_date=row.closed_on,
+            ))
+        else:
+            check_outs.append(frappe._dict(
+                check_out_id=row.reference_name, check_in=row.check_in,
+                check_out_date=row.check_out_date, actual_check_out_time=row.check_out_date,
+            ))
+
+
 # if not guest:
 #     return []
 
@@ -249,4 +286,5 @@ def get_guest_ledger(guest):
 #         posting_date ASC
 # """, guest, as_dict=True)
 
-# return ledger_entries
\ No newline at end of file
+# return ledger_entries
+
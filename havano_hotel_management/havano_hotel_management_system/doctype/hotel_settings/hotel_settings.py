@@ -1,9 +1,76 @@
 # Copyright (c) 2025, Alphazen Technologies and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import cint, cstr
+
+CACHE_KEY = "hotel_settings"
+VERSION_KEY = "hotel_settings_version"
+
+# fieldname -> type the value is read as
+SETTINGS = {
+	"default_check_out_time": cstr,
+	"allow_overbooking": cint,
+	"use_forecast_overbooking": cint,
+	"overbooking_history_days": cint,
+	"allow_early_check_in__check_out_without_extra_cost": cint,
+	"permit_checkout_with_due": cint,
+	"consolidate_folio_charges": cint,
+	"hotel_customer_group": cstr,
+	"hotel_item_group": cstr,
+	"housekeeping_department": cstr,
+	"departure_clean_minutes": cint,
+	"stay_over_clean_minutes": cint,
+	"archive_stays_after_months": cint,
+}
+
+# site -> (version, settings), shared by every request this worker serves
+_worker_cache = {}
 
 
 class HotelSettings(Document):
-	pass
+	def on_update(self):
+		clear_hotel_settings_cache()
+
+
+def get_hotel_settings():
+	"""
+	Hotel Settings as a typed dict. Read once per request; between requests
+	the worker keeps its copy for as long as the version in Redis matches.
+	"""
+	settings = getattr(frappe.local, "hotel_settings", None)
+	if settings is not None:
+		return settings
+
+	cache = frappe.cache()
+	version = cache.get_value(VERSION_KEY)
+	cached = _worker_cache.get(frappe.local.site)
+	if version and cached and cached[0] == version:
+		settings = cached[1]
+	else:
+		settings = cache.get_value(CACHE_KEY) if version else None
+		if settings is None:
+			settings = load_hotel_settings()
+			version = frappe.generate_hash(length=10)
+			cache.set_value(CACHE_KEY, settings)
+			cache.set_value(VERSION_KEY, version)
+		_worker_cache[frappe.local.site] = (version, settings)
+
+	frappe.local.hotel_settings = settings = frappe._dict(settings)
+	return settings
+
+
+def load_hotel_settings():
+	values = frappe.db.get_singles_dict("Hotel Settings")
+	return {fieldname: to_type(values.get(fieldname)) for fieldname, to_type in SETTINGS.items()}
+
+
+def clear_hotel_settings_cache():
+	# Dropping the version makes every worker reload on its next request
+	frappe.cache().delete_value([CACHE_KEY, VERSION_KEY])
+	frappe.local.hotel_settings = None
+
+
+def boot_session(bootinfo):
+	bootinfo.hotel_settings = get_hotel_settings()
@@ -6,16 +6,3 @@
 
 // 	},
 // });
-
-frappe.listview_settings['Housekeeping'] = {
-    add_fields: ["room", "cleaning_status", "last_cleaned", "assigned_staff"],
-    get_indicator: function (doc) {
-        if (doc.cleaning_status === "Clean") {
-            return [__("Clean"), "green", "cleaning_status,=,Clean"];
-        } else if (doc.cleaning_status === "Dirty") {
-            return [__("Dirty"), "red", "cleaning_status,=,Dirty"];
-        } else if (doc.cleaning_status === "Out of Order") {
-            return [__("Out of Order"), "orange", "cleaning_status,=,Out of Order"];
-        }
-    }
-};
\ No newline at end of file
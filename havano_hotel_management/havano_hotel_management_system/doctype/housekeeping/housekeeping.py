@@ -1,9 +1,334 @@
 # Copyright (c) 2025, Alphazen Technologies and contributors
 # For license information, please see license.txt
 
-# import frappe
+import heapq
+from collections import defaultdict
+from datetime import datetime
+
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import add_days, add_to_date, cint, get_datetime, now_datetime, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import get_hotel_settings
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+	refresh_room_counts,
+)
+from havano_hotel_management.instrumentation import instrument
+
+DEPARTURE = "Departure"
+STAY_OVER = "Stay Over"
 
 
 class Housekeeping(Document):
 	pass
+
+
+class HousekeepingDispatcher:
+	"""Per-floor work queues drained by due time and arrival urgency.
+
+	Each task goes to the least loaded staff member, with a small preference
+	for staff already working on the same floor so cleaners are not sent up
+	and down the building for the sake of a few minutes of balance.
+	"""
+
+	def __init__(self, staff_load, affinity_slack=15):
+		# staff_load: {employee: minutes already assigned}
+		self.load = dict(staff_load)
+		self.affinity_slack = affinity_slack
+		self.floors = defaultdict(list)
+		self.staff = [(load, name) for name, load in self.load.items()]
+		heapq.heapify(self.staff)
+		self.floor_staff = defaultdict(list)
+		self._seq = 0
+
+	def add(self, task, floor=None, due_time=None, arrival_urgency=0, minutes=30):
+		self._seq += 1
+		heapq.heappush(
+			self.floors[floor or ""],
+			(due_time or datetime.max, -cint(arrival_urgency), self._seq, task, cint(minutes)),
+		)
+
+	def dispatch(self):
+		"""Return {task: employee} for every queued task."""
+		if not self.load:
+			return {}
+
+		heads = [queue[0][:3] + (floor,) for floor, queue in self.floors.items() if queue]
+		heapq.heapify(heads)
+
+		assignments = {}
+		while heads:
+			floor = heapq.heappop(heads)[3]
+			queue = self.floors[floor]
+			task, minutes = heapq.heappop(queue)[3:]
+			assignments[task] = self._pick_staff(floor, minutes)
+			if queue:
+				heapq.heappush(heads, queue[0][:3] + (floor,))
+
+		return assignments
+
+	def _pick_staff(self, floor, minutes):
+		load, name = self._peek(self.staff)
+		on_floor = self._peek(self.floor_staff[floor])
+		if on_floor and on_floor[0] <= load + self.affinity_slack:
+			load, name = on_floor
+
+		self.load[name] = load + minutes
+		heapq.heappush(self.staff, (self.load[name], name))
+		heapq.heappush(self.floor_staff[floor], (self.load[name], name))
+		return name
+
+	def _peek(self, heap):
+		# Entries are pushed on every assignment; drop the stale ones lazily
+		while heap:
+			load, name = heap[0]
+			if self.load[name] == load:
+				return heap[0]
+			heapq.heappop(heap)
+
+
+def get_clean_minutes(task_type):
+	fieldname = "departure_clean_minutes" if task_type == DEPARTURE else "stay_over_clean_minutes"
+	return get_hotel_settings()[fieldname] or (45 if task_type == DEPARTURE else 20)
+
+
+def get_todays_arrivals(rooms=None):
+	"""Return {room: arrival datetime} for reservations arriving today."""
+	conditions = ""
+	values = {"start": today(), "end": add_days(today(), 1)}
+	if rooms:
+		conditions = "AND room IN %(rooms)s"
+		values["rooms"] = tuple(rooms)
+
+	return dict(
+		frappe.db.sql(
+			f"""
+			SELECT room, MIN(check_in_date)
+			FROM `tabReservation`
+			WHERE docstatus = 1
+				AND room IS NOT NULL
+				AND check_in_date >= %(start)s AND check_in_date < %(end)s
+				{conditions}
+			GROUP BY room
+		""",
+			values,
+		)
+	)
+
+
+def create_tasks(rooms, task_type, reference_doctype=None, references=None):
+	"""Bulk insert open housekeeping tasks for `rooms` and mark them Dirty.
+
+	`references` optionally maps room -> reference document name.
+	"""
+	if not rooms:
+		return []
+
+	rooms = list(dict.fromkeys(rooms))
+	references = references or {}
+	floors = dict(frappe.get_all("Room", filters={"name": ["in", rooms]}, fields=["name", "floor"], as_list=True))
+	arrivals = get_todays_arrivals(rooms)
+	minutes = get_clean_minutes(task_type)
+
+	now = now_datetime()
+	end_of_day = get_datetime(f"{today()} 23:59:59")
+	default_due = add_to_date(now, hours=4) if task_type == DEPARTURE else end_of_day
+
+	names, values = [], []
+	for room in rooms:
+		name = frappe.generate_hash(length=10)
+		names.append(name)
+		arrival = arrivals.get(room)
+		values.append(
+			(
+				name, now, now, frappe.session.user, frappe.session.user, 0,
+				room, floors.get(room), task_type, "Open", "Dirty",
+				min(get_datetime(arrival), default_due) if arrival else default_due,
+				1 if arrival else 0, minutes,
+				reference_doctype if references.get(room) else None, references.get(room),
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Housekeeping",
+		fields=[
+			"name", "creation", "modified", "owner", "modified_by", "docstatus",
+			"room", "floor", "task_type", "status", "cleaning_status",
+			"due_time", "arrival_expected", "estimated_minutes",
+			"reference_doctype", "reference_name",
+		],
+		values=values,
+	)
+	set_rooms_housekeeping_status(rooms, "Dirty")
+	return names
+
+
+def set_rooms_housekeeping_status(rooms, status):
+	if not rooms:
+		return
+
+	# Rooms going into or coming out of order change how many of their type can be sold
+	room_types = frappe.get_all(
+		"Room",
+		filters={"name": ["in", list(set(rooms))], "housekeeping_status": ["!=" if status == "Out of Order" else "=", "Out of Order"]},
+		pluck="room_type",
+	)
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabRoom`
+		SET housekeeping_status = %(status)s,
+			last_cleaned_date = IF(%(status)s = 'Clean', %(today)s, last_cleaned_date),
+			modified = %(now)s
+		WHERE name IN %(rooms)s
+	""",
+		{"status": status, "today": today(), "now": now_datetime(), "rooms": tuple(set(rooms))},
+	)
+	if room_types:
+		refresh_room_counts(room_types)
+
+
+def create_departure_task(check_out):
+	"""Turn a submitted Check Out into a housekeeping task based on `room_condition`."""
+	if not check_out.room:
+		return
+
+	if check_out.room_condition == "Clean":
+		return
+	if check_out.room_condition == "Maintenance":
+		set_rooms_housekeeping_status([check_out.room], "Out of Order")
+		return
+
+	create_tasks([check_out.room], DEPARTURE, "Check Out", {check_out.room: check_out.name})
+
+
+def generate_stay_over_tasks():
+	"""Daily job: one Stay Over task per occupied room that is not departing today."""
+	rooms = frappe.db.sql_list(
+		"""
+		SELECT room.name
+		FROM `tabRoom` room
+		WHERE room.status = 'Occupied'
+			AND (room.checkout_date IS NULL OR room.checkout_date > %(today)s)
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabHousekeeping` hk
+				WHERE hk.room = room.name
+					AND hk.status != 'Completed'
+			)
+	""",
+		{"today": today()},
+	)
+	references = dict(
+		frappe.get_all(
+			"Room", filters={"name": ["in", rooms]}, fields=["name", "current_checkin"], as_list=True
+		)
+	) if rooms else {}
+	create_tasks(rooms, STAY_OVER, "Check In", {r: c for r, c in references.items() if c})
+
+
+def get_housekeeping_staff():
+	department = get_hotel_settings().housekeeping_department
+	filters = {"status": "Active"}
+	if department:
+		filters["department"] = department
+	return frappe.get_all("Employee", filters=filters, pluck="name")
+
+
+@frappe.whitelist()
+@instrument
+def dispatch_housekeeping_tasks():
+	"""Assign every open task to staff and record the assignment in bulk."""
+	frappe.has_permission("Housekeeping", "write", throw=True)
+	staff = get_housekeeping_staff()
+	if not staff:
+		frappe.throw(_("No active housekeeping staff found. Set the Housekeeping Department in Hotel Settings."))
+
+	staff_load = dict.fromkeys(staff, 0)
+	for employee, minutes in frappe.db.sql(
+		"""
+		SELECT assigned_staff, SUM(IFNULL(estimated_minutes, 0))
+		FROM `tabHousekeeping`
+		WHERE status = 'Assigned' AND assigned_staff IN %(staff)s
+		GROUP BY assigned_staff
+	""",
+		{"staff": tuple(staff)},
+	):
+		staff_load[employee] = cint(minutes)
+
+	tasks = frappe.get_all(
+		"Housekeeping",
+		filters={"status": "Open"},
+		fields=["name", "floor", "due_time", "arrival_expected", "estimated_minutes"],
+	)
+
+	dispatcher = HousekeepingDispatcher(staff_load)
+	for task in tasks:
+		dispatcher.add(
+			task.name,
+			floor=task.floor,
+			due_time=get_datetime(task.due_time) if task.due_time else None,
+			arrival_urgency=task.arrival_expected,
+			minutes=task.estimated_minutes,
+		)
+	assignments = dispatcher.dispatch()
+
+	by_staff = defaultdict(list)
+	for task, employee in assignments.items():
+		by_staff[employee].append(task)
+
+	now = now_datetime()
+	for employee, names in by_staff.items():
+		frappe.db.sql(
+			"""
+			UPDATE `tabHousekeeping`
+			SET assigned_staff = %(employee)s, status = 'Assigned', modified = %(now)s
+			WHERE name IN %(names)s AND status = 'Open'
+		""",
+			{"employee": employee, "now": now, "names": tuple(names)},
+		)
+
+	return {"assigned": len(assignments), "staff": {e: len(t) for e, t in by_staff.items()}}
+
+
+@frappe.whitelist()
+@instrument
+def complete_housekeeping_tasks(tasks):
+	"""
+	Mark tasks completed and flip their rooms to Clean in one pass. A room
+	that still has another task open or assigned stays as it is.
+	"""
+	frappe.has_permission("Housekeeping", "write", throw=True)
+	tasks = frappe.parse_json(tasks) if isinstance(tasks, str) else tasks
+	if not tasks:
+		return {"completed": 0, "rooms": 0}
+
+	pending = frappe.get_all(
+		"Housekeeping", filters={"name": ["in", tasks], "status": ["!=", "Completed"]}, fields=["name", "room"]
+	)
+	if not pending:
+		return {"completed": 0, "rooms": 0}
+
+	now = now_datetime()
+	frappe.db.sql(
+		"""
+		UPDATE `tabHousekeeping`
+		SET status = 'Completed', cleaning_status = 'Clean', last_cleaned = %(now)s, modified = %(now)s
+		WHERE name IN %(tasks)s AND status != 'Completed'
+	""",
+		{"now": now, "tasks": tuple(task.name for task in pending)},
+	)
+
+	rooms = {task.room for task in pending if task.room}
+	if rooms:
+		rooms -= set(
+			frappe.get_all(
+				"Housekeeping",
+				filters={"room": ["in", list(rooms)], "status": ["!=", "Completed"]},
+				pluck="room",
+				distinct=True,
+			)
+		)
+	set_rooms_housekeeping_status(list(rooms), "Clean")
+
+	return {"completed": len(pending), "rooms": len(rooms)}
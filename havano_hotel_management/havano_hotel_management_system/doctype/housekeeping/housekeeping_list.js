@@ -0,0 +1,48 @@
+frappe.listview_settings['Housekeeping'] = {
+    add_fields: ["room", "cleaning_status", "last_cleaned", "assigned_staff", "status", "floor"],
+    onload: function(listview) {
+        listview.page.add_inner_button(__("Dispatch Tasks"), function() {
+            frappe.call({
+                method: "havano_hotel_management.havano_hotel_management_system.doctype.housekeeping.housekeeping.dispatch_housekeeping_tasks",
+                freeze: true,
+                callback: function(r) {
+                    if (r.message) {
+                        frappe.show_alert({
+                            message: __("{0} tasks assigned", [r.message.assigned]),
+                            indicator: 'green'
+                        });
+                        listview.refresh();
+                    }
+                }
+            });
+        });
+
+        listview.page.add_actions_menu_item(__("Mark Completed"), function() {
+            const tasks = listview.get_checked_items(true);
+            if (!tasks.length) return;
+
+            frappe.call({
+                method: "havano_hotel_management.havano_hotel_management_system.doctype.housekeeping.housekeeping.complete_housekeeping_tasks",
+                args: { tasks: tasks },
+                callback: function(r) {
+                    if (r.message) {
+                        frappe.show_alert({
+                            message: __("{0} tasks completed, {1} rooms marked Clean", [r.message.completed, r.message.rooms]),
+                            indicator: 'green'
+                        });
+                        listview.refresh();
+                    }
+                }
+            });
+        });
+    },
+    get_indicator: function (doc) {
+        if (doc.cleaning_status === "Clean") {
+            return [__("Clean"), "green", "cleaning_status,=,Clean"];
+        } else if (doc.cleaning_status === "Dirty") {
+            return [__("Dirty"), "red", "cleaning_status,=,Dirty"];
+        } else if (doc.cleaning_status === "Out of Order") {
+            return [__("Out of Order"), "orange", "cleaning_status,=,Out of Order"];
+        }
+    }
+};
\ No newline at end of file
@@ -1,9 +1,37 @@
 # Copyright (c) 2025, Alphazen Technologies and Contributors
 # See license.txt
 
+from datetime import datetime, timedelta
+
 # import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from havano_hotel_management.havano_hotel_management_system.doctype.housekeeping.housekeeping import (
+	HousekeepingDispatcher,
+)
+
 
 class TestHousekeeping(FrappeTestCase):
-	pass
+	def test_dispatch_balances_load(self):
+		dispatcher = HousekeepingDispatcher({"EMP-1": 0, "EMP-2": 0, "EMP-3": 0})
+		for i in range(30):
+			dispatcher.add(f"T{i}", floor=f"F{i % 3}", minutes=30)
+
+		assignments = dispatcher.dispatch()
+
+		self.assertEqual(len(assignments), 30)
+		self.assertLessEqual(max(dispatcher.load.values()) - min(dispatcher.load.values()), 30)
+
+	def test_arrivals_and_due_time_go_first(self):
+		now = datetime(2026, 1, 1, 10)
+		dispatcher = HousekeepingDispatcher({"EMP-1": 0})
+		dispatcher.add("late", floor="F1", due_time=now + timedelta(hours=3))
+		dispatcher.add("arrival", floor="F2", due_time=now + timedelta(hours=3), arrival_urgency=1)
+		dispatcher.add("early", floor="F3", due_time=now + timedelta(hours=1))
+
+		self.assertEqual(list(dispatcher.dispatch()), ["early", "arrival", "late"])
+
+	def test_no_staff_assigns_nothing(self):
+		dispatcher = HousekeepingDispatcher({})
+		dispatcher.add("T1", floor="F1")
+		self.assertEqual(dispatcher.dispatch(), {})
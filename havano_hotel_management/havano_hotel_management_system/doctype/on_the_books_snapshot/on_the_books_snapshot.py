@@ -0,0 +1,69 @@
+# Copyright (c) 2026, Alphazen Technologies and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, date_diff, flt, getdate, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.stay_archive.stay_archive import pack, unpack
+
+SNAPSHOT_DAYS = 365
+
+
+class OnTheBooksSnapshot(Document):
+	pass
+
+
+def take_snapshot():
+	"""
+	Daily job: store the books as they stood at the end of yesterday, one
+	row per room type holding a year of nightly rooms sold and revenue as a
+	compressed payload, for pickup comparisons in the On The Books report.
+	"""
+	from havano_hotel_management.havano_hotel_management_system.report.on_the_books.on_the_books import (
+		get_on_the_books,
+		get_stays,
+	)
+
+	snapshot_date = getdate(add_days(today(), -1))
+	start = getdate(today())
+	books = get_on_the_books(get_stays(start, SNAPSHOT_DAYS), start, SNAPSHOT_DAYS)
+
+	frappe.db.delete("On The Books Snapshot", {"snapshot_date": snapshot_date})
+	for room_type, (sold, revenue) in books.items():
+		frappe.get_doc(
+			{
+				"doctype": "On The Books Snapshot",
+				"snapshot_date": snapshot_date,
+				"room_type": room_type,
+				"start_date": start,
+				"days": SNAPSHOT_DAYS,
+				"rooms_sold": sum(sold),
+				"revenue": flt(sum(revenue), 2),
+				"payload": pack({"sold": sold, "revenue": [flt(value, 2) for value in revenue]}),
+			}
+		).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+
+def load_snapshot(snapshot_date, start, days):
+	"""
+	room_type -> (rooms sold, revenue) per night from `start`, as stored on
+	`snapshot_date`, or None when no snapshot covers the whole window.
+	"""
+	snapshots = frappe.get_all(
+		"On The Books Snapshot",
+		filters={"snapshot_date": snapshot_date},
+		fields=["room_type", "start_date", "days", "payload"],
+	)
+	if not snapshots:
+		return None
+
+	books = {}
+	for snapshot in snapshots:
+		offset = date_diff(start, snapshot.start_date)
+		if offset < 0 or offset + days > snapshot.days:
+			return None
+		values = unpack(snapshot.payload)
+		books[snapshot.room_type] = (values["sold"][offset : offset + days], values["revenue"][offset : offset + days])
+	return books
@@ -0,0 +1,19 @@
+# Copyright (c) 2026, Alphazen Technologies and Contributors
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from havano_hotel_management.havano_hotel_management_system.report.on_the_books.on_the_books import sum_nights
+
+
+class TestOnTheBooksSnapshot(FrappeTestCase):
+	def test_nights_are_summed_per_room_type(self):
+		books = sum_nights(
+			[("Double", 0, 2, 100.0), ("Double", 1, 3, 80.0), ("Single", -2, 1, 50.0), ("Single", 3, 9, 50.0)],
+			4,
+		)
+
+		self.assertEqual(books["Double"], ([1, 2, 1, 0], [100.0, 180.0, 80.0, 0.0]))
+		# Stays are clipped to the window at both ends
+		self.assertEqual(books["Single"][0], [1, 0, 0, 1])
@@ -4,10 +4,14 @@
 frappe.ui.form.on("Reservation", {
     setup: function(frm) {
         frm.set_query("room", () => {
+            let filters = {
+                "status": ["not in", ["Occupied"]]
+            };
+            if (frm.doc.room_type) {
+                filters.room_type = frm.doc.room_type;
+            }
             return {
-                filters: {
-                    "status": ["not in", ["Occupied"]]
-                }
+                filters: filters
             }
         })
     },
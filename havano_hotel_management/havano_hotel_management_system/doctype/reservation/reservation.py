@@ -5,6 +5,25 @@
 from frappe.model.document import Document
 import frappe
 from frappe import _
+from frappe.utils import getdate, now_datetime, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import get_hotel_settings
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+    RoomStatusConflict,
+    release_reservations,
+    transition_status,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+    get_nightly_availability,
+    get_stay_room_type,
+    release_stays,
+    update_stay_inventory,
+)
+from havano_hotel_management.instrumentation import instrument
+from havano_hotel_management.overbooking import get_overbooking_allowance
+
+# Reservations the no-show sweep releases per transaction
+NO_SHOW_BATCH_SIZE = 500
 
 class Reservation(Document):
     def validate(self):
@@ -14,15 +33,46 @@ class Reservation(Document):
     def before_submit(self):
         self.reserve_room()
 
+    def on_submit(self):
+        update_stay_inventory(self)
 
-    def reserve_room(self):
-        if self.room:
-            frappe.db.set_value("Room", self.room, "status", "Reserved")
-            frappe.db.set_value("Room", self.room, "reservation", self.name)
+    def on_update(self):
+        clear_reservation_rooms_cache(self.name)
+
+    def on_update_after_submit(self):
+        clear_reservation_rooms_cache(self.name)
 
-            frappe.msgprint("Room Reserved")
+    def on_cancel(self):
+        clear_reservation_rooms_cache(self.name)
+        # A no-show gave its nights back when it was swept
+        if self.status != "No Show":
+            update_stay_inventory(self, -1)
+        self.db_set("status", "Cancelled")
+        if self.room:
+            # Only frees the room while this reservation still holds it
+            transition_status("Room", self.room, "Available", holder=self.name, raise_exception=False)
         if self.venue:
-            frappe.db.set_value("Venue", self.venue, "status", "Reserved")
+            # The venue records no holder, so it is only freed while no other reservation has it
+            release_reservations("Venue", [self.name])
+
+    def on_trash(self):
+        clear_reservation_rooms_cache(self.name)
+
+
+    def reserve_room(self):
+        if self.room:
+            try:
+                transition_status("Room", self.room, "Reserved", holder=self.name)
+                frappe.msgprint("Room Reserved")
+            except RoomStatusConflict:
+                # An overbooked room stays held by the reservation that got it first
+                if not (get_hotel_settings().allow_overbooking and frappe.db.get_value("Room", self.room, "status") == "Reserved"):
+                    raise
+                frappe.clear_messages()
+                frappe.msgprint(_("Room {0} is already reserved, this reservation is overbooked").format(self.room))
+        # A venue's status is what it is doing today, so a later hire leaves it to whoever has it now
+        if self.venue and getdate(self.check_in_date) <= getdate(today()):
+            transition_status("Venue", self.venue, "Reserved")
             frappe.msgprint("Venue Reserved")
 
     def validate_reservation(self):
@@ -44,16 +94,48 @@ class Reservation(Document):
                 frappe.throw(_("Room {0} is already occupied. Please select another room.").format(self.room))
 
             elif room_status == "Reserved":
-                allow_overbooking = frappe.db.get_single_value("Hotel Settings", "allow_overbooking")
+                allow_overbooking = get_hotel_settings().allow_overbooking
 
                 if not allow_overbooking:
                     frappe.throw(_("Overbooking is not allowed in settings"))
 
+        self.validate_room_type_availability()
+
         # If "is_group" is checked, validate the "to be billed" field in the reservation guest child table
         if self.is_group:
             if not any(guest.to_be_billed for guest in self.guest_table):
                 frappe.throw(_("At least one guest must have 'To Be Billed' set to True in the Reservation Guests table."))
 
+    def validate_room_type_availability(self):
+        # Only new bookings take a room; amending a submitted one has already been counted
+        if self.reservation_type == "Venue" or self._action not in ("save", "submit") or not self.check_in_date:
+            return
+
+        room_type = get_stay_room_type(self)
+        if not room_type:
+            return
+        availability = get_nightly_availability(room_type, self.check_in_date, self.check_out_date)
+        if min(availability.values()) > 0:
+            return
+
+        settings = get_hotel_settings()
+        if not settings.allow_overbooking:
+            frappe.throw(_("No {0} rooms are left for these dates and overbooking is not allowed in settings").format(room_type))
+
+        if settings.use_forecast_overbooking:
+            # Each night may only go as far over capacity as its forecast no-shows cover
+            full = [
+                night for night, available in availability.items()
+                if available + get_overbooking_allowance(room_type, night) <= 0
+            ]
+            if full:
+                frappe.throw(
+                    _("{0} is beyond its forecast overbooking limit on {1}").format(
+                        room_type, ", ".join(frappe.format(night, "Date") for night in full)
+                    )
+                )
+        frappe.msgprint(_("{0} is fully booked for these dates, this reservation is overbooked").format(room_type), indicator="orange")
+
     # def after_insert(self):
     #     self.create_desk_folio()
 
@@ -99,3 +181,172 @@ class Reservation(Document):
     #     new_doc.insert(ignore_permissions=True)
     #     frappe.db.commit()  
 
+
+ROOMS_CACHE_KEY = "hotel_reservation_rooms|{0}"
+
+
+def on_doctype_update():
+    # The tape chart and room assignment read a room's stays by date range
+    frappe.db.add_index("Reservation", ["room", "check_in_date"])
+    # The no-show sweep looks for reservations still Reserved after arrival
+    frappe.db.add_index("Reservation", ["status", "check_in_date"])
+
+
+def get_reservation_rooms(reservation):
+    """
+    Rooms held by a reservation as [(name, room_number, room_type)]: its own
+    room plus any rooms on the group guest table. Cached until the
+    reservation changes, so the Check In room search does not hit the
+    database on every keystroke.
+    """
+    key = ROOMS_CACHE_KEY.format(reservation)
+    rooms = frappe.cache().get_value(key)
+    if rooms is not None:
+        return rooms
+
+    names = [
+        room for room in frappe.db.sql_list(
+            """
+            SELECT room FROM `tabReservation` WHERE name = %(reservation)s
+            UNION
+            SELECT room FROM `tabReservation Guest`
+            WHERE parent = %(reservation)s AND parenttype = 'Reservation'
+        """,
+            {"reservation": reservation},
+        ) if room
+    ]
+    rooms = [
+        tuple(row) for row in frappe.db.sql(
+            """
+            SELECT name, room_number, room_type FROM `tabRoom`
+            WHERE name IN %(names)s
+            ORDER BY name
+        """,
+            {"names": tuple(names)},
+        )
+    ] if names else []
+
+    frappe.cache().set_value(key, rooms, expires_in_sec=3600)
+    return rooms
+
+
+def clear_reservation_rooms_cache(reservation):
+    frappe.cache().delete_value(ROOMS_CACHE_KEY.format(reservation))
+
+
+def set_arrival(reservation, arrived=True):
+    """
+    Keep a reservation's status in step with its Check In, or its Booking for
+    a venue. A guest who turns up after being swept as a No Show takes their
+    nights back.
+    """
+    doc = frappe.get_doc("Reservation", reservation)
+    if arrived and doc.status == "No Show":
+        update_stay_inventory(doc)
+    if arrived and doc.status in ("Reserved", "No Show"):
+        doc.db_set("status", "Checked In")
+    elif not arrived and doc.status == "Checked In":
+        doc.db_set("status", "Reserved")
+
+
+def get_no_shows(batch_size):
+    """
+    The next batch of submitted reservations past their arrival day that
+    nobody arrived for, locked for the sweep. Guests arrive through a Check In,
+    venue hires through a Booking.
+    """
+    return frappe.db.sql(
+        """
+        SELECT reservation.name, reservation.room, reservation.venue,
+            IF(IFNULL(reservation.reservation_type, 'Room') = 'Room',
+                IFNULL(NULLIF(reservation.room_type, ''), room.room_type), NULL) AS room_type,
+            reservation.check_in_date, reservation.check_out_date
+        FROM `tabReservation` reservation
+        LEFT JOIN `tabRoom` room ON room.name = reservation.room
+        WHERE reservation.docstatus = 1 AND reservation.status = 'Reserved'
+            AND reservation.check_in_date < %(today)s
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabCheck In` check_in
+                WHERE check_in.reservation = reservation.name AND check_in.docstatus = 1
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM `tabBooking` booking
+                WHERE booking.reservation = reservation.name AND booking.docstatus = 1
+            )
+        ORDER BY reservation.check_in_date
+        LIMIT %(batch_size)s
+        FOR UPDATE
+    """,
+        {"today": today(), "batch_size": batch_size},
+        as_dict=True,
+    )
+
+
+def release_no_shows(batch_size=NO_SHOW_BATCH_SIZE):
+    """
+    Daily job: mark reservations whose arrival day has passed without a
+    Check In as No Show, free the rooms and venues they still hold and give
+    their nights back to the room type inventory.
+
+    Works in batches of `batch_size`, each with a few set-based statements
+    and its own commit. Only reservations still Reserved are picked up, and
+    the batch is locked while it is swept, so a rerun or a second worker
+    releases nothing twice. Returns what was released.
+    """
+    released = frappe._dict(reservations=[], rooms=[], venues=[])
+    while True:
+        batch = get_no_shows(batch_size)
+        if not batch:
+            break
+
+        names = tuple(reservation.name for reservation in batch)
+        frappe.db.sql(
+            """
+            UPDATE `tabReservation` SET status = 'No Show', modified = %(now)s
+            WHERE name IN %(names)s AND status = 'Reserved'
+        """,
+            {"names": names, "now": now_datetime()},
+        )
+        released.rooms += release_reservations("Room", names)
+        released.venues += release_reservations("Venue", names)
+        release_stays(
+            [(reservation.room_type, reservation.check_in_date, reservation.check_out_date) for reservation in batch]
+        )
+        for name in names:
+            clear_reservation_rooms_cache(name)
+        frappe.db.commit()
+
+        released.reservations += names
+        if len(batch) < batch_size:
+            break
+
+    frappe.logger().info(
+        f"No-show sweep: {len(released.reservations)} reservations, "
+        f"{len(released.rooms)} rooms and {len(released.venues)} venues released."
+    )
+    return released
+
+
+@frappe.whitelist()
+@instrument
+def sweep_no_shows():
+    """Run the no-show sweep now, from the Reservation list."""
+    frappe.has_permission("Reservation", "cancel", throw=True)
+    return release_no_shows()
+
+
+def set_statuses_from_stays():
+    """Fill in the status of reservations made before it existed, from their docstatus and Check Ins."""
+    frappe.db.sql(
+        """
+        UPDATE `tabReservation` reservation
+        SET reservation.status = CASE
+            WHEN reservation.docstatus = 2 THEN 'Cancelled'
+            WHEN EXISTS (
+                SELECT 1 FROM `tabCheck In` check_in
+                WHERE check_in.reservation = reservation.name AND check_in.docstatus = 1
+            ) THEN 'Checked In'
+            ELSE 'Reserved'
+        END
+    """
+    )
@@ -0,0 +1,73 @@
+frappe.listview_settings['Reservation'] = {
+    add_fields: ["status"],
+    get_indicator: function(doc) {
+        const colors = {
+            "Reserved": "blue",
+            "Checked In": "green",
+            "No Show": "orange",
+            "Cancelled": "red"
+        };
+        if (doc.status && colors[doc.status]) {
+            return [__(doc.status), colors[doc.status], "status,=," + doc.status];
+        }
+    },
+    onload: function(listview) {
+        listview.page.add_inner_button(__('Release No Shows'), function() {
+            frappe.confirm(__("Mark past arrivals without a Check In as No Show and release their rooms and venues?"), () => {
+                frappe.xcall("havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation.sweep_no_shows")
+                    .then(released => {
+                        frappe.msgprint({
+                            title: __("Release No Shows"),
+                            message: __("{0} reservations marked No Show, {1} rooms and {2} venues released.", [
+                                released.reservations.length, released.rooms.length, released.venues.length
+                            ]),
+                            indicator: 'green'
+                        });
+                        listview.refresh();
+                    });
+            });
+        });
+        listview.page.add_inner_button(__('Assign Rooms'), function() {
+            let d = new frappe.ui.Dialog({
+                title: __("Assign Rooms"),
+                fields: [
+                    {
+                        label: __("Arrivals From"),
+                        fieldname: "from_date",
+                        fieldtype: "Date",
+                        default: frappe.datetime.get_today(),
+                        reqd: 1
+                    },
+                    {
+                        label: __("Days Ahead"),
+                        fieldname: "days",
+                        fieldtype: "Int",
+                        default: 30,
+                        reqd: 1
+                    }
+                ],
+                primary_action_label: __("Assign"),
+                primary_action(values) {
+                    d.hide();
+                    frappe.xcall("havano_hotel_management.room_assignment.auto_assign_rooms", values)
+                        .then(result => {
+                            let assigned = Object.keys(result.assigned).length;
+                            let message = __("{0} reservations were given a room.", [assigned]);
+                            if (result.unassigned.length) {
+                                message += "<br>" + __("No room of the requested type is free for: {0}", [
+                                    result.unassigned.join(", ")
+                                ]);
+                            }
+                            frappe.msgprint({
+                                title: __("Assign Rooms"),
+                                message: message,
+                                indicator: result.unassigned.length ? 'orange' : 'green'
+                            });
+                            listview.refresh();
+                        });
+                }
+            });
+            d.show();
+        });
+    }
+};
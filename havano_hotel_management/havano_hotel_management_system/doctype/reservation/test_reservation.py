@@ -1,9 +1,100 @@
 # Copyright (c) 2025, Alphazen Technologies and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation import (
+	get_no_shows,
+	set_arrival,
+)
+from havano_hotel_management.overbooking import compute_allowances, get_allowance
+from havano_hotel_management.room_assignment import assign_rooms
+
+ROOMS = [
+	{"name": "101", "room_type": "Double", "floor": "1", "amenities": set()},
+	{"name": "201", "room_type": "Double", "floor": "2", "amenities": {"Balcony"}},
+]
+
+
+def stay(name, start, end, **preferences):
+	return dict({"name": name, "room_type": "Double", "start": start, "end": end}, **preferences)
+
 
 class TestReservation(FrappeTestCase):
-	pass
+	def test_fills_gaps_before_empty_rooms(self):
+		assigned, unassigned = assign_rooms([stay("RES-1", 0, 2)], ROOMS, taken=[("201", 2, 5, "RES-0")])
+
+		self.assertEqual(assigned, {"RES-1": "201"})
+		self.assertEqual(unassigned, [])
+
+	def test_preferences_come_before_fit(self):
+		assigned, _unassigned = assign_rooms(
+			[stay("RES-1", 0, 2, floor="1"), stay("RES-2", 4, 6, amenities={"Balcony"})],
+			ROOMS,
+			taken=[("201", 2, 4, "RES-0")],
+		)
+
+		self.assertEqual(assigned, {"RES-1": "101", "RES-2": "201"})
+
+	def test_repair_moves_a_new_stay_to_make_room(self):
+		# RES-1 goes to 101 for its floor, then has to give way so RES-2 fits at all
+		assigned, unassigned = assign_rooms(
+			[stay("RES-1", 0, 2, floor="1"), stay("RES-2", 1, 3)],
+			ROOMS,
+			taken=[("201", 2, 4, "RES-0")],
+		)
+
+		self.assertEqual(assigned, {"RES-1": "201", "RES-2": "101"})
+		self.assertEqual(unassigned, [])
+
+	def test_never_moves_existing_stays(self):
+		assigned, unassigned = assign_rooms(
+			[stay("RES-1", 0, 3)], ROOMS, taken=[("101", 1, 2, "RES-0"), ("201", 2, 4, "RES-9")]
+		)
+
+		self.assertEqual(assigned, {})
+		self.assertEqual(unassigned, ["RES-1"])
+
+	def test_overbooking_allowance_keeps_a_margin(self):
+		# 10 expected no-shows in 100 rooms, less one standard deviation of 3
+		self.assertEqual(get_allowance(100, 0.1), 7)
+		self.assertEqual(get_allowance(100, 0), 0)
+		self.assertEqual(get_allowance(5, 0.1), 0)
+
+	def test_quiet_weekdays_lean_on_the_overall_rate(self):
+		history = [("Double", 4, 400, 80), ("Double", 2, 400, 8), ("Double", 0, 1, 1)]
+
+		allowances = compute_allowances(history, {"Double": 100})
+
+		self.assertEqual(len(allowances["Double"]), 7)
+		# One lost Monday booking out of one does not make Monday a 100% no-show day
+		self.assertLess(allowances["Double"][0], 30)
+		self.assertGreater(allowances["Double"][4], allowances["Double"][2])
+
+	def test_a_booking_is_the_arrival_for_a_venue_reservation(self):
+		self.addCleanup(frappe.db.rollback)
+		for name in ("_Test Venue Res Booked", "_Test Venue Res Missed"):
+			frappe.db.sql(
+				"""
+				INSERT INTO `tabReservation` (name, docstatus, status, reservation_type, check_in_date, check_out_date)
+				VALUES (%s, 1, 'Reserved', 'Venue', '2019-01-01', '2019-01-02')
+			""",
+				name,
+			)
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabBooking` (name, docstatus, reservation)
+			VALUES ('_Test Venue Res Booking', 1, '_Test Venue Res Booked')
+		"""
+		)
+
+		no_shows = {row.name for row in get_no_shows(10**6)}
+
+		self.assertNotIn("_Test Venue Res Booked", no_shows)
+		self.assertIn("_Test Venue Res Missed", no_shows)
+
+		set_arrival("_Test Venue Res Booked")
+		self.assertEqual(frappe.db.get_value("Reservation", "_Test Venue Res Booked", "status"), "Checked In")
+		set_arrival("_Test Venue Res Booked", arrived=False)
+		self.assertEqual(frappe.db.get_value("Reservation", "_Test Venue Res Booked", "status"), "Reserved")
@@ -3,29 +3,9 @@
 
 frappe.ui.form.on("Room", {
 	refresh(frm) {
-        if(!frm.is_new()){
-            if(frm.doc.status == "Available"){
-                frm.set_value("current_checkin", "")
-                frm.save()
-            }
-            if(frm.doc.title != `${frm.doc.room_name} - ${frm.doc.status}`){
-                frm.set_value("title", `${frm.doc.room_name} - ${frm.doc.status}`);
-                frm.save()
-            }
-        }
+        // title, current_checkin and checkout_status are kept up to date by the server
         frm.set_df_property("price", "read_only", 0);
        
-        if (frm.doc.status === "Occupied" && frm.doc.checkout_date) {
-            const checkout_date = frappe.datetime.str_to_obj(frm.doc.checkout_date);
-            const today = frappe.datetime.get_today();
-            const today_obj = frappe.datetime.str_to_obj(today);
-            
-            if (checkout_date < today_obj) {
-                // Set checkout status to overdue
-                frm.set_value("checkout_status", "Overdue");
-                frm.save();
-            }
-        }
         if (frm.doc.status === "Reserved") {
             frm.set_df_property("status", "read_only", 0);
             frm.add_custom_button(__('Check In'), function() {
@@ -82,24 +62,6 @@ frappe.ui.form.on("Room", {
         }else{
             frm.set_df_property("status", "read_only", 1);
         }
-        
-
-        if(frm.doc.status == "Available"){
-            frm.set_value("current_checkin", "")
-        }
-        if(frm.doc.title != `${frm.doc.room_name} - ${frm.doc.status}`){
-            frm.set_value("title", `${frm.doc.room_name} - ${frm.doc.status}`);
-            frm.save()
-        }
-    },
-    validate: function(frm){
-        if(frm.doc.status == "Available"){
-            frm.set_value("current_checkin", "")
-        }
-         if(frm.doc.title != `${frm.doc.room_name} - ${frm.doc.status}`){
-            frm.set_value("title", `${frm.doc.room_name} - ${frm.doc.status}`);
-            frm.save()
-        }
     }
 });
 
@@ -146,37 +108,45 @@ function checkout(frm) {
     }
 }
 function cancel_reservation(frm){
-    frm.set_value("status", "Available");
-    var other_doctype = "Reservation"; // e.g., "Sales Invoice"
-    var other_docname = frm.doc.reservation; // Replace with your field that stores the reference
-    
+    var other_doctype = "Reservation";
+    var other_docname = frm.doc.reservation;
+
+    // Without a reservation to cancel, just free the room if it is still Reserved
+    let release_room = () => frappe.call({
+        method: "havano_hotel_management.havano_hotel_management_system.doctype.room.room.set_room_status",
+        args: {
+            room: frm.doc.name,
+            status: "Available",
+            expected_status: "Reserved"
+        },
+        callback: () => frm.reload_doc()
+    });
+
+    if (!other_docname) {
+        release_room();
+        return;
+    }
+
     // Confirm before cancelling
     frappe.confirm(
         `Are you sure you want to cancel ${other_doctype} ${other_docname}?`,
         function() {
-            // On 'Yes' - cancel the document
-            frappe.model.set_value(other_doctype, other_docname, 'docstatus', 2)
-                .then(() => {
-                    frm.set_value("reservation", "");
-                    frm.save()
-                    frappe.msgprint(`${other_doctype} ${other_docname} has been cancelled`);
-                    
-                    
-                    // frm.reload_doc();
-                })
-                .catch((err) => {
-                    // This approach won't work directly - see note below
-                    frappe.msgprint({
-                        title: __('Error'),
-                        indicator: 'red',
-                        message: __('Cannot cancel document: ') + err.message
-                    });
-                });
+            // Cancelling the Reservation frees the room while it still holds it
+            frappe.call({
+                method: "frappe.client.cancel",
+                args: {
+                    doctype: other_doctype,
+                    name: other_docname
+                },
+                callback: function(r) {
+                    if (!r.exc) {
+                        frappe.msgprint(`${other_doctype} ${other_docname} has been cancelled`);
+                        frm.reload_doc();
+                    }
+                }
+            });
         }
     );
-    
-    // frappe.msgprint("Reservation Cancelled")
-
 }
 
 
@@ -2,7 +2,16 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import cint, getdate, now_datetime, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import get_hotel_settings
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+    move_stay,
+    refresh_room_counts,
+)
+from havano_hotel_management.instrumentation import instrument
 
 
 class Room(Document):
@@ -10,9 +19,18 @@ class Room(Document):
         # Prevent changing status (e.g., via Kanban View)
         if self.get_doc_before_save():
             if self.status != self.get_doc_before_save().status:
-                #frappe.throw("You are not allowed to change status from the Kanban View.")
-                #frappe.msgprint("You are not allowed to change status from the Kanban View.")
-                print("You are not allowed to change status from the Kanban View.")
+                # Saving the form (e.g. from the Kanban View) still has to follow the transition table
+                validate_transition(self.get_doc_before_save().status, self.status)
+
+        self.update(get_derived_fields(self, today()))
+
+    def on_update(self):
+        if self.has_value_changed("room_type") or self.has_value_changed("housekeeping_status"):
+            before = self.get_doc_before_save()
+            refresh_room_counts([self.room_type, before and before.room_type])
+
+    def after_delete(self):
+        refresh_room_counts([self.room_type])
 
     def before_insert(self):
         self.validate_room_item()
@@ -22,7 +40,7 @@ class Room(Document):
             self.create_room_item()
 
     def create_room_item(self):
-        hotel_item_group = frappe.db.get_single_value("Hotel Settings", "hotel_item_group")
+        hotel_item_group = get_hotel_settings().hotel_item_group
 
         new_item = frappe.get_doc({
             "doctype": "Item",
@@ -38,9 +56,275 @@ class Room(Document):
         self.room_item = new_item.name
 
 
+def get_derived_fields(room, on_date):
+    """
+    Fields that follow from a room's status and dates: the list title, the
+    check-in it is holding and whether its guest is past checkout.
+    """
+    status = room.get("status") or ""
+    overdue = status == "Occupied" and room.get("checkout_date") and getdate(room.get("checkout_date")) < getdate(on_date)
+    return {
+        "title": f"{room.get('room_name') or room.get('name')} - {status}",
+        "current_checkin": None if status == "Available" else room.get("current_checkin"),
+        "checkout_status": "Overdue" if overdue else "",
+    }
+
+
+def update_derived_fields(rooms=None):
+    """
+    Recompute the derived fields of `rooms` (all rooms by default) in one
+    statement, for code that changes status or dates without saving the Room.
+    Rows that are already correct are left untouched.
+    """
+    condition = "AND name IN %(rooms)s" if rooms else ""
+    frappe.db.sql(
+        f"""
+        UPDATE `tabRoom`
+        SET title = CONCAT(IFNULL(NULLIF(room_name, ''), name), ' - ', IFNULL(status, '')),
+            current_checkin = IF(status = 'Available', NULL, current_checkin),
+            checkout_status = IF(status = 'Occupied' AND checkout_date < %(today)s, 'Overdue', '')
+        WHERE NOT (
+                IFNULL(title, '') = CONCAT(IFNULL(NULLIF(room_name, ''), name), ' - ', IFNULL(status, ''))
+                AND (status != 'Available' OR current_checkin IS NULL)
+                AND IFNULL(checkout_status, '') = IF(status = 'Occupied' AND checkout_date < %(today)s, 'Overdue', '')
+            )
+            {condition}
+    """,
+        {"today": today(), "rooms": tuple(set(rooms or ()))},
+    )
+
+
+def mark_overdue_checkouts():
+    """Daily job: flag rooms whose guests are past their checkout date, and clear the flag elsewhere."""
+    update_derived_fields()
+
+
+class RoomStatusConflict(frappe.ValidationError):
+    http_status_code = 409
+
+
+# target status -> statuses a Room or Venue may move into it from
+STATUS_TRANSITIONS = {
+    "Available": ("Occupied", "Reserved"),
+    "Reserved": ("Available",),
+    "Occupied": ("Available", "Reserved"),
+}
+
+# (doctype, status) -> field naming the document that holds it in that status
+HOLDER_FIELDS = {
+    ("Room", "Occupied"): "current_checkin",
+    ("Room", "Reserved"): "reservation",
+    ("Venue", "Occupied"): "current_booking",
+}
+
+# cleared along with the holder whenever a Room or Venue becomes Available
+RELEASED_FIELDS = ("current_guest", "checkout_date")
+
+
+def validate_transition(from_status, to_status):
+    if from_status and from_status != to_status and from_status not in STATUS_TRANSITIONS.get(to_status, ()):
+        frappe.throw(
+            _("Cannot change status from {0} to {1}").format(_(from_status), _(to_status)), RoomStatusConflict
+        )
+
+
+def transition_status(doctype, name, status, holder=None, values=None, expected_status=None, raise_exception=True):
+    """
+    Move a Room or Venue to `status` with a single compare-and-set UPDATE.
+
+    The row only changes if its current status may move to `status`, and,
+    when `holder` is given for a release, only if that document still holds
+    it. `expected_status` narrows the statuses it may be moved from to the
+    one the caller last saw. Entering a status the same holder already has
+    is a no-op success.
+    Anything else is a conflict: RoomStatusConflict is raised, or False
+    returned with raise_exception=False. Nothing is read or locked first,
+    so parallel desks never queue on each other's row locks.
+    """
+    if status not in STATUS_TRANSITIONS:
+        frappe.throw(_("Unknown status {0}").format(status))
+    allowed = STATUS_TRANSITIONS[status]
+    if expected_status:
+        validate_transition(expected_status, status)
+        allowed = (expected_status,)
+
+    holder_field = HOLDER_FIELDS.get((doctype, status))
+    holder_fields = sorted({field for (dt, _status), field in HOLDER_FIELDS.items() if dt == doctype})
+    params = {"name": name, "status": status, "allowed": allowed, "holder": holder or "", "now": now_datetime()}
+
+    updates = {}
+    if status == "Available":
+        updates.update(dict.fromkeys(holder_fields + list(RELEASED_FIELDS)))
+    elif holder_field and holder:
+        updates[holder_field] = holder
+    updates.update(values or {})
+
+    set_clause = ", ".join(f"`{field}` = %(set_{field})s" for field in updates)
+    params.update({f"set_{field}": value for field, value in updates.items()})
+
+    condition = "status IN %(allowed)s"
+    if status == "Available" and holder:
+        # Only the stay or reservation holding the room may release it
+        current_holder = " ".join(
+            f"WHEN '{state}' THEN IFNULL(`{field}`, '')" for (dt, state), field in HOLDER_FIELDS.items() if dt == doctype
+        )
+        condition += f" AND IFNULL(CASE status {current_holder} END, '') IN ('', %(holder)s)"
+    elif holder_field and holder:
+        condition = f"({condition} OR (status = %(status)s AND `{holder_field}` = %(holder)s))"
+
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{doctype}`
+        SET status = %(status)s,
+            {set_clause + "," if set_clause else ""}
+            modified = %(now)s
+        WHERE name = %(name)s AND {condition}
+    """,
+        params,
+    )
+
+    if not frappe.db._cursor.rowcount:
+        current = frappe.db.get_value(doctype, name, ["status"] + holder_fields, as_dict=True)
+        if not current:
+            frappe.throw(_("{0} {1} not found").format(_(doctype), name), frappe.DoesNotExistError)
+
+        # Already where the caller wants it, e.g. a retried request
+        current_holder = current.get(HOLDER_FIELDS.get((doctype, current.status), ""))
+        if current.status == status and (status == "Available" or not holder or current_holder == holder):
+            return True
+
+        if not raise_exception:
+            return False
+        frappe.throw(
+            _("{0} {1} is {2}{3} and cannot be made {4}. Reload and try again.").format(
+                _(doctype), name, _(current.status),
+                _(" by {0}").format(current_holder) if current_holder else "", _(status),
+            ),
+            RoomStatusConflict,
+        )
+
+    if doctype == "Room":
+        update_derived_fields([name])
+    return True
+
+
+def release_reservations(doctype, reservations):
+    """
+    Make Available every Room or Venue that is Reserved for one of
+    `reservations`, in one statement: the set-based form of releasing each
+    with transition_status. A Room is only freed while it still names the
+    reservation (or none); a Venue, which records no holder, only while no
+    other live reservation has it. Returns the names freed.
+    """
+    if not reservations:
+        return []
+
+    link_field = "room" if doctype == "Room" else "venue"
+    holder_field = HOLDER_FIELDS.get((doctype, "Reserved"))
+    if holder_field:
+        guard = f"IFNULL(target.`{holder_field}`, '') IN ('', reservation.name)"
+    else:
+        guard = f"""NOT EXISTS (
+            SELECT 1 FROM `tabReservation` other
+            WHERE other.`{link_field}` = target.name AND other.docstatus = 1
+                AND other.status = 'Reserved' AND other.name NOT IN %(reservations)s
+        )"""
+    params = {"reservations": tuple(reservations), "now": now_datetime()}
+
+    names = frappe.db.sql_list(
+        f"""
+        SELECT DISTINCT target.name
+        FROM `tab{doctype}` target
+        JOIN `tabReservation` reservation ON reservation.`{link_field}` = target.name
+        WHERE reservation.name IN %(reservations)s AND target.status = 'Reserved' AND {guard}
+        FOR UPDATE
+    """,
+        params,
+    )
+    if names:
+        fields = sorted({field for (dt, _status), field in HOLDER_FIELDS.items() if dt == doctype})
+        params["names"] = tuple(names)
+        frappe.db.sql(
+            f"""
+            UPDATE `tab{doctype}`
+            SET status = 'Available',
+                {", ".join(f"`{field}` = NULL" for field in fields + list(RELEASED_FIELDS))},
+                modified = %(now)s
+            WHERE name IN %(names)s AND status = 'Reserved'
+        """,
+            params,
+        )
+
+    if holder_field:
+        # Rooms that moved on without the link being cleared still point at the reservation
+        frappe.db.sql(
+            f"UPDATE `tab{doctype}` SET `{holder_field}` = NULL WHERE `{holder_field}` IN %(reservations)s",
+            params,
+        )
+
+    if doctype == "Room" and names:
+        update_derived_fields(names)
+    return names
+
+
+@frappe.whitelist()
+@instrument
+def set_room_status(room, status, expected_status=None):
+    """Change a room's status from the desk, failing if someone else changed it first."""
+    frappe.has_permission("Room", "write", room, throw=True)
+    return transition_status("Room", room, status, expected_status=expected_status)
+
+
 @frappe.whitelist()
-def get_room_history(room_name):
-    return frappe.db.sql("""
+@instrument
+def move_room(check_in, new_room):
+    """Move a checked-in stay to another room: claim the new room first, then free the old one."""
+    frappe.has_permission("Check In", "write", check_in, throw=True)
+    stay = frappe.db.get_value(
+        "Check In", check_in, ["room", "guest_name", "check_in_date", "check_out_date", "docstatus"], as_dict=True
+    )
+    if not stay or stay.docstatus != 1:
+        frappe.throw(_("Check In {0} is not submitted").format(check_in))
+    if stay.room == new_room:
+        return {"room": new_room}
+
+    transition_status(
+        "Room", new_room, "Occupied", holder=check_in,
+        values={"current_guest": stay.guest_name, "checkout_date": stay.check_out_date},
+    )
+    if stay.room:
+        transition_status("Room", stay.room, "Available", holder=check_in, raise_exception=False)
+    frappe.db.set_value("Check In", check_in, "room", new_room)
+    # The nights still ahead now belong to the new room's type
+    move_stay(
+        frappe.db.get_value("Room", stay.room, "room_type") if stay.room else None,
+        frappe.db.get_value("Room", new_room, "room_type"),
+        max(getdate(stay.check_in_date), getdate(today())),
+        stay.check_out_date,
+    )
+    return {"room": new_room}
+
+@frappe.whitelist()
+@instrument
+def get_room_history(room_name, include_archived=0):
+    # Stays moved to Stay Archive are only read when asked for
+    archived = """
+        UNION ALL
+
+        SELECT
+            guest AS guest_name,
+            check_in_date AS checkin_date,
+            check_out_date AS checkout_date,
+            nights,
+            amount,
+            reference_doctype AS source
+        FROM `tabStay Archive`
+        WHERE room = %s AND source_docstatus = 1
+            AND reference_doctype IN ('Reservation', 'Check In', 'Check Out')
+    """ if cint(include_archived) else ""
+    values = (room_name,) * (4 if archived else 3)
+
+    return frappe.db.sql(f"""
         SELECT
             guest AS guest_name,
             check_in_date AS checkin_date,
@@ -74,6 +358,6 @@ def get_room_history(room_name):
             'Check Out' AS source
         FROM `tabCheck Out`
         WHERE room = %s AND docstatus = 1
-
+        {archived}
         ORDER BY checkin_date DESC
-    """, (room_name, room_name, room_name), as_dict=True)
+    """, values, as_dict=True)
@@ -2,7 +2,6 @@
 
 frappe.listview_settings['Room'] = { 
     onload: function(listview) {
-        check_overdue_checkouts();
         update_status_counts();
         // Switch to the existing "Room View" kanban view on load
         frappe.set_route("List", "Room", "Room View", "Kanban");
@@ -180,45 +179,3 @@ function highlight_overdue_checkouts() {
         });
     }, 1000); // Increased delay to ensure cards are rendered and sorted
 }
-
-// Function to check for overdue checkouts
-function check_overdue_checkouts() {
-    console.log("Checking for overdue checkouts...");
-    frappe.call({
-        method: "frappe.client.get_list",
-        args: {
-            doctype: "Room",
-            filters: {
-                status: "Occupied"
-            },
-            fields: ["name", "checkout_date"]
-        },
-        callback: function(r) {
-            if (r.message && r.message.length > 0) {
-                const today = frappe.datetime.get_today();
-                const today_obj = frappe.datetime.str_to_obj(today);
-                // Filter rooms with checkout date < today
-                const overdue_rooms = r.message.filter(room => {
-                    if (!room.checkout_date) return false;
-                    const checkout_date = frappe.datetime.str_to_obj(room.checkout_date);
-                    return checkout_date < today_obj;
-                });
-                
-                // Update overdue rooms
-                if (overdue_rooms.length > 0) {
-                    overdue_rooms.forEach(room => {
-                        frappe.db.set_value("Room", room.name, "checkout_status", "Overdue")
-                            .then(() => {
-                                console.log(`Room ${room.name} marked as overdue`);
-                            });
-                    });
-                    
-                    // Refresh the list view after updates
-                    setTimeout(() => {
-                        cur_list.refresh();
-                    }, 1000);
-                }
-            }
-        }
-    });
-}
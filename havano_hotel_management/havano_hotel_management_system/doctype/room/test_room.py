@@ -1,9 +1,51 @@
 # Copyright (c) 2025, Alphazen Technologies and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from havano_hotel_management.havano_hotel_management_system.doctype.room.room import (
+	RoomStatusConflict,
+	get_derived_fields,
+	validate_transition,
+)
+from havano_hotel_management.tape_chart import CHECKED_OUT, IN_HOUSE, RESERVED, encode_runs
+
 
 class TestRoom(FrappeTestCase):
-	pass
+	def test_overdue_only_when_occupied_past_checkout(self):
+		room = {"name": "101", "room_name": "Garden 101", "status": "Occupied", "checkout_date": "2026-01-01", "current_checkin": "CI-1"}
+
+		self.assertEqual(get_derived_fields(room, "2026-01-02")["checkout_status"], "Overdue")
+		self.assertEqual(get_derived_fields(room, "2026-01-01")["checkout_status"], "")
+		self.assertEqual(get_derived_fields(dict(room, status="Reserved"), "2026-01-02")["checkout_status"], "")
+
+	def test_available_room_drops_check_in(self):
+		fields = get_derived_fields({"name": "101", "status": "Available", "current_checkin": "CI-1"}, "2026-01-02")
+
+		self.assertEqual(fields["title"], "101 - Available")
+		self.assertIsNone(fields["current_checkin"])
+
+
+	def test_transitions_follow_the_table(self):
+		validate_transition("Available", "Occupied")
+		validate_transition("Reserved", "Occupied")
+		validate_transition("Occupied", "Occupied")
+
+		self.assertRaises(RoomStatusConflict, validate_transition, "Occupied", "Reserved")
+
+	def test_tape_chart_runs_are_clipped_and_deduplicated(self):
+		check_ins = [
+			frappe._dict(name="CI-1", room="101", guest="Ann", reservation="RES-1", check_in_date="2026-02-27", check_out_date="2026-03-03", checked_out=0),
+			frappe._dict(name="CI-2", room="102", guest="Bob", reservation=None, check_in_date="2026-03-01", check_out_date="2026-03-02", checked_out=1),
+		]
+		reservations = [
+			frappe._dict(name="RES-1", room="101", guest="Ann", check_in_date="2026-02-27", check_out_date="2026-03-03"),
+			frappe._dict(name="RES-2", room="101", guest="Ann", check_in_date="2026-03-05", check_out_date="2026-03-20"),
+		]
+
+		runs, guests = encode_runs(check_ins, reservations, "2026-03-01", 7)
+
+		self.assertEqual(guests, ["Ann", "Bob"])
+		self.assertEqual(runs["101"], [[0, 2, IN_HOUSE, "CI-1", 0], [4, 3, RESERVED, "RES-2", 0]])
+		self.assertEqual(runs["102"], [[0, 1, CHECKED_OUT, "CI-2", 1]])
@@ -1,9 +1,409 @@
 # Copyright (c) 2025, Alphazen Technologies and contributors
 # For license information, please see license.txt
 
-# import frappe
+from collections import defaultdict
+
+import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import flt, today
+
+from havano_hotel_management.api import CHARGE_KEY_FIELD, get_charge_key, get_existing_charge_invoice
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import get_hotel_settings
+from havano_hotel_management.instrumentation import instrument
+
+FOLIO_FIELD = "custom_room_folio"
 
 
 class RoomFolio(Document):
 	pass
+
+
+def is_folio_mode():
+	# Extensions and extras go on the folio; the room charge taken at check-in keeps its own invoice
+	return get_hotel_settings().consolidate_folio_charges
+
+
+def apply_balance_delta(room_folio, delta):
+	"""Move the folio balance, and its Desk Folio's, by `delta` in place."""
+	delta = flt(delta)
+	if not room_folio or not delta:
+		return
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabRoom Folio`
+		SET room_folio_balance = IFNULL(room_folio_balance, 0) + %(delta)s
+		WHERE name = %(folio)s
+	""",
+		{"delta": delta, "folio": room_folio},
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabDesk Folio` desk
+		INNER JOIN `tabRoom Folio` folio ON folio.desk_folio = desk.name
+		SET desk.balance = IFNULL(desk.balance, 0) + %(delta)s
+		WHERE folio.name = %(folio)s
+	""",
+		{"delta": delta, "folio": room_folio},
+	)
+
+
+def get_stay_folio(reference_doctype, reference_name):
+	"""Return the Room Folio of a Check In or Booking, creating it on first use."""
+	folio = frappe.db.get_value(
+		"Room Folio", {"reference_doctype": reference_doctype, "reference_name": reference_name}, "name"
+	)
+	if folio:
+		return folio
+
+	stay = frappe.db.get_value(
+		reference_doctype, reference_name, ["guest_name", "company", "reservation"], as_dict=True
+	)
+	folio = frappe.get_doc(
+		{
+			"doctype": "Room Folio",
+			"reference_doctype": reference_doctype,
+			"reference_name": reference_name,
+			"guest": stay.guest_name,
+			"room": frappe.db.get_value(reference_doctype, reference_name, "room")
+			if reference_doctype == "Check In"
+			else None,
+			"company": stay.company or frappe.defaults.get_user_default("company"),
+			"desk_folio": frappe.db.get_value("Desk Folio", {"reservation": stay.reservation}, "name")
+			if stay.reservation
+			else None,
+			"room_folio_balance": 0,
+		}
+	)
+	folio.insert(ignore_permissions=True)
+	return folio.name
+
+
+def add_folio_charge(reference_doctype, reference_name, item_code, amount, purpose, qty=1, description=None):
+	"""
+	Append a charge to the stay's Room Folio without posting an invoice.
+
+	The row is written on its own, so the folio and its other rows are not
+	re-saved. A charge with the same purpose is only added once.
+	"""
+	# Serialise charges per stay so the folio is created once and idx stays unique
+	frappe.db.get_value(reference_doctype, reference_name, "name", for_update=True)
+	folio = get_stay_folio(reference_doctype, reference_name)
+	charge_key = get_charge_key(reference_doctype, reference_name, purpose)
+
+	if frappe.db.exists(
+		"Transactions Child Table", {"parent": folio, "parenttype": "Room Folio", "charge_key": charge_key}
+	):
+		return {"room_folio": folio, "existing": True, "refresh": True}
+
+	amount = flt(amount)
+	qty = flt(qty) or 1
+	idx = frappe.db.sql(
+		"""
+		SELECT IFNULL(MAX(idx), 0) + 1
+		FROM `tabTransactions Child Table`
+		WHERE parent = %s AND parenttype = 'Room Folio'
+	""",
+		folio,
+	)[0][0]
+
+	row = frappe.get_doc(
+		{
+			"doctype": "Transactions Child Table",
+			"parent": folio,
+			"parenttype": "Room Folio",
+			"parentfield": "transactions",
+			"idx": idx,
+			"item_code": item_code,
+			"item_name": item_code,
+			"description": description or purpose,
+			"posting_date": today(),
+			"quatity": qty,
+			"rate": amount / qty,
+			"amount": amount,
+			"charge_key": charge_key,
+		}
+	)
+	row.db_insert()
+	apply_balance_delta(folio, amount)
+
+	return {"room_folio": folio, "refresh": True}
+
+
+@frappe.whitelist()
+@instrument
+def post_stay_folio(reference_doctype, reference_name):
+	"""Invoice whatever is still unbilled on the stay's folio, if it has one."""
+	folio = frappe.db.get_value(
+		"Room Folio", {"reference_doctype": reference_doctype, "reference_name": reference_name}, "name"
+	)
+	if not folio:
+		return {"sales_invoice": None, "refresh": False}
+
+	return post_folio_invoice(folio)
+
+
+@frappe.whitelist()
+@instrument
+def post_folio_invoice(room_folio):
+	"""Raise one Sales Invoice for every unbilled transaction on the folio."""
+	try:
+		folio = frappe.db.get_value(
+			"Room Folio", room_folio, ["name", "guest", "company", "sales_invoice"], as_dict=True, for_update=True
+		)
+		rows = frappe.get_all(
+			"Transactions Child Table",
+			filters={"parent": room_folio, "parenttype": "Room Folio", "sales_invoice": ["is", "not set"]},
+			fields=["name", "item_code", "item_name", "description", "quatity", "rate", "amount", "income_account", "cost_center"],
+			order_by="idx asc",
+		)
+		if not rows:
+			return {"sales_invoice": folio.sales_invoice, "refresh": False}
+
+		# The first unbilled row identifies this batch, so a retry resolves to the same invoice
+		purpose = f"Folio {rows[0].name}"
+		existing_invoice = get_existing_charge_invoice("Room Folio", room_folio, purpose)
+		if existing_invoice:
+			return {"sales_invoice": existing_invoice, "existing": True, "refresh": True}
+
+		company = folio.company or frappe.defaults.get_user_default("company")
+		income_account = frappe.get_cached_value("Company", company, "default_income_account")
+		cost_center = frappe.get_cached_value("Company", company, "cost_center")
+
+		si = frappe.new_doc("Sales Invoice")
+		si.customer = folio.guest
+		si.posting_date = today()
+		si.due_date = today()
+		si.company = company
+		si.debit_to = frappe.get_cached_value("Company", company, "default_receivable_account")
+		si.set(CHARGE_KEY_FIELD, get_charge_key("Room Folio", room_folio, purpose))
+		si.set(FOLIO_FIELD, room_folio)
+
+		for row in rows:
+			si.append("items", {
+				"item_code": row.item_code,
+				"item_name": row.item_name or row.item_code,
+				"description": row.description or room_folio,
+				"qty": row.quatity or 1,
+				"rate": row.rate,
+				"amount": row.amount,
+				"income_account": row.income_account or income_account,
+				"cost_center": row.cost_center or cost_center,
+			})
+
+		si.insert(ignore_permissions=True)
+		si.submit()
+
+		frappe.db.sql(
+			"""
+			UPDATE `tabTransactions Child Table`
+			SET sales_invoice = %(invoice)s
+			WHERE name IN %(rows)s
+		""",
+			{"invoice": si.name, "rows": tuple(row.name for row in rows)},
+		)
+		frappe.db.set_value("Room Folio", room_folio, "sales_invoice", si.name)
+
+		return {"sales_invoice": si.name, "refresh": True}
+
+	except Exception as e:
+		frappe.log_error(message=str(e), title="Error Posting Folio Invoice")
+		frappe.throw(_("An error occurred while invoicing the Room Folio: {0}").format(str(e)))
+
+
+def is_folio_key(key):
+	return (key or "").startswith("Room Folio::")
+
+
+def get_stay_totals(reference_doctype, reference_name, sales_invoice=None):
+	"""
+	Charges, payments and what is still owed for a stay, summed from its
+	invoices and its unbilled folio rows rather than from the ledger.
+	"""
+	folio = frappe.db.get_value(
+		"Room Folio",
+		{"reference_doctype": reference_doctype, "reference_name": reference_name},
+		["name", "room_folio_balance"],
+		as_dict=True,
+	) or frappe._dict()
+
+	charges, outstanding = 0, 0
+	if folio.name or sales_invoice:
+		charges, outstanding = frappe.db.sql(
+			f"""
+			SELECT
+				IFNULL(SUM(IF(rounded_total, base_rounded_total, base_grand_total)), 0),
+				IFNULL(SUM(outstanding_amount), 0)
+			FROM `tabSales Invoice`
+			WHERE docstatus = 1
+				AND (name = %(invoice)s OR {FOLIO_FIELD} = %(folio)s)
+		""",
+			{"invoice": sales_invoice or "", "folio": folio.name or ""},
+		)[0]
+
+	unbilled = 0
+	if folio.name:
+		unbilled = frappe.db.sql(
+			"""
+			SELECT IFNULL(SUM(amount), 0)
+			FROM `tabTransactions Child Table`
+			WHERE parenttype = 'Room Folio' AND parent = %s AND IFNULL(sales_invoice, '') = ''
+		""",
+			folio.name,
+		)[0][0]
+
+	return frappe._dict(
+		room_folio=folio.name,
+		charges=flt(charges) + flt(unbilled),
+		payments=flt(charges) - flt(outstanding),
+		unbilled=flt(unbilled),
+		outstanding=flt(outstanding) + flt(unbilled),
+	)
+
+
+def get_invoice_folio(sales_invoice):
+	"""Return (room_folio, is_folio_invoice) for an invoice raised by this app."""
+	if sales_invoice.get(FOLIO_FIELD):
+		return sales_invoice.get(FOLIO_FIELD), is_folio_key(sales_invoice.get(CHARGE_KEY_FIELD))
+
+	key = sales_invoice.get(CHARGE_KEY_FIELD)
+	if not key or key.count("::") < 2:
+		return None, False
+
+	reference_doctype, reference_name = key.split("::")[:2]
+	# Stays are archived with their folios, so either may be gone by now
+	if reference_doctype == "Room Folio" and frappe.db.exists("Room Folio", reference_name):
+		return reference_name, True
+	if reference_doctype in ("Check In", "Booking") and frappe.db.exists(reference_doctype, reference_name):
+		return get_stay_folio(reference_doctype, reference_name), False
+
+	return None, False
+
+
+def get_invoice_amount(sales_invoice):
+	return flt(sales_invoice.base_rounded_total) or flt(sales_invoice.base_grand_total)
+
+
+def on_sales_invoice_submit(doc, method=None):
+	room_folio, is_folio_invoice = get_invoice_folio(doc)
+	if not room_folio:
+		return
+
+	doc.db_set(FOLIO_FIELD, room_folio, update_modified=False)
+	# Folio invoices bill rows that were already counted when they were charged
+	if not is_folio_invoice:
+		apply_balance_delta(room_folio, get_invoice_amount(doc))
+
+
+def on_sales_invoice_cancel(doc, method=None):
+	room_folio = doc.get(FOLIO_FIELD)
+	if not room_folio:
+		return
+
+	if is_folio_key(doc.get(CHARGE_KEY_FIELD)):
+		# The rows are owed again, so they go back to unbilled and the balance stands
+		frappe.db.sql(
+			"""
+			UPDATE `tabTransactions Child Table`
+			SET sales_invoice = NULL
+			WHERE parenttype = 'Room Folio' AND parent = %s AND sales_invoice = %s
+		""",
+			(room_folio, doc.name),
+		)
+	else:
+		apply_balance_delta(room_folio, -get_invoice_amount(doc))
+
+
+def on_payment_entry_submit(doc, method=None):
+	apply_payment_deltas(doc, -1)
+
+
+def on_payment_entry_cancel(doc, method=None):
+	apply_payment_deltas(doc, 1)
+
+
+def apply_payment_deltas(payment_entry, sign):
+	allocations = defaultdict(float)
+	for ref in payment_entry.get("references") or []:
+		if ref.reference_doctype == "Sales Invoice" and ref.reference_name:
+			allocations[ref.reference_name] += flt(ref.allocated_amount)
+
+	if not allocations:
+		return
+
+	folios = defaultdict(float)
+	for invoice, room_folio in frappe.get_all(
+		"Sales Invoice",
+		filters={"name": ["in", list(allocations)], FOLIO_FIELD: ["is", "set"]},
+		fields=["name", FOLIO_FIELD],
+		as_list=True,
+	):
+		folios[room_folio] += allocations[invoice]
+
+	for room_folio, amount in folios.items():
+		apply_balance_delta(room_folio, sign * amount)
+
+
+def reconcile_folio_balances():
+	"""
+	Daily job: recompute every folio balance from the ledger and fix drift.
+
+	A folio owes its unbilled charges plus whatever is still outstanding in
+	GL against the invoices raised for it.
+	"""
+	expected = defaultdict(float)
+	for room_folio, amount in frappe.db.sql(
+		"""
+		SELECT parent, SUM(amount)
+		FROM `tabTransactions Child Table`
+		WHERE parenttype = 'Room Folio' AND IFNULL(sales_invoice, '') = ''
+		GROUP BY parent
+	"""
+	):
+		expected[room_folio] += flt(amount)
+
+	for room_folio, amount in frappe.db.sql(
+		f"""
+		SELECT si.{FOLIO_FIELD}, SUM(gle.debit - gle.credit)
+		FROM `tabGL Entry` gle
+		INNER JOIN `tabSales Invoice` si ON si.name = gle.against_voucher
+		WHERE gle.against_voucher_type = 'Sales Invoice'
+			AND gle.party_type = 'Customer'
+			AND gle.is_cancelled = 0
+			AND IFNULL(si.{FOLIO_FIELD}, '') != ''
+		GROUP BY si.{FOLIO_FIELD}
+	"""
+	):
+		expected[room_folio] += flt(amount)
+
+	drift = []
+	for room_folio, balance in frappe.db.sql("SELECT name, IFNULL(room_folio_balance, 0) FROM `tabRoom Folio`"):
+		correct = flt(expected.get(room_folio), 2)
+		if abs(flt(balance, 2) - correct) >= 0.01:
+			drift.append((room_folio, flt(balance, 2), correct))
+			frappe.db.sql(
+				"UPDATE `tabRoom Folio` SET room_folio_balance = %s WHERE name = %s", (correct, room_folio)
+			)
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabDesk Folio` desk
+		INNER JOIN (
+			SELECT desk_folio, SUM(IFNULL(room_folio_balance, 0)) AS balance
+			FROM `tabRoom Folio`
+			WHERE IFNULL(desk_folio, '') != ''
+			GROUP BY desk_folio
+		) folio ON folio.desk_folio = desk.name
+		SET desk.balance = folio.balance
+		WHERE IFNULL(desk.balance, 0) != folio.balance
+	"""
+	)
+
+	if drift:
+		frappe.log_error(
+			message="\n".join(f"{name}: {was} -> {correct}" for name, was, correct in drift),
+			title="Room Folio Balance Drift",
+		)
+
+	return drift
@@ -0,0 +1,291 @@
+# Copyright (c) 2026, Alphazen Technologies and contributors
+# For license information, please see license.txt
+
+from collections import Counter, defaultdict
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, date_diff, getdate, now_datetime, today
+
+from havano_hotel_management.instrumentation import instrument
+
+# How far ahead the nightly rebuild recounts sold rooms
+REBUILD_DAYS = 400
+
+INSERT_FIELDS = (
+	"name", "room_type", "date", "total_rooms", "out_of_order", "sold", "blocked",
+	"creation", "modified", "owner", "modified_by",
+)
+
+
+class RoomTypeInventory(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Room Type Inventory", ["room_type", "date"])
+
+
+def get_nights(from_date, to_date):
+	"""The nights of a stay from `from_date` up to, not including, `to_date`; at least one."""
+	from_date = getdate(from_date)
+	return [add_days(from_date, day) for day in range(max(date_diff(to_date, from_date), 1))] if to_date else [from_date]
+
+
+def get_room_counts(room_types=None):
+	"""room_type -> (rooms, rooms out of order), for `room_types` or every type."""
+	condition = "AND room_type IN %(room_types)s" if room_types else ""
+	counts = frappe.db.sql(
+		f"""
+		SELECT room_type, COUNT(*), SUM(IFNULL(housekeeping_status, '') = 'Out of Order')
+		FROM `tabRoom`
+		WHERE IFNULL(room_type, '') != '' {condition}
+		GROUP BY room_type
+	""",
+		{"room_types": tuple(set(room_types or ()))},
+	)
+	result = defaultdict(lambda: (0, 0))
+	result.update({room_type: (cint(rooms), cint(out_of_order)) for room_type, rooms, out_of_order in counts})
+	return result
+
+
+def upsert(rows, on_duplicate):
+	"""Insert counter rows in one statement, updating rows that already exist with `on_duplicate`."""
+	if not rows:
+		return
+
+	now, user = now_datetime(), frappe.session.user
+	values = []
+	for room_type, night, total, out_of_order, sold, blocked in rows:
+		values.extend((f"{room_type}-{night}", room_type, night, total, out_of_order, sold, blocked, now, now, user, user))
+
+	placeholders = ", ".join(["(" + ", ".join(["%s"] * len(INSERT_FIELDS)) + ")"] * len(rows))
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabRoom Type Inventory` ({", ".join(f"`{field}`" for field in INSERT_FIELDS)})
+		VALUES {placeholders}
+		ON DUPLICATE KEY UPDATE {on_duplicate}, modified = VALUES(modified)
+	""",
+		values,
+	)
+
+
+def adjust_inventory(room_type, from_date, to_date, sold=0, blocked=0):
+	"""
+	Add `sold` and `blocked` to the counters of `room_type` for every night
+	from `from_date` to `to_date`, as one atomic INSERT ... ON DUPLICATE KEY
+	UPDATE. Concurrent bookings add to the row without reading it first.
+	"""
+	if not room_type or not from_date or not (sold or blocked):
+		return
+
+	total, out_of_order = get_room_counts([room_type])[room_type]
+	upsert(
+		[(room_type, night, total, out_of_order, sold, blocked) for night in get_nights(from_date, to_date)],
+		"sold = sold + VALUES(sold), blocked = blocked + VALUES(blocked)",
+	)
+
+
+def release_stays(stays):
+	"""
+	Give back every night of `stays`, (room_type, from_date, to_date) tuples,
+	with one statement for the lot: the bulk form of adjust_inventory with
+	sold=-1, for sweeps that release many stays at once.
+	"""
+	nights = Counter(
+		(room_type, night)
+		for room_type, from_date, to_date in stays
+		if room_type
+		for night in get_nights(from_date, to_date)
+	)
+	if not nights:
+		return
+
+	counts = get_room_counts({room_type for room_type, night in nights})
+	upsert(
+		[(room_type, night, *counts[room_type], -sold, 0) for (room_type, night), sold in nights.items()],
+		"sold = sold + VALUES(sold)",
+	)
+
+
+def get_stay_room_type(doc):
+	return doc.get("room_type") or (doc.get("room") and frappe.db.get_value("Room", doc.room, "room_type"))
+
+
+def update_stay_inventory(doc, sign=1):
+	"""Count the nights of a Reservation, or of a Check In made without one, as sold (or unsold with sign=-1)."""
+	if doc.doctype == "Reservation" and doc.get("reservation_type") == "Venue":
+		return
+	if doc.doctype == "Check In" and doc.get("reservation"):
+		# Already counted when the reservation was submitted
+		return
+	adjust_inventory(get_stay_room_type(doc), doc.check_in_date, doc.check_out_date, sold=sign)
+
+
+def extend_stay(room_type, old_check_out, new_check_out):
+	"""Count the nights added to a stay as sold, or give back the nights taken off it."""
+	if not old_check_out or not new_check_out:
+		return
+	old_check_out, new_check_out = getdate(old_check_out), getdate(new_check_out)
+	if new_check_out > old_check_out:
+		adjust_inventory(room_type, old_check_out, new_check_out, sold=1)
+	elif new_check_out < old_check_out:
+		adjust_inventory(room_type, new_check_out, old_check_out, sold=-1)
+
+
+def move_stay(from_room_type, to_room_type, from_date, to_date):
+	"""Move the nights of a stay from `from_date` up to `to_date` between room types."""
+	if from_room_type == to_room_type or not to_date or getdate(from_date) >= getdate(to_date):
+		return
+	adjust_inventory(from_room_type, from_date, to_date, sold=-1)
+	adjust_inventory(to_room_type, from_date, to_date, sold=1)
+
+
+def release_early_departure(check_out):
+	"""Give back the nights a guest paid for but did not stay."""
+	if not check_out.check_in:
+		return
+
+	stay = frappe.db.get_value("Check In", check_out.check_in, ["room", "check_out_date"], as_dict=True)
+	departed = getdate(check_out.actual_check_out_time or today())
+	if stay and stay.check_out_date and departed < getdate(stay.check_out_date):
+		room_type = frappe.db.get_value("Room", check_out.room or stay.room, "room_type")
+		adjust_inventory(room_type, departed, stay.check_out_date, sold=-1)
+
+
+def refresh_room_counts(room_types=None):
+	"""Bring total_rooms and out_of_order on today's and future rows in line with the Room list."""
+	if room_types is not None:
+		room_types = {room_type for room_type in room_types if room_type}
+		if not room_types:
+			return
+
+	condition = "AND inventory.room_type IN %(room_types)s" if room_types else ""
+	frappe.db.sql(
+		f"""
+		UPDATE `tabRoom Type Inventory` inventory
+		LEFT JOIN (
+			SELECT room_type, COUNT(*) AS total, SUM(IFNULL(housekeeping_status, '') = 'Out of Order') AS out_of_order
+			FROM `tabRoom`
+			GROUP BY room_type
+		) rooms ON rooms.room_type = inventory.room_type
+		SET inventory.total_rooms = IFNULL(rooms.total, 0),
+			inventory.out_of_order = IFNULL(rooms.out_of_order, 0)
+		WHERE inventory.date >= %(today)s {condition}
+	""",
+		{"today": today(), "room_types": tuple(set(room_types or ()))},
+	)
+
+
+def rebuild_inventory(days=REBUILD_DAYS):
+	"""
+	Daily job: recount sold nights from today on from the stays themselves,
+	correcting any drift in the incremental counters. Blocked counts are
+	left as they are.
+	"""
+	start = getdate(today())
+	end = add_days(start, cint(days))
+	# Once a reservation has arrived its Check In holds the stay: a move changes the
+	# room type, an extension the checkout, and leaving early gives back the nights
+	# after it, as move_stay, extend_stay and release_early_departure do
+	stays = frappe.db.sql(
+		"""
+		SELECT IFNULL(arrival.room_type, IFNULL(NULLIF(reservation.room_type, ''), room.room_type)) AS room_type,
+			DATE(reservation.check_in_date) AS check_in_date,
+			LEAST(
+				IFNULL(arrival.check_out_date, reservation.check_out_date),
+				COALESCE(arrival.departed, arrival.check_out_date, reservation.check_out_date)
+			) AS check_out_date
+		FROM `tabReservation` reservation
+		LEFT JOIN `tabRoom` room ON room.name = reservation.room
+		LEFT JOIN (
+			SELECT check_in.reservation, MIN(arrival_room.room_type) AS room_type,
+				MAX(check_in.check_out_date) AS check_out_date, MIN(DATE(check_in.actual_checkout_date)) AS departed
+			FROM `tabCheck In` check_in
+			LEFT JOIN `tabRoom` arrival_room ON arrival_room.name = check_in.room
+			WHERE check_in.docstatus = 1 AND IFNULL(check_in.reservation, '') != ''
+			GROUP BY check_in.reservation
+		) arrival ON arrival.reservation = reservation.name
+		WHERE reservation.docstatus = 1 AND IFNULL(reservation.reservation_type, 'Room') = 'Room'
+			AND IFNULL(reservation.status, '') != 'No Show'
+			AND DATE(reservation.check_in_date) < %(end)s
+			AND IFNULL(reservation.check_out_date, DATE(reservation.check_in_date)) >= %(start)s
+		UNION ALL
+		SELECT room.room_type, DATE(check_in.check_in_date),
+			LEAST(check_in.check_out_date, IFNULL(DATE(check_in.actual_checkout_date), check_in.check_out_date))
+		FROM `tabCheck In` check_in
+		JOIN `tabRoom` room ON room.name = check_in.room
+		WHERE check_in.docstatus = 1 AND IFNULL(check_in.reservation, '') = ''
+			AND DATE(check_in.check_in_date) < %(end)s
+			AND IFNULL(check_in.check_out_date, DATE(check_in.check_in_date)) >= %(start)s
+	""",
+		{"start": start, "end": end},
+		as_dict=True,
+	)
+
+	# Difference arrays: +1 on arrival, -1 on departure, then a running sum per type
+	changes = defaultdict(lambda: [0] * (cint(days) + 1))
+	for stay in stays:
+		if not stay.room_type:
+			continue
+		nights = get_nights(stay.check_in_date, stay.check_out_date)
+		first = max(date_diff(nights[0], start), 0)
+		last = min(date_diff(nights[-1], start) + 1, cint(days))
+		if first < last:
+			changes[stay.room_type][first] += 1
+			changes[stay.room_type][last] -= 1
+
+	counts = get_room_counts()
+	for room_type in set(counts) | set(changes):
+		total, out_of_order = counts[room_type]
+		sold, rows = 0, []
+		for day, change in enumerate(changes[room_type][:-1]):
+			sold += change
+			rows.append((room_type, add_days(start, day), total, out_of_order, sold, 0))
+		upsert(
+			rows,
+			"sold = VALUES(sold), total_rooms = VALUES(total_rooms), out_of_order = VALUES(out_of_order)",
+		)
+	frappe.db.commit()
+
+
+def get_nightly_availability(room_type, from_date, to_date):
+	"""
+	night -> rooms of `room_type` still free, for each night from `from_date`
+	to `to_date`. Reads one inventory row per night; a night without a row
+	has nothing sold yet.
+	"""
+	nights = get_nights(from_date, to_date)
+	total, out_of_order = get_room_counts([room_type])[room_type]
+	available = dict(
+		frappe.db.sql(
+			"""
+			SELECT date, total_rooms - out_of_order - sold - blocked
+			FROM `tabRoom Type Inventory`
+			WHERE room_type = %(room_type)s AND date BETWEEN %(from_date)s AND %(to_date)s
+		""",
+			{"room_type": room_type, "from_date": nights[0], "to_date": nights[-1]},
+		)
+	)
+	return {night: cint(available.get(getdate(night), total - out_of_order)) for night in nights}
+
+
+def get_availability(room_type, from_date, to_date):
+	"""Rooms of `room_type` still free on the tightest night between `from_date` and `to_date`."""
+	return min(get_nightly_availability(room_type, from_date, to_date).values())
+
+
+@frappe.whitelist()
+@instrument
+def get_room_type_availability(room_type, from_date, to_date=None):
+	frappe.has_permission("Reservation", "read", throw=True)
+	return get_availability(room_type, from_date, to_date)
+
+
+@frappe.whitelist()
+@instrument
+def block_rooms(room_type, from_date, to_date, rooms=1):
+	"""Hold `rooms` of a type back from sale for a date range, e.g. for a group; negative to release."""
+	frappe.only_for("System Manager")
+	adjust_inventory(room_type, from_date, to_date, blocked=cint(rooms))
+	return get_availability(room_type, from_date, to_date)
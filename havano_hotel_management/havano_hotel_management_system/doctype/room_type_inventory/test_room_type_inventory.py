@@ -0,0 +1,46 @@
+# Copyright (c) 2026, Alphazen Technologies and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate
+
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+	extend_stay,
+	get_nights,
+	move_stay,
+)
+
+
+class TestRoomTypeInventory(FrappeTestCase):
+	def test_nights_exclude_departure_day(self):
+		self.assertEqual(
+			get_nights("2026-03-30 14:00:00", "2026-04-02"),
+			[getdate("2026-03-30"), getdate("2026-03-31"), getdate("2026-04-01")],
+		)
+
+	def test_day_use_counts_one_night(self):
+		self.assertEqual(get_nights("2026-03-30", "2026-03-30"), [getdate("2026-03-30")])
+		self.assertEqual(get_nights("2026-03-30", None), [getdate("2026-03-30")])
+
+	def test_extensions_and_moves_carry_their_nights(self):
+		self.addCleanup(frappe.db.rollback)
+
+		def sold(room_type):
+			return dict(
+				frappe.get_all(
+					"Room Type Inventory", filters={"room_type": room_type, "sold": ["!=", 0]},
+					fields=["date", "sold"], as_list=True,
+				)
+			)
+
+		extend_stay("_Test Inventory Single", "2026-03-30", "2026-04-01")
+		self.assertEqual(sold("_Test Inventory Single"), {getdate("2026-03-30"): 1, getdate("2026-03-31"): 1})
+
+		move_stay("_Test Inventory Single", "_Test Inventory Double", "2026-03-31", "2026-04-01")
+		self.assertEqual(sold("_Test Inventory Single"), {getdate("2026-03-30"): 1})
+		self.assertEqual(sold("_Test Inventory Double"), {getdate("2026-03-31"): 1})
+
+		# Cutting the stay short gives the moved night back to its new type
+		extend_stay("_Test Inventory Double", "2026-04-01", "2026-03-31")
+		self.assertEqual(sold("_Test Inventory Double"), {})
@@ -0,0 +1,19 @@
+// Copyright (c) 2026, Alphazen Technologies and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Stay Archive", {
+	refresh(frm) {
+		frm.add_custom_button(__("View Document"), function() {
+			frappe.xcall(
+				"havano_hotel_management.havano_hotel_management_system.doctype.stay_archive.stay_archive.get_archived_document",
+				{ name: frm.doc.name }
+			).then(doc => {
+				frappe.msgprint({
+					title: __("{0} {1}", [__(frm.doc.reference_doctype), frm.doc.reference_name]),
+					message: `<pre style="max-height: 60vh; overflow: auto;">${frappe.utils.escape_html(JSON.stringify(doc, null, 1))}</pre>`,
+					wide: true
+				});
+			});
+		});
+	},
+});
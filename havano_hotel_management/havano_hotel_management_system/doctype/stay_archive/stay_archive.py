@@ -0,0 +1,335 @@
+# Copyright (c) 2026, Alphazen Technologies and contributors
+# For license information, please see license.txt
+
+import base64
+import json
+import zlib
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import add_months, cint, flt, getdate, now_datetime, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import (
+	get_hotel_settings,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import FOLIO_FIELD
+from havano_hotel_management.instrumentation import instrument
+
+BATCH_SIZE = 500
+
+# Archived in this order so a Reservation is only eligible once nothing live points at it
+ARCHIVE_DOCTYPES = ("Check Out", "Check In", "Booking", "Reservation")
+
+# Live documents that link to each archived doctype, as (doctype, link field); a record any of them points at is kept
+REFERENCES = {
+	"Check Out": (("Check Out", "amended_from"),),
+	"Check In": (
+		("Check In", "amended_from"),
+		("Room", "current_checkin"),
+	),
+	"Booking": (
+		("Booking", "amended_from"),
+		("Venue", "current_booking"),
+	),
+	"Reservation": (
+		("Reservation", "amended_from"),
+		("Check In", "reservation"),
+		("Booking", "reservation"),
+		("Room", "reservation"),
+		("Desk Folio", "reservation"),
+	),
+}
+
+# Submitted ledger documents that link back to a stay. They outlive it: the
+# link is recorded in the archive and cleared, so they can still be amended.
+LEDGER_LINKS = {
+	"Check In": (
+		("Payment Entry", "custom_check_in_reference"),
+		("Sales Invoice", "custom_check_in_reference"),
+	),
+	"Booking": (
+		("Payment Entry", "custom_booking_reference"),
+		("Sales Invoice", "custom_booking_reference"),
+	),
+}
+
+SUMMARY_FIELDS = [
+	"name", "creation", "modified", "owner", "modified_by", "docstatus",
+	"reference_doctype", "reference_name", "source_docstatus", "company",
+	"guest", "room", "venue", "reservation", "check_in",
+	"check_in_date", "check_out_date", "closed_on", "nights", "amount",
+	"archived_on", "payload",
+]
+
+
+class StayArchive(Document):
+	pass
+
+
+def pack(doc):
+	return base64.b64encode(zlib.compress(json.dumps(doc, default=str).encode(), 9)).decode()
+
+
+def unpack(payload):
+	return json.loads(zlib.decompress(base64.b64decode(payload)))
+
+
+def get_reference_guards(doctype):
+	"""
+	NOT EXISTS conditions on `doc` for every live reference to `doctype`.
+	A stay's own Room Folio and housekeeping tasks are archived with it, so
+	they only hold it back while a task is still open or the folio unsettled.
+	"""
+	guards = [
+		f"NOT EXISTS (SELECT 1 FROM `tab{ref_doctype}` ref WHERE ref.`{field}` = doc.name)"
+		for ref_doctype, field in REFERENCES[doctype]
+		if frappe.db.has_column(ref_doctype, field)
+	]
+	guards.append(
+		"""NOT EXISTS (
+			SELECT 1 FROM `tabHousekeeping` task
+			WHERE task.reference_doctype = %(doctype)s AND task.reference_name = doc.name
+				AND IFNULL(task.status, '') != 'Completed'
+		)"""
+	)
+	guards.append(
+		"""NOT EXISTS (
+			SELECT 1 FROM `tabRoom Folio` folio
+			WHERE folio.reference_doctype = %(doctype)s AND folio.reference_name = doc.name
+				AND (ABS(IFNULL(folio.room_folio_balance, 0)) >= 0.005 OR EXISTS (
+					SELECT 1 FROM `tabTransactions Child Table` charge
+					WHERE charge.parenttype = 'Room Folio' AND charge.parent = folio.name
+						AND IFNULL(charge.sales_invoice, '') = ''
+				))
+		)"""
+	)
+	return guards
+
+
+def get_eligible(doctype, cutoff, limit=BATCH_SIZE):
+	"""Names of closed `doctype` records older than `cutoff` that nothing live still points at."""
+	conditions = {
+		"Check Out": """
+			doc.docstatus IN (1, 2) AND IFNULL(doc.actual_check_out_time, doc.modified) < %(cutoff)s
+		""",
+		"Check In": """
+			((doc.docstatus = 1 AND doc.actual_checkout_date < %(cutoff)s)
+				OR (doc.docstatus = 2 AND doc.modified < %(cutoff)s))
+			AND NOT EXISTS (SELECT 1 FROM `tabCheck Out` co WHERE co.check_in = doc.name AND co.docstatus < 2)
+		""",
+		"Booking": """
+			doc.docstatus IN (1, 2) AND IFNULL(doc.check_out_time, doc.modified) < %(cutoff)s
+		""",
+		"Reservation": """
+			doc.docstatus IN (1, 2) AND IFNULL(doc.check_out_date, doc.modified) < %(cutoff)s
+		""",
+	}
+	return frappe.db.sql_list(
+		f"""
+		SELECT doc.name FROM `tab{doctype}` doc
+		WHERE {" AND ".join([conditions[doctype], *get_reference_guards(doctype)])}
+		ORDER BY doc.name
+		LIMIT %(limit)s
+	""",
+		{"cutoff": cutoff, "limit": limit, "doctype": doctype},
+	)
+
+
+def get_summary(doctype, doc):
+	"""The columns kept queryable for KPIs and history once the document itself is archived."""
+	summary = {"company": doc.get("company"), "room": doc.get("room"), "venue": doc.get("venue")}
+	if doctype == "Check In":
+		summary.update(
+			guest=doc.guest_name, reservation=doc.reservation, check_in_date=doc.check_in_date,
+			check_out_date=doc.check_out_date, nights=cint(doc.nights), amount=flt(doc.total_charge),
+			closed_on=doc.actual_checkout_date or doc.modified,
+		)
+	elif doctype == "Check Out":
+		summary.update(
+			guest=doc.guest, check_in=doc.check_in, check_out_date=doc.actual_check_out_time,
+			amount=flt(doc.total_charges), closed_on=doc.actual_check_out_time or doc.modified,
+		)
+	elif doctype == "Booking":
+		summary.update(
+			guest=doc.guest_name, reservation=doc.reservation, check_in_date=doc.check_in_date,
+			check_out_date=doc.check_out_time, amount=flt(doc.total_charge),
+			closed_on=doc.check_out_time or doc.modified,
+		)
+	else:
+		summary.update(
+			guest=doc.guest, check_in_date=doc.check_in_date, check_out_date=doc.check_out_date,
+			nights=cint(doc.nights), amount=None, closed_on=doc.check_out_date or doc.modified,
+		)
+
+	summary["closed_on"] = getdate(summary["closed_on"])
+	return summary
+
+
+def get_children(doctype, names):
+	"""parent -> parentfield -> child rows, for every table field of `doctype`."""
+	children = defaultdict(lambda: defaultdict(list))
+	if not names:
+		return children
+
+	for child_doctype in get_child_doctypes(doctype):
+		for child in frappe.db.sql(
+			f"""
+			SELECT * FROM `tab{child_doctype}`
+			WHERE parenttype = %(doctype)s AND parent IN %(names)s
+			ORDER BY idx
+		""",
+			{"doctype": doctype, "names": tuple(names)},
+			as_dict=True,
+		):
+			children[child.parent][child.parentfield].append(child)
+	return children
+
+
+def get_child_doctypes(doctype):
+	return [df.options for df in frappe.get_meta(doctype).get_table_fields()]
+
+
+def get_satellites(doctype, names):
+	"""
+	stay -> {"room_folios", "housekeeping", "ledger_links"}: the records that
+	only exist for the stays in `names` and go into the archive with them,
+	and the ledger documents whose links to them are cleared.
+	"""
+	satellites = defaultdict(lambda: {"room_folios": [], "housekeeping": [], "ledger_links": []})
+	params = {"doctype": doctype, "names": tuple(names)}
+
+	folios = frappe.db.sql(
+		"""
+		SELECT * FROM `tabRoom Folio`
+		WHERE reference_doctype = %(doctype)s AND reference_name IN %(names)s
+	""",
+		params,
+		as_dict=True,
+	)
+	folio_children = get_children("Room Folio", [folio.name for folio in folios])
+	folio_stays = {}
+	for folio in folios:
+		folio.update(folio_children.get(folio.name, {}))
+		folio["doctype"] = "Room Folio"
+		satellites[folio.reference_name]["room_folios"].append(folio)
+		folio_stays[folio.name] = folio.reference_name
+
+	for task in frappe.db.sql(
+		"""
+		SELECT * FROM `tabHousekeeping`
+		WHERE reference_doctype = %(doctype)s AND reference_name IN %(names)s
+	""",
+		params,
+		as_dict=True,
+	):
+		task["doctype"] = "Housekeeping"
+		satellites[task.reference_name]["housekeeping"].append(task)
+
+	for ref_doctype, field in get_ledger_links(doctype):
+		# Invoices billed through a folio point at the folio, not the stay
+		targets = tuple(folio_stays) if field == FOLIO_FIELD else tuple(names)
+		if not targets:
+			continue
+		for ref_name, target in frappe.db.sql(
+			f"SELECT name, `{field}` FROM `tab{ref_doctype}` WHERE `{field}` IN %(targets)s", {"targets": targets}
+		):
+			satellites[folio_stays.get(target, target)]["ledger_links"].append([ref_doctype, ref_name, field])
+	return satellites
+
+
+def get_ledger_links(doctype):
+	# Custom fields only exist where their fixtures are installed
+	links = [link for link in LEDGER_LINKS.get(doctype, ()) if frappe.db.has_column(*link)]
+	if doctype in ("Check In", "Booking") and frappe.db.has_column("Sales Invoice", FOLIO_FIELD):
+		links.append(("Sales Invoice", FOLIO_FIELD))
+	return links
+
+
+def archive_batch(doctype, names):
+	"""
+	Copy `names` with their child rows, Room Folios and housekeeping tasks
+	into Stay Archive, then delete them, in a few statements. Sales Invoices
+	and Payment Entries that pointed at them keep their place in the ledger:
+	the links are recorded in the archive and cleared.
+	"""
+	rows = frappe.db.sql(f"SELECT * FROM `tab{doctype}` WHERE name IN %(names)s", {"names": tuple(names)}, as_dict=True)
+	children = get_children(doctype, names)
+	satellites = get_satellites(doctype, names)
+
+	now = now_datetime()
+	values = []
+	folios, tasks = [], []
+	for row in rows:
+		row.update(children.get(row.name, {}))
+		row["doctype"] = doctype
+		stay_satellites = satellites.get(row.name)
+		if stay_satellites:
+			row["archived_with"] = stay_satellites
+			folios += [folio.name for folio in stay_satellites["room_folios"]]
+			tasks += [task.name for task in stay_satellites["housekeeping"]]
+		summary = get_summary(doctype, row)
+		values.append(
+			(
+				frappe.generate_hash(length=10), now, now, frappe.session.user, frappe.session.user, 0,
+				doctype, row.name, row.docstatus, summary["company"],
+				summary.get("guest"), summary["room"], summary["venue"], summary.get("reservation"), summary.get("check_in"),
+				summary.get("check_in_date"), summary.get("check_out_date"), summary["closed_on"],
+				summary.get("nights"), summary.get("amount"),
+				now, pack(row),
+			)
+		)
+
+	frappe.db.bulk_insert("Stay Archive", fields=SUMMARY_FIELDS, values=values)
+
+	for ref_doctype, field in get_ledger_links(doctype):
+		targets = folios if field == FOLIO_FIELD else names
+		if targets:
+			frappe.db.sql(
+				f"UPDATE `tab{ref_doctype}` SET `{field}` = NULL WHERE `{field}` IN %(targets)s",
+				{"targets": tuple(targets)},
+			)
+	if folios:
+		for child_doctype in get_child_doctypes("Room Folio"):
+			frappe.db.delete(child_doctype, {"parenttype": "Room Folio", "parent": ["in", folios]})
+		frappe.db.delete("Room Folio", {"name": ["in", folios]})
+	if tasks:
+		frappe.db.delete("Housekeeping", {"name": ["in", tasks]})
+
+	for child_doctype in get_child_doctypes(doctype):
+		frappe.db.delete(child_doctype, {"parenttype": doctype, "parent": ["in", names]})
+	frappe.db.delete(doctype, {"name": ["in", names]})
+	return len(values)
+
+
+def archive_closed_stays(months=None):
+	"""
+	Monthly job: move stays closed more than `archive_stays_after_months`
+	months ago out of the live tables. Does nothing while the setting is 0.
+	"""
+	months = cint(months or get_hotel_settings().archive_stays_after_months)
+	if months <= 0:
+		return {}
+
+	cutoff = add_months(today(), -months)
+	archived = {}
+	for doctype in ARCHIVE_DOCTYPES:
+		while names := get_eligible(doctype, cutoff):
+			archived[doctype] = archived.get(doctype, 0) + archive_batch(doctype, names)
+			# One batch per transaction keeps locks and undo logs short
+			frappe.db.commit()
+
+	return archived
+
+
+@frappe.whitelist()
+@instrument
+def get_archived_document(name):
+	"""The archived document of a Stay Archive row, with its child tables."""
+	archive = frappe.get_doc("Stay Archive", name)
+	archive.check_permission("read")
+	if not archive.payload:
+		frappe.throw(_("Stay Archive {0} has no archived document").format(name))
+	return unpack(archive.payload)
+
@@ -0,0 +1,106 @@
+# Copyright (c) 2026, Alphazen Technologies and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio import FOLIO_FIELD
+from havano_hotel_management.havano_hotel_management_system.doctype.stay_archive.stay_archive import (
+	archive_batch,
+	get_eligible,
+	pack,
+	unpack,
+)
+
+CLOSED = "2019-01-01 10:00:00"
+
+
+class TestStayArchive(FrappeTestCase):
+	def test_payload_round_trip(self):
+		doc = {"doctype": "Check In", "name": "CI-0001", "total_charge": 120.5, "other_guest": [{"guest": "G-1"}]}
+		payload = pack(doc)
+
+		self.assertIsInstance(payload, str)
+		self.assertEqual(unpack(payload), doc)
+
+	def insert_closed_check_in(self, name):
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabCheck In` (name, docstatus, actual_checkout_date, creation, modified)
+			VALUES (%s, 1, %s, %s, %s)
+		""",
+			(name, CLOSED, CLOSED, CLOSED),
+		)
+
+	def insert_satellite(self, doctype, name, check_in, **values):
+		values.update(name=name, reference_doctype="Check In", reference_name=check_in, creation=CLOSED, modified=CLOSED)
+		frappe.db.sql(
+			f"INSERT INTO `tab{doctype}` ({', '.join(f'`{field}`' for field in values)}) VALUES %s",
+			(tuple(values.values()),),
+		)
+
+	def insert_folio_charge(self, folio, sales_invoice=None):
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabTransactions Child Table` (name, parent, parenttype, parentfield, idx, amount, sales_invoice)
+			VALUES (%s, %s, 'Room Folio', 'transactions', 1, 100, %s)
+		""",
+			(frappe.generate_hash(length=10), folio, sales_invoice),
+		)
+
+	def test_stays_with_open_satellites_are_not_eligible(self):
+		for name in ("_Test Archive CI Free", "_Test Archive CI Folio", "_Test Archive CI Task"):
+			self.insert_closed_check_in(name)
+		self.insert_satellite("Room Folio", "_Test Archive Folio", "_Test Archive CI Folio", room_folio_balance=0)
+		self.insert_folio_charge("_Test Archive Folio")
+		self.insert_satellite("Housekeeping", "_Test Archive Task", "_Test Archive CI Task", status="Open")
+
+		eligible = set(get_eligible("Check In", "2020-01-01", limit=10**6))
+
+		self.assertIn("_Test Archive CI Free", eligible)
+		self.assertNotIn("_Test Archive CI Folio", eligible)
+		self.assertNotIn("_Test Archive CI Task", eligible)
+
+	def test_invoiced_stay_is_archived_with_its_satellites(self):
+		check_in, folio, invoice = "_Test Archive CI Invoiced", "_Test Archive Folio Invoiced", "_Test Archive SINV"
+		self.insert_closed_check_in(check_in)
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabHotel Payments` (name, parent, parenttype, parentfield, idx, sales_invoice, amount)
+			VALUES (%s, %s, 'Check In', 'sales_invoices_payments', 1, %s, 100)
+		""",
+			(frappe.generate_hash(length=10), check_in, invoice),
+		)
+		self.insert_satellite("Room Folio", folio, check_in, room_folio_balance=0)
+		self.insert_folio_charge(folio, sales_invoice=invoice)
+		self.insert_satellite("Housekeeping", "_Test Archive Task Done", check_in, status="Completed")
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabSales Invoice` (name, docstatus, custom_check_in_reference, `{FOLIO_FIELD}`, creation, modified)
+			VALUES (%s, 1, %s, %s, %s, %s)
+		""",
+			(invoice, check_in, folio, CLOSED, CLOSED),
+		)
+
+		self.assertIn(check_in, get_eligible("Check In", "2020-01-01", limit=10**6))
+		archive_batch("Check In", [check_in])
+
+		self.assertFalse(frappe.db.exists("Check In", check_in))
+		self.assertFalse(frappe.db.exists("Room Folio", folio))
+		self.assertFalse(frappe.db.exists("Housekeeping", "_Test Archive Task Done"))
+		self.assertFalse(frappe.db.exists("Transactions Child Table", {"parent": folio}))
+		self.assertEqual(
+			frappe.db.get_value("Sales Invoice", invoice, ["custom_check_in_reference", FOLIO_FIELD]), (None, None)
+		)
+
+		archived = unpack(frappe.db.get_value("Stay Archive", {"reference_doctype": "Check In", "reference_name": check_in}, "payload"))
+		self.assertEqual(archived["sales_invoices_payments"][0]["sales_invoice"], invoice)
+		self.assertEqual(archived["archived_with"]["room_folios"][0]["transactions"][0]["sales_invoice"], invoice)
+		self.assertEqual(archived["archived_with"]["housekeeping"][0]["name"], "_Test Archive Task Done")
+		self.assertCountEqual(
+			archived["archived_with"]["ledger_links"],
+			[["Sales Invoice", invoice, "custom_check_in_reference"], ["Sales Invoice", invoice, FOLIO_FIELD]],
+		)
+
+	def tearDown(self):
+		frappe.db.rollback()
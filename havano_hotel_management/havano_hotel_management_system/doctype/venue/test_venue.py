@@ -1,9 +1,24 @@
 # Copyright (c) 2025, Alphazen Technologies and Contributors
 # See license.txt
 
+from datetime import datetime
+
 # import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from havano_hotel_management.venue_schedule import get_bucket_occupancy
+
 
 class TestVenue(FrappeTestCase):
-	pass
+	def test_bucket_occupancy(self):
+		start = datetime(2026, 3, 2)
+		bookings = [
+			("Hall", datetime(2026, 3, 1, 22), datetime(2026, 3, 2, 1, 30)),
+			("Hall", datetime(2026, 3, 2, 5), datetime(2026, 3, 2, 6)),
+			("Garden", datetime(2026, 3, 2, 7), datetime(2026, 3, 3)),
+		]
+
+		occupancy = get_bucket_occupancy(bookings, start, 4, 120)
+
+		self.assertEqual(occupancy["Hall"], [90, 0, 60, 0])
+		self.assertEqual(occupancy["Garden"], [0, 0, 0, 60])
@@ -1,5 +1,6 @@
 frappe.listview_settings['Venue'] = {
     onload: function(listview) {
+        listview.page.add_inner_button(__("Timeline"), () => show_venue_timeline());
         check_overdue_checkouts();
         update_status_counts();
         // Switch to the existing "Venue View" kanban view on load
@@ -220,3 +221,88 @@ function check_overdue_checkouts() {
         }
     });
 }
+
+// Week-long occupancy grid for banquet planning, one row per venue
+function show_venue_timeline() {
+    let d = new frappe.ui.Dialog({
+        title: __("Venue Timeline"),
+        size: "extra-large",
+        fields: [
+            {
+                label: __("Week Of"),
+                fieldname: "week",
+                fieldtype: "Date",
+                default: frappe.datetime.get_today(),
+                onchange: () => load()
+            },
+            {
+                fieldtype: "Column Break",
+                fieldname: "col_break_1"
+            },
+            {
+                label: __("Bucket"),
+                fieldname: "bucket_minutes",
+                fieldtype: "Select",
+                options: [
+                    { value: "60", label: __("1 hour") },
+                    { value: "120", label: __("2 hours") },
+                    { value: "240", label: __("4 hours") },
+                    { value: "360", label: __("6 hours") }
+                ],
+                default: "240",
+                onchange: () => load()
+            },
+            {
+                fieldtype: "Section Break",
+                fieldname: "section_break_1"
+            },
+            {
+                fieldname: "timeline",
+                fieldtype: "HTML"
+            }
+        ]
+    });
+
+    function load() {
+        let values = d.get_values(true);
+        if (!values.week || !values.bucket_minutes) return;
+        frappe.xcall("havano_hotel_management.venue_schedule.get_venue_timeline", {
+            week: values.week,
+            bucket_minutes: values.bucket_minutes
+        }).then(timeline => d.fields_dict.timeline.$wrapper.html(render_venue_timeline(timeline)));
+    }
+
+    d.show();
+    load();
+}
+
+function render_venue_timeline(timeline) {
+    const per_day = timeline.buckets / 7;
+    const start = frappe.datetime.str_to_obj(timeline.start);
+    let header = "";
+    for (let day = 0; day < 7; day++) {
+        let date = frappe.datetime.add_days(start, day);
+        header += `<th colspan="${per_day}" class="text-center">${frappe.datetime.str_to_user(frappe.datetime.obj_to_str(date))}</th>`;
+    }
+
+    let rows = timeline.venues.map(([name, venue_name, capacity, occupancy, bookings]) => {
+        let cells = occupancy.map(percent => {
+            let shade = percent ? `background-color: rgba(230, 70, 70, ${0.2 + percent / 125});` : "";
+            return `<td style="min-width: 12px; padding: 0; ${shade}" title="${percent}%"></td>`;
+        }).join("");
+        let title = bookings.map(b => `${b[0]} ${b[1] || ""}: ${b[2]} - ${b[3]}`).join("\n");
+        return `<tr>
+            <td class="text-nowrap" title="${frappe.utils.escape_html(title)}">
+                <a href="/app/venue/${encodeURIComponent(name)}">${frappe.utils.escape_html(venue_name || name)}</a>
+                ${capacity ? `<span class="text-muted">(${capacity})</span>` : ""}
+            </td>${cells}
+        </tr>`;
+    }).join("");
+
+    return `<div style="overflow-x: auto;">
+        <table class="table table-bordered table-sm">
+            <thead><tr><th>${__("Venue")}</th>${header}</tr></thead>
+            <tbody>${rows}</tbody>
+        </table>
+    </div>`;
+}
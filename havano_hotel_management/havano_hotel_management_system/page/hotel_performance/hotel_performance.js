@@ -0,0 +1,85 @@
+frappe.pages['hotel-performance'].on_page_load = function(wrapper) {
+    const page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __('Hotel Performance'),
+        single_column: true
+    });
+
+    const order_by = page.add_field({
+        fieldname: 'order_by',
+        label: __('Sort By'),
+        fieldtype: 'Select',
+        options: [
+            { value: 'avg_ms', label: __('Average Time') },
+            { value: 'total_ms', label: __('Total Time') },
+            { value: 'calls', label: __('Calls') },
+            { value: 'avg_queries', label: __('Queries per Call') },
+            { value: 'avg_query_ms', label: __('SQL Time per Call') },
+            { value: 'avg_rows', label: __('Rows per Call') }
+        ],
+        default: 'avg_ms',
+        change: () => load_stats()
+    });
+
+    page.set_primary_action(__('Refresh'), () => load_stats(), 'refresh');
+    page.set_secondary_action(__('Reset'), () => {
+        frappe.confirm(__('Clear all recorded timings?'), () => {
+            frappe.call({
+                method: 'havano_hotel_management.instrumentation.reset_performance_stats',
+                callback: () => load_stats()
+            });
+        });
+    });
+
+    const $body = $('<div class="hotel-performance"></div>').appendTo(page.main);
+
+    function load_stats() {
+        frappe.call({
+            method: 'havano_hotel_management.instrumentation.get_performance_stats',
+            args: { order_by: order_by.get_value() || 'avg_ms' },
+            callback: function(r) {
+                render(r.message || []);
+            }
+        });
+    }
+
+    function render(stats) {
+        if (!stats.length) {
+            $body.html(`<div class="text-muted text-center" style="padding: 40px;">${__('No calls recorded yet')}</div>`);
+            return;
+        }
+
+        const rows = stats.map(row => `
+            <tr>
+                <td><code>${frappe.utils.escape_html(row.endpoint.replace('havano_hotel_management.', ''))}</code></td>
+                <td class="text-right">${row.calls}</td>
+                <td class="text-right">${row.avg_ms}</td>
+                <td class="text-right">${row.p50_ms}</td>
+                <td class="text-right">${row.p95_ms}</td>
+                <td class="text-right">${row.avg_queries}</td>
+                <td class="text-right">${row.avg_query_ms}</td>
+                <td class="text-right">${row.avg_rows}</td>
+            </tr>
+        `).join('');
+
+        $body.html(`
+            <table class="table table-bordered table-hover">
+                <thead>
+                    <tr>
+                        <th>${__('Endpoint')}</th>
+                        <th class="text-right">${__('Calls')}</th>
+                        <th class="text-right">${__('Avg ms')}</th>
+                        <th class="text-right">${__('p50 ms ≤')}</th>
+                        <th class="text-right">${__('p95 ms ≤')}</th>
+                        <th class="text-right">${__('Queries')}</th>
+                        <th class="text-right">${__('SQL ms')}</th>
+                        <th class="text-right">${__('Rows')}</th>
+                    </tr>
+                </thead>
+                <tbody>${rows}</tbody>
+            </table>
+        `);
+    }
+
+    load_stats();
+};
@@ -0,0 +1,33 @@
+// Copyright (c) 2026, Alphazen Technologies and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["On The Books"] = {
+	filters: [
+		{
+			fieldname: "from_date",
+			label: __("From Date"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+			reqd: 1
+		},
+		{
+			fieldname: "days",
+			label: __("Days"),
+			fieldtype: "Int",
+			default: 365,
+			reqd: 1
+		},
+		{
+			fieldname: "room_type",
+			label: __("Room Type"),
+			fieldtype: "Link",
+			options: "Room Type"
+		},
+		{
+			fieldname: "snapshot_date",
+			label: __("Pickup Since"),
+			fieldtype: "Date",
+			default: frappe.datetime.add_days(frappe.datetime.get_today(), -1)
+		}
+	]
+};
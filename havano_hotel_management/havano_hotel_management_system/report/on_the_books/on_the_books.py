@@ -0,0 +1,197 @@
+# Copyright (c) 2026, Alphazen Technologies and contributors
+# For license information, please see license.txt
+
+from collections import defaultdict
+from itertools import accumulate
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, date_diff, flt, get_datetime, getdate, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.on_the_books_snapshot.on_the_books_snapshot import (
+    load_snapshot,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+    get_room_counts,
+)
+
+DEFAULT_DAYS = 365
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    start, days = get_window(filters)
+
+    stays = get_stays(start, days)
+    current = get_on_the_books(stays, start, days)
+    before = get_snapshot_or_replay(stays, start, days, filters.get("snapshot_date"))
+
+    columns = get_columns()
+    data = get_rows(current, before, start, days, filters.get("room_type"))
+    return columns, data, None, get_chart_data(data)
+
+
+def get_window(filters):
+    start = getdate(filters.get("from_date") or today())
+    return start, max(cint(filters.get("days") or DEFAULT_DAYS), 1)
+
+
+def get_columns():
+    return [
+        {"fieldname": "date", "label": _("Date"), "fieldtype": "Date", "width": 100},
+        {"fieldname": "room_type", "label": _("Room Type"), "fieldtype": "Link", "options": "Room Type", "width": 130},
+        {"fieldname": "rooms", "label": _("Rooms"), "fieldtype": "Int", "width": 80},
+        {"fieldname": "rooms_sold", "label": _("Rooms Sold"), "fieldtype": "Int", "width": 100},
+        {"fieldname": "occupancy", "label": _("Occupancy %"), "fieldtype": "Percent", "width": 110},
+        {"fieldname": "revenue", "label": _("Revenue"), "fieldtype": "Currency", "width": 120},
+        {"fieldname": "pickup_rooms", "label": _("Pickup Rooms"), "fieldtype": "Int", "width": 110},
+        {"fieldname": "pickup_revenue", "label": _("Pickup Revenue"), "fieldtype": "Currency", "width": 130},
+    ]
+
+
+def get_stays(start, days):
+    """
+    Every Reservation, and every Check In made without one, touching the
+    window, live or cancelled, with its nightly rate and the timestamps
+    needed to replay the books as of an earlier date.
+    """
+    return frappe.db.sql(
+        """
+        SELECT IFNULL(NULLIF(reservation.room_type, ''), room.room_type) AS room_type,
+            DATE(reservation.check_in_date) AS check_in_date, reservation.check_out_date,
+            COALESCE(room.price, room_type.default_price, 0) AS rate,
+            reservation.docstatus, reservation.creation, reservation.modified,
+            (
+                SELECT MIN(check_in.actual_checkout_date) FROM `tabCheck In` check_in
+                WHERE check_in.reservation = reservation.name AND check_in.docstatus = 1
+            ) AS departed
+        FROM `tabReservation` reservation
+        LEFT JOIN `tabRoom` room ON room.name = reservation.room
+        LEFT JOIN `tabRoom Type` room_type ON room_type.name = IFNULL(NULLIF(reservation.room_type, ''), room.room_type)
+        WHERE reservation.docstatus IN (1, 2)
+            AND IFNULL(reservation.reservation_type, 'Room') = 'Room'
+            AND DATE(reservation.check_in_date) < %(end)s
+            AND IFNULL(reservation.check_out_date, DATE(reservation.check_in_date)) >= %(start)s
+        UNION ALL
+        SELECT room.room_type, DATE(check_in.check_in_date), check_in.check_out_date,
+            COALESCE(room.price, room_type.default_price, 0),
+            check_in.docstatus, check_in.creation, check_in.modified, check_in.actual_checkout_date
+        FROM `tabCheck In` check_in
+        JOIN `tabRoom` room ON room.name = check_in.room
+        LEFT JOIN `tabRoom Type` room_type ON room_type.name = room.room_type
+        WHERE check_in.docstatus IN (1, 2) AND IFNULL(check_in.reservation, '') = ''
+            AND DATE(check_in.check_in_date) < %(end)s
+            AND IFNULL(check_in.check_out_date, DATE(check_in.check_in_date)) >= %(start)s
+    """,
+        {"start": start, "end": add_days(start, days)},
+        as_dict=True,
+    )
+
+
+def sum_nights(stays, days):
+    """
+    room_type -> (rooms sold, revenue), each a list with one value per night.
+
+    `stays` are (room_type, first night, night after the last, nightly rate)
+    with nights counted from the start of the window. Each stay only marks
+    its two ends in a difference array; one running sum per room type then
+    gives every night, so the cost is stays + room types x days.
+    """
+    sold = defaultdict(lambda: [0] * (days + 1))
+    revenue = defaultdict(lambda: [0.0] * (days + 1))
+    for room_type, first, last, rate in stays:
+        first, last = max(first, 0), min(last, days)
+        if not room_type or first >= last:
+            continue
+        sold[room_type][first] += 1
+        sold[room_type][last] -= 1
+        revenue[room_type][first] += rate
+        revenue[room_type][last] -= rate
+
+    return {
+        room_type: (list(accumulate(sold[room_type]))[:days], list(accumulate(revenue[room_type]))[:days])
+        for room_type in sold
+    }
+
+
+def get_span(stay, start, until=None):
+    """The stay's (first, last) night offsets from `start`, cut short if the guest left early before `until`."""
+    first = date_diff(stay.check_in_date, start)
+    last = date_diff(stay.check_out_date, start) if stay.check_out_date else first + 1
+    if stay.departed and (until is None or get_datetime(stay.departed) <= until):
+        last = min(last, date_diff(stay.departed, start))
+    return first, max(last, first + 1)
+
+
+def get_on_the_books(stays, start, days):
+    return sum_nights(
+        [(stay.room_type, *get_span(stay, start), flt(stay.rate)) for stay in stays if stay.docstatus == 1],
+        days,
+    )
+
+
+def get_as_of(stays, start, days, as_of):
+    """The books as they stood at the end of `as_of`: created by then and not yet cancelled."""
+    until = get_datetime(add_days(as_of, 1))
+    return sum_nights(
+        [
+            (stay.room_type, *get_span(stay, start, until), flt(stay.rate))
+            for stay in stays
+            if get_datetime(stay.creation) < until and (stay.docstatus == 1 or get_datetime(stay.modified) >= until)
+        ],
+        days,
+    )
+
+
+def get_snapshot_or_replay(stays, start, days, snapshot_date=None):
+    """The books on `snapshot_date` (yesterday by default), from its stored snapshot when there is one."""
+    snapshot_date = getdate(snapshot_date or add_days(today(), -1))
+    return load_snapshot(snapshot_date, start, days) or get_as_of(stays, start, days, snapshot_date)
+
+
+def get_rows(current, before, start, days, room_type=None):
+    counts = get_room_counts()
+    room_types = sorted(set(current) | set(before) | set(counts))
+    if room_type:
+        room_types = [room_type]
+
+    empty = ([0] * days, [0.0] * days)
+    data = []
+    for day in range(days):
+        date = add_days(start, day)
+        for name in room_types:
+            rooms = counts[name][0] - counts[name][1]
+            sold, revenue = (values[day] for values in current.get(name, empty))
+            sold_before, revenue_before = (values[day] for values in before.get(name, empty))
+            data.append(
+                {
+                    "date": date,
+                    "room_type": name,
+                    "rooms": rooms,
+                    "rooms_sold": sold,
+                    "occupancy": flt(sold * 100 / rooms, 1) if rooms else 0,
+                    "revenue": flt(revenue, 2),
+                    "pickup_rooms": sold - sold_before,
+                    "pickup_revenue": flt(revenue - revenue_before, 2),
+                }
+            )
+    return data
+
+
+def get_chart_data(data):
+    sold, pickup = defaultdict(int), defaultdict(int)
+    for row in data:
+        sold[row["date"]] += row["rooms_sold"]
+        pickup[row["date"]] += row["pickup_rooms"]
+
+    dates = sorted(sold)
+    return {
+        "data": {
+            "labels": [str(date) for date in dates],
+            "datasets": [
+                {"name": _("Rooms Sold"), "values": [sold[date] for date in dates]},
+                {"name": _("Pickup"), "values": [pickup[date] for date in dates]},
+            ],
+        },
+        "type": "line",
+    }
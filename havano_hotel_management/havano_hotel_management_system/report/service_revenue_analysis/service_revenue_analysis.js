@@ -24,5 +24,44 @@ frappe.query_reports["Service Revenue Analysis"] = {
 			reqd: 1
 		}
 		
-	]
+	],
+
+	onload: function(report) {
+		// Large ranges are written to a file in the background instead of being built in the browser
+		report.page.add_inner_button(__("Export to File"), function() {
+			frappe.prompt(
+				{
+					fieldname: "file_format",
+					label: __("Format"),
+					fieldtype: "Select",
+					options: ["csv", "parquet"],
+					default: "csv",
+					reqd: 1
+				},
+				function(values) {
+					frappe.xcall("havano_hotel_management.exports.export_report", {
+						report_name: report.report_name,
+						filters: report.get_values(),
+						file_format: values.file_format
+					}).then(() => {
+						frappe.show_alert({
+							message: __("Export started. You will get a download link when it is ready."),
+							indicator: "blue"
+						});
+					});
+				},
+				__("Export {0}", [__(report.report_name)]),
+				__("Export")
+			);
+		});
+
+		frappe.realtime.off("hotel_report_export");
+		frappe.realtime.on("hotel_report_export", function(result) {
+			frappe.msgprint({
+				title: __("Export Ready"),
+				message: __("{0} rows exported. <a href=\"{1}\" target=\"_blank\">Download</a>", [result.rows, result.file_url]),
+				indicator: "green"
+			});
+		});
+	}
 };
\ No newline at end of file
@@ -3,7 +3,8 @@
 
 import frappe
 from frappe import _
-from datetime import datetime, timedelta, date
+from frappe.utils import add_days, getdate, today
+from datetime import timedelta
 
 def execute(filters=None):
     if not filters:
@@ -81,33 +82,54 @@ def get_columns():
     ]
 
 def get_data(filters):
-    # Date range for the report
-    start_date = filters.get("from_date") or frappe.utils.today()
-    end_date = filters.get("to_date") or frappe.utils.add_days(start_date, 30)
-    
-    # Ensure we have date objects for comparison
-    if isinstance(start_date, str):
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-    elif isinstance(start_date, datetime):
-        start_date_obj = start_date.date()
-    else:
-        start_date_obj = start_date
-        
-    if isinstance(end_date, str):
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-    elif isinstance(end_date, datetime):
-        end_date_obj = end_date.date()
-    else:
-        end_date_obj = end_date
-    
-    # Get all rooms
+    return list(iter_rows(filters))
+
+
+def get_date_range(filters):
+    start_date = getdate(filters.get("from_date") or today())
+    end_date = getdate(filters.get("to_date") or add_days(start_date, 30))
+    return start_date, end_date
+
+
+def count_rows(filters):
+    """Number of rows iter_rows will yield, for export progress."""
+    start_date, end_date = get_date_range(filters)
+    rooms = frappe.db.count("Room", filters.get("room_type") and {"room_type": filters.get("room_type")} or {})
+    return max(0, (end_date - start_date).days + 1) * rooms
+
+
+def iter_rows(filters, window=31):
+    """
+    Yield one row per room per day, date by date.
+
+    Stays are fetched and indexed one `window` of days at a time, so memory
+    stays flat however long the range is.
+    """
+    start_date, end_date = get_date_range(filters)
+
     rooms = frappe.get_all(
         "Room",
         fields=["name", "room_type", "price"],
         filters=filters.get("room_type") and {"room_type": filters.get("room_type")} or {},
     )
-    
-    # Get all checkins within date range
+
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(add_days(window_start, window - 1), end_date)
+        occupied, reserved = get_window_stays(window_start, window_end)
+
+        current_date = window_start
+        while current_date <= window_end:
+            date_str = current_date.strftime("%Y-%m-%d")
+            for room in rooms:
+                yield get_row(date_str, room, occupied.get((room.name, current_date)), reserved.get((room.name, current_date)))
+            current_date += timedelta(days=1)
+
+        window_start = add_days(window_end, 1)
+
+
+def get_window_stays(window_start, window_end):
+    """Return ({(room, date): check in}, {(room, date): reservation}) for the nights in the window."""
     checkins = frappe.get_all(
         "Check In",
         fields=[
@@ -119,12 +141,10 @@ def get_data(filters):
             "total_charge",
         ],
         filters=[
-            ["check_in_date", "<=", end_date],
-            ["check_out_date", ">=", start_date],
+            ["check_in_date", "<=", window_end],
+            ["check_out_date", ">=", window_start],
         ],
     )
-    
-    # Get all reservations within date range
     reservations = frappe.get_all(
         "Reservation",
         fields=[
@@ -135,139 +155,74 @@ def get_data(filters):
             "check_out_date",
         ],
         filters=[
-            ["check_in_date", "<=", end_date],
-            ["check_out_date", ">=", start_date],
+            ["check_in_date", "<=", window_end],
+            ["check_out_date", ">=", window_start],
         ],
     )
-    
-    # Prepare data
-    data = []
-    current_date = start_date_obj
-    
-    while current_date <= end_date_obj:
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        for room in rooms:
-            # Check if room is occupied on this date
-            occupied_checkin = None
-            for c in checkins:
-                # Convert check-in date to date object
-                if isinstance(c.check_in_date, str):
-                    check_in_date = datetime.strptime(c.check_in_date, "%Y-%m-%d").date()
-                elif isinstance(c.check_in_date, datetime):
-                    check_in_date = c.check_in_date.date()
-                else:
-                    check_in_date = c.check_in_date
-                
-                # Convert check-out date to date object
-                if isinstance(c.check_out_date, str):
-                    check_out_date = datetime.strptime(c.check_out_date, "%Y-%m-%d").date()
-                elif isinstance(c.check_out_date, datetime):
-                    check_out_date = c.check_out_date.date()
-                else:
-                    check_out_date = c.check_out_date
-                
-                if (c.room == room.name and 
-                    check_in_date <= current_date and 
-                    check_out_date > current_date):
-                    occupied_checkin = c
-                    break
-            
-            # Check if room is reserved on this date
-            reserved = None
-            for r in reservations:
-                # Convert check-in date to date object
-                if isinstance(r.check_in_date, str):
-                    check_in_date = datetime.strptime(r.check_in_date, "%Y-%m-%d").date()
-                elif isinstance(r.check_in_date, datetime):
-                    check_in_date = r.check_in_date.date()
-                else:
-                    check_in_date = r.check_in_date
-                
-                # Convert check-out date to date object
-                if isinstance(r.check_out_date, str):
-                    check_out_date = datetime.strptime(r.check_out_date, "%Y-%m-%d").date()
-                elif isinstance(r.check_out_date, datetime):
-                    check_out_date = r.check_out_date.date()
-                else:
-                    check_out_date = r.check_out_date
-                
-                if (r.room == room.name and 
-                    check_in_date <= current_date and 
-                    check_out_date > current_date):
-                    reserved = r
-                    break
-            
-            status = "Available"
-            checkin_id = ""
-            reservation_id = ""
-            guest_name = ""
-            daily_rate = 0
-            additional_charges = 0
-            total_revenue = 0
-            
-            if occupied_checkin:
-                status = "Occupied"
-                checkin_id = occupied_checkin.name
-                guest_name = occupied_checkin.guest_name
-                daily_rate = room.price or 0
-                
-                # Calculate additional charges per day (distribute evenly across stay)
-                # Convert check-in date to date object
-                if isinstance(occupied_checkin.check_in_date, str):
-                    check_in_date = datetime.strptime(occupied_checkin.check_in_date, "%Y-%m-%d").date()
-                elif isinstance(occupied_checkin.check_in_date, datetime):
-                    check_in_date = occupied_checkin.check_in_date.date()
-                else:
-                    check_in_date = occupied_checkin.check_in_date
-                
-                # Convert check-out date to date object
-                if isinstance(occupied_checkin.check_out_date, str):
-                    check_out_date = datetime.strptime(occupied_checkin.check_out_date, "%Y-%m-%d").date()
-                elif isinstance(occupied_checkin.check_out_date, datetime):
-                    check_out_date = occupied_checkin.check_out_date.date()
-                else:
-                    check_out_date = occupied_checkin.check_out_date
-                
-                stay_length = (check_out_date - check_in_date).days
-                if stay_length <= 0:
-                    stay_length = 1  # Ensure we don't divide by zero
-                
-                # Use total_charge if available, otherwise use room price
-                total_charge = getattr(occupied_checkin, 'total_charge', 0) or 0
-                
-                # Calculate additional charges as the difference between total and daily rate
-                # If total_charge is not available, set additional_charges to 0
-                if total_charge > 0:
-                    additional_charges = (total_charge - (daily_rate * stay_length)) / stay_length
-                    if additional_charges < 0:
-                        additional_charges = 0
-                
-                total_revenue = daily_rate + additional_charges
-                
-            elif reserved:
-                status = "Reserved"
-                reservation_id = reserved.name
-                guest_name = reserved.guest
-                daily_rate = room.price or 0
-                total_revenue = daily_rate
-            
-            data.append({
-                "date": date_str,
-                "room_type": room.room_type,
-                "room_id": room.name,
-                "occupancy_status": status,
-                "reservation_id": reservation_id,
-                "checkin_id": checkin_id,
-                "guest_name": guest_name,
-                "daily_rate": daily_rate,
-                "additional_charges": additional_charges,
-                "total_revenue": total_revenue,
-            })
-        
-        current_date += timedelta(days=1)
-    
-    return data
+    return index_nights(checkins, window_start, window_end), index_nights(reservations, window_start, window_end)
+
+
+def index_nights(stays, window_start, window_end):
+    # A room is taken from check in up to, not including, the check out date.
+    # If two stays overlap, the first one listed wins.
+    nights = {}
+    for stay in stays:
+        stay.check_in_date = getdate(stay.check_in_date)
+        stay.check_out_date = getdate(stay.check_out_date)
+        day = max(stay.check_in_date, window_start)
+        while day < stay.check_out_date and day <= window_end:
+            nights.setdefault((stay.room, day), stay)
+            day += timedelta(days=1)
+    return nights
+
+
+def get_row(date_str, room, occupied_checkin, reserved):
+    status = "Available"
+    checkin_id = ""
+    reservation_id = ""
+    guest_name = ""
+    daily_rate = 0
+    additional_charges = 0
+    total_revenue = 0
+
+    if occupied_checkin:
+        status = "Occupied"
+        checkin_id = occupied_checkin.name
+        guest_name = occupied_checkin.guest_name
+        daily_rate = room.price or 0
+
+        # Spread the charges above the room rate evenly across the stay
+        stay_length = (occupied_checkin.check_out_date - occupied_checkin.check_in_date).days
+        if stay_length <= 0:
+            stay_length = 1  # Ensure we don't divide by zero
+
+        total_charge = occupied_checkin.total_charge or 0
+        if total_charge > 0:
+            additional_charges = (total_charge - (daily_rate * stay_length)) / stay_length
+            if additional_charges < 0:
+                additional_charges = 0
+
+        total_revenue = daily_rate + additional_charges
+
+    elif reserved:
+        status = "Reserved"
+        reservation_id = reserved.name
+        guest_name = reserved.guest
+        daily_rate = room.price or 0
+        total_revenue = daily_rate
+
+    return {
+        "date": date_str,
+        "room_type": room.room_type,
+        "room_id": room.name,
+        "occupancy_status": status,
+        "reservation_id": reservation_id,
+        "checkin_id": checkin_id,
+        "guest_name": guest_name,
+        "daily_rate": daily_rate,
+        "additional_charges": additional_charges,
+        "total_revenue": total_revenue,
+    }
 
 def get_chart_data(data, filters):
     # Prepare data for chart
@@ -64,6 +64,11 @@ app_include_css = "/assets/havano_hotel_management/css/app.css"
 # 	"Role": "home_page"
 # }
 
+# Boot
+# ----
+
+boot_session = "havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings.boot_session"
+
 # Generators
 # ----------
 
@@ -169,6 +174,17 @@ doc_events = {
         # "validate": "havano_hotel_management.api.validate_booking",
         "on_submit": "havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.create_sales_invoice"
     },
+    "Sales Invoice": {
+        "on_submit": "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.on_sales_invoice_submit",
+        "on_cancel": [
+            "havano_hotel_management.api.release_charge_key",
+            "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.on_sales_invoice_cancel"
+        ]
+    },
+    "Payment Entry": {
+        "on_submit": "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.on_payment_entry_submit",
+        "on_cancel": "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.on_payment_entry_cancel"
+    },
 }
 
 fixtures = [
@@ -183,7 +199,19 @@ scheduler_events = {
         "*/30 * * * *": [
             "havano_hotel_management.havano_hotel_management_system.doctype.booking.booking.check_and_update_bookings"
         ]
-    }
+    },
+    "daily": [
+        "havano_hotel_management.havano_hotel_management_system.doctype.housekeeping.housekeeping.generate_stay_over_tasks",
+        "havano_hotel_management.havano_hotel_management_system.doctype.room_folio.room_folio.reconcile_folio_balances",
+        "havano_hotel_management.havano_hotel_management_system.doctype.room.room.mark_overdue_checkouts",
+        "havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation.release_no_shows",
+        "havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory.rebuild_inventory",
+        "havano_hotel_management.overbooking.refresh_overbooking_allowances",
+        "havano_hotel_management.havano_hotel_management_system.doctype.on_the_books_snapshot.on_the_books_snapshot.take_snapshot"
+    ],
+    "monthly": [
+        "havano_hotel_management.havano_hotel_management_system.doctype.stay_archive.stay_archive.archive_closed_stays"
+    ],
 }
 
 # scheduler_events = {
@@ -0,0 +1,169 @@
+import functools
+import time
+
+import frappe
+from frappe import _
+
+# Upper bounds in milliseconds; anything slower lands in "inf"
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+ENDPOINTS_KEY = "hotel_perf_endpoints"
+STATS_KEY = "hotel_perf|{0}"
+
+
+def instrument(fn):
+    """
+    Record wall time, SQL query count and time, and rows fetched for every
+    call of `fn`, aggregated per endpoint into a Redis histogram.
+
+    Apply it below @frappe.whitelist() so the instrumented function is the
+    one that gets whitelisted.
+    """
+    endpoint = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        frame = {"queries": 0, "query_ms": 0.0, "rows": 0}
+        stack = _push(frame)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            _pop(stack, frame)
+            _record(endpoint, elapsed, frame)
+
+    return wrapper
+
+
+def _push(frame):
+    stack = getattr(frappe.local, "hotel_perf_stack", None)
+    if stack is None:
+        stack = frappe.local.hotel_perf_stack = []
+
+    if not stack:
+        # Outermost call: count every query run on this connection until it returns
+        original = frappe.db.sql
+        frappe.local.hotel_perf_sql = original
+        frappe.db.sql = functools.partial(_counting_sql, original)
+
+    stack.append(frame)
+    return stack
+
+
+def _pop(stack, frame):
+    stack.remove(frame)
+    if not stack and getattr(frappe.local, "hotel_perf_sql", None):
+        frappe.db.sql = frappe.local.hotel_perf_sql
+        frappe.local.hotel_perf_sql = None
+
+
+def _counting_sql(original, *args, **kwargs):
+    start = time.perf_counter()
+    result = original(*args, **kwargs)
+    elapsed = (time.perf_counter() - start) * 1000
+    rows = len(result) if isinstance(result, (list, tuple)) else 0
+
+    # Nested instrumented calls each see the queries they caused
+    for frame in getattr(frappe.local, "hotel_perf_stack", None) or ():
+        frame["queries"] += 1
+        frame["query_ms"] += elapsed
+        frame["rows"] += rows
+
+    return result
+
+
+def get_bucket(elapsed):
+    for bound in BUCKETS:
+        if elapsed <= bound:
+            return str(bound)
+    return "inf"
+
+
+def _record(endpoint, elapsed, frame):
+    try:
+        cache = frappe.cache()
+        key = cache.make_key(STATS_KEY.format(endpoint))
+        pipe = cache.pipeline(transaction=False)
+        pipe.sadd(cache.make_key(ENDPOINTS_KEY), endpoint)
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrby(key, f"le_{get_bucket(elapsed)}", 1)
+        pipe.hincrbyfloat(key, "total_ms", round(elapsed, 3))
+        pipe.hincrby(key, "queries", frame["queries"])
+        pipe.hincrbyfloat(key, "query_ms", round(frame["query_ms"], 3))
+        pipe.hincrby(key, "rows", frame["rows"])
+        pipe.execute()
+    except Exception:
+        # Never let bookkeeping fail the call it measures
+        frappe.logger("hotel_performance").warning(f"Could not record timing for {endpoint}", exc_info=True)
+
+
+def get_percentile(histogram, calls, percentile):
+    """Upper bound of the bucket holding the given percentile of calls."""
+    target = calls * percentile
+    seen = 0
+    for bound in [str(b) for b in BUCKETS] + ["inf"]:
+        seen += histogram.get(bound, 0)
+        if seen >= target:
+            return bound
+    return "inf"
+
+
+def get_endpoint_stats(endpoint, values):
+    calls = int(values.get("calls") or 0)
+    if not calls:
+        return None
+
+    histogram = {
+        field[3:]: int(count) for field, count in values.items() if field.startswith("le_")
+    }
+    total_ms = float(values.get("total_ms") or 0)
+    queries = int(values.get("queries") or 0)
+    return {
+        "endpoint": endpoint,
+        "calls": calls,
+        "avg_ms": round(total_ms / calls, 2),
+        "p50_ms": get_percentile(histogram, calls, 0.5),
+        "p95_ms": get_percentile(histogram, calls, 0.95),
+        "total_ms": round(total_ms, 2),
+        "avg_queries": round(queries / calls, 1),
+        "avg_query_ms": round(float(values.get("query_ms") or 0) / calls, 2),
+        "avg_rows": round(int(values.get("rows") or 0) / calls, 1),
+        "histogram": histogram,
+    }
+
+
+@frappe.whitelist()
+def get_performance_stats(order_by="avg_ms", limit=50):
+    """Per-endpoint timings, slowest first."""
+    frappe.only_for("System Manager")
+    if order_by not in ("avg_ms", "total_ms", "calls", "avg_queries", "avg_query_ms", "avg_rows"):
+        frappe.throw(_("Cannot sort by {0}").format(order_by))
+
+    cache = frappe.cache()
+    endpoints = sorted(e.decode() if isinstance(e, bytes) else e for e in cache.smembers(ENDPOINTS_KEY))
+    pipe = cache.pipeline(transaction=False)
+    for endpoint in endpoints:
+        pipe.hgetall(cache.make_key(STATS_KEY.format(endpoint)))
+
+    stats = []
+    for endpoint, values in zip(endpoints, pipe.execute()):
+        values = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in values.items()
+        }
+        row = get_endpoint_stats(endpoint, values)
+        if row:
+            stats.append(row)
+
+    stats.sort(key=lambda row: row[order_by], reverse=True)
+    return stats[: int(limit)]
+
+
+@frappe.whitelist()
+def reset_performance_stats():
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    endpoints = [e.decode() if isinstance(e, bytes) else e for e in cache.smembers(ENDPOINTS_KEY)]
+    cache.delete_value([STATS_KEY.format(endpoint) for endpoint in endpoints] + [ENDPOINTS_KEY])
+    return len(endpoints)
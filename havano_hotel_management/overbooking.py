@@ -0,0 +1,127 @@
+import math
+from collections import defaultdict
+
+import frappe
+from frappe.utils import add_days, cint, getdate, today
+
+from havano_hotel_management.havano_hotel_management_system.doctype.hotel_settings.hotel_settings import (
+    get_hotel_settings,
+)
+from havano_hotel_management.havano_hotel_management_system.doctype.room_type_inventory.room_type_inventory import (
+    get_room_counts,
+)
+from havano_hotel_management.instrumentation import instrument
+
+CACHE_KEY = "hotel_overbooking_allowances"
+
+# Cancellations this close to arrival count as lost nights, like no-shows
+LATE_CANCEL_DAYS = 2
+
+# Weekdays with few reservations lean on the room type's overall rate (samples worth of prior)
+PRIOR_WEIGHT = 20
+
+# Standard deviations of caution: 1.0 leaves about a 1 in 6 chance of walking a guest on a full night
+RISK_MARGIN = 1.0
+
+
+def shrink(events, samples, prior_rate, weight=PRIOR_WEIGHT):
+    """The rate events / samples, pulled towards `prior_rate` when there are few samples."""
+    return (events + prior_rate * weight) / (samples + weight) if samples + weight else 0.0
+
+
+def get_allowance(rooms, rate, margin=RISK_MARGIN):
+    """
+    Rooms that can be sold beyond `rooms` when each booking is lost with
+    probability `rate`: the expected losses less `margin` standard deviations.
+    """
+    if rooms <= 0 or rate <= 0:
+        return 0
+    expected = rooms * rate
+    return max(int(math.floor(expected - margin * math.sqrt(expected * (1 - rate)))), 0)
+
+
+def compute_allowances(history, rooms):
+    """
+    room_type -> seven allowances, Monday first.
+
+    `history` rows are (room_type, weekday, reservations, lost) with weekday
+    0 for Monday and lost the no-shows plus late cancellations. `rooms` maps
+    room_type to the number of rooms that can be sold.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    by_weekday = defaultdict(dict)
+    for room_type, weekday, reservations, lost in history:
+        totals[room_type][0] += cint(reservations)
+        totals[room_type][1] += cint(lost)
+        by_weekday[room_type][cint(weekday)] = (cint(reservations), cint(lost))
+
+    allowances = {}
+    for room_type, (reservations, lost) in totals.items():
+        overall = lost / reservations if reservations else 0.0
+        allowances[room_type] = []
+        for weekday in range(7):
+            samples, events = by_weekday[room_type].get(weekday, (0, 0))
+            allowances[room_type].append(get_allowance(cint(rooms.get(room_type)), shrink(events, samples, overall)))
+    return allowances
+
+
+def get_history(days):
+    """(room_type, weekday, reservations, lost) over the last `days` days of arrivals, aggregated in the database."""
+    return frappe.db.sql(
+        """
+        SELECT IFNULL(NULLIF(reservation.room_type, ''), room.room_type) AS room_type,
+            WEEKDAY(reservation.check_in_date) AS weekday,
+            COUNT(*) AS reservations,
+            SUM(
+                (reservation.docstatus = 1 AND arrived.reservation IS NULL)
+                OR (reservation.docstatus = 2
+                    AND reservation.modified >= DATE_SUB(DATE(reservation.check_in_date), INTERVAL %(late_days)s DAY))
+            ) AS lost
+        FROM `tabReservation` reservation
+        LEFT JOIN `tabRoom` room ON room.name = reservation.room
+        LEFT JOIN (
+            SELECT DISTINCT reservation FROM `tabCheck In`
+            WHERE docstatus = 1 AND IFNULL(reservation, '') != ''
+        ) arrived ON arrived.reservation = reservation.name
+        WHERE reservation.docstatus IN (1, 2)
+            AND IFNULL(reservation.reservation_type, 'Room') = 'Room'
+            AND DATE(reservation.check_in_date) BETWEEN %(from_date)s AND %(to_date)s
+        GROUP BY 1, 2
+        HAVING room_type IS NOT NULL
+    """,
+        {
+            "late_days": LATE_CANCEL_DAYS,
+            "from_date": add_days(today(), -max(cint(days), 1)),
+            "to_date": add_days(today(), -1),
+        },
+    )
+
+
+def refresh_overbooking_allowances():
+    """Daily job: recompute the per-room-type, per-weekday allowances and cache them."""
+    counts = get_room_counts()
+    rooms = {room_type: total - out_of_order for room_type, (total, out_of_order) in counts.items()}
+    allowances = compute_allowances(get_history(get_hotel_settings().overbooking_history_days or 365), rooms)
+    frappe.cache().set_value(CACHE_KEY, allowances)
+    return allowances
+
+
+def get_overbooking_allowances():
+    allowances = frappe.cache().get_value(CACHE_KEY)
+    if allowances is None:
+        allowances = refresh_overbooking_allowances()
+    return allowances
+
+
+def get_overbooking_allowance(room_type, date):
+    """Rooms of `room_type` that may be sold beyond capacity on `date`; a cached lookup."""
+    weekdays = get_overbooking_allowances().get(room_type)
+    return weekdays[getdate(date).weekday()] if weekdays else 0
+
+
+@frappe.whitelist()
+@instrument
+def get_overbooking_forecast():
+    """The cached allowances for the desk, room_type -> seven weekdays, Monday first."""
+    frappe.has_permission("Reservation", "read", throw=True)
+    return get_overbooking_allowances()
@@ -0,0 +1,296 @@
+from bisect import bisect_left, bisect_right
+
+import frappe
+from frappe.utils import add_days, cint, getdate, today
+
+from havano_hotel_management.instrumentation import instrument
+
+# A preference missed costs more than any gap, so preferences are honoured first
+PREFERENCE_WEIGHT = 10**6
+
+
+class RoomSchedule:
+    """The nights a room is taken, as sorted, non-overlapping [start, end) day numbers."""
+
+    def __init__(self, room):
+        self.room = room
+        self.starts = []
+        self.ends = []
+        self.owners = []
+
+    def add(self, start, end, owner):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.owners.insert(i, owner)
+
+    def remove(self, owner):
+        i = self.owners.index(owner)
+        del self.starts[i], self.ends[i], self.owners[i]
+
+    def overlapping(self, start, end):
+        """Indexes of the stays that share at least one night with [start, end)."""
+        i = bisect_left(self.starts, end)
+        j = i
+        while j > 0 and self.ends[j - 1] > start:
+            j -= 1
+        return range(j, i)
+
+    def gap(self, start, end):
+        """
+        Empty nights left (before, after) [start, end), None on a side with
+        nothing booked, or None overall if it does not fit.
+        """
+        i = bisect_right(self.starts, start)
+        before = start - self.ends[i - 1] if i else None
+        after = self.starts[i] - end if i < len(self.starts) else None
+        if (before is not None and before < 0) or (after is not None and after < 0):
+            return None
+        return before, after
+
+
+def get_preference_misses(room, stay):
+    misses = 0
+    if stay.get("floor") and room.get("floor") != stay["floor"]:
+        misses += 1
+    misses += len(set(stay.get("amenities") or ()) - set(room.get("amenities") or ()))
+    return misses
+
+
+def find_room(stay, rooms, schedules, horizon, exclude=None):
+    """The best free room for `stay`: preferences first, then the snuggest fit."""
+    best, best_score = None, None
+    for room in rooms:
+        if room["name"] == exclude:
+            continue
+        gap = schedules[room["name"]].gap(stay["start"], stay["end"])
+        if gap is None:
+            continue
+        score = get_preference_misses(room, stay) * PREFERENCE_WEIGHT + sum(
+            horizon if side is None else side for side in gap
+        )
+        if best_score is None or score < best_score:
+            best, best_score = room, score
+            if score == 0:
+                break
+    return best
+
+
+def assign_rooms(stays, rooms, taken=()):
+    """
+    Pick a room for each of `stays` without moving anything in `taken`.
+
+    `stays` are dicts with name, room_type, start and end (day numbers, end
+    exclusive) and optional floor and amenities preferences. `rooms` are dicts
+    with name, room_type, floor and amenities. `taken` holds (room, start, end,
+    owner) for stays that already have a room.
+
+    Stays are placed in order of arrival, longest first, each into the room of
+    its type that honours the most preferences and leaves the smallest gaps
+    either side (best fit). A stay that fits nowhere is repaired by moving
+    one stay placed earlier in this run to another room and taking its place.
+
+    Returns ({stay name: room}, [stay names left unassigned]).
+    """
+    schedules = {room["name"]: RoomSchedule(room["name"]) for room in rooms}
+    for room, start, end, owner in taken:
+        if room in schedules:
+            schedules[room].add(start, end, owner)
+
+    rooms_by_type = {}
+    for room in rooms:
+        rooms_by_type.setdefault(room["room_type"], []).append(room)
+
+    horizon = max((stay["end"] for stay in stays), default=0) - min((stay["start"] for stay in stays), default=0)
+    by_name = {stay["name"]: stay for stay in stays}
+    assigned, unassigned = {}, []
+
+    for stay in sorted(stays, key=lambda stay: (stay["start"], stay["start"] - stay["end"], stay["name"])):
+        candidates = rooms_by_type.get(stay["room_type"], [])
+        room = find_room(stay, candidates, schedules, horizon)
+        if not room:
+            room = repair(stay, candidates, schedules, horizon, assigned, by_name)
+        if not room:
+            unassigned.append(stay["name"])
+            continue
+        schedules[room["name"]].add(stay["start"], stay["end"], stay["name"])
+        assigned[stay["name"]] = room["name"]
+
+    return assigned, unassigned
+
+
+def repair(stay, rooms, schedules, horizon, assigned, by_name):
+    """
+    Free a room for `stay` by moving the single stay in its way, if that stay
+    was placed in this run and fits in another room. Returns the freed room.
+    """
+    for room in rooms:
+        schedule = schedules[room["name"]]
+        blocking = schedule.overlapping(stay["start"], stay["end"])
+        if len(blocking) != 1:
+            continue
+        owner = schedule.owners[blocking[0]]
+        if owner not in assigned:
+            continue
+
+        moved = by_name[owner]
+        schedule.remove(owner)
+        target = find_room(moved, rooms, schedules, horizon, exclude=room["name"])
+        if target:
+            schedules[target["name"]].add(moved["start"], moved["end"], owner)
+            assigned[owner] = target["name"]
+            return room
+        schedule.add(moved["start"], moved["end"], owner)
+
+
+def get_day(date, origin):
+    return (getdate(date) - origin).days
+
+
+@frappe.whitelist()
+@instrument
+def auto_assign_rooms(from_date=None, days=30, dry_run=0):
+    """
+    Assign rooms to submitted Reservations that only name a Room Type and
+    arrive within `days` of `from_date`. With dry_run the plan is returned
+    without saving it.
+    """
+    frappe.has_permission("Reservation", "write", throw=True)
+    origin = getdate(from_date or today())
+    to_date = add_days(origin, cint(days))
+
+    stays = get_unassigned_stays(origin, to_date)
+    if not stays:
+        return {"assigned": {}, "unassigned": []}
+
+    rooms = get_rooms({stay["room_type"] for stay in stays})
+    last_night = add_days(origin, max(stay["end"] for stay in stays))
+    taken = get_taken_nights(origin, last_night, [room["name"] for room in rooms])
+    assigned, unassigned = assign_rooms(stays, rooms, taken)
+
+    if not cint(dry_run):
+        save_assignments(assigned, origin)
+
+    return {"assigned": assigned, "unassigned": unassigned}
+
+
+def get_unassigned_stays(origin, to_date):
+    reservations = frappe.db.sql(
+        """
+        SELECT name, room_type, preferred_floor AS floor, check_in_date, check_out_date, nights
+        FROM `tabReservation`
+        WHERE docstatus = 1 AND reservation_type = 'Room' AND IFNULL(room, '') = ''
+            AND IFNULL(room_type, '') != '' AND IFNULL(status, '') != 'No Show'
+            AND DATE(check_in_date) BETWEEN %(origin)s AND %(to_date)s
+        ORDER BY check_in_date, name
+    """,
+        {"origin": origin, "to_date": to_date},
+        as_dict=True,
+    )
+    if not reservations:
+        return []
+
+    amenities = {}
+    for row in frappe.get_all(
+        "Room Amenities",
+        filters={"parenttype": "Reservation", "parentfield": "preferred_amenities", "parent": ["in", [r.name for r in reservations]]},
+        fields=["parent", "amenity"],
+    ):
+        amenities.setdefault(row.parent, set()).add(row.amenity)
+
+    stays = []
+    for reservation in reservations:
+        start = get_day(reservation.check_in_date, origin)
+        end = get_day(reservation.check_out_date, origin) if reservation.check_out_date else start + max(cint(reservation.nights), 1)
+        stays.append(
+            {
+                "name": reservation.name,
+                "room_type": reservation.room_type,
+                "start": start,
+                "end": max(end, start + 1),
+                "floor": reservation.floor,
+                "amenities": amenities.get(reservation.name, set()),
+            }
+        )
+    return stays
+
+
+def get_rooms(room_types):
+    rooms = frappe.get_all(
+        "Room",
+        filters={"room_type": ["in", list(room_types)], "housekeeping_status": ["!=", "Out of Order"]},
+        fields=["name", "room_type", "floor"],
+        order_by="name",
+    )
+    amenities = {}
+    for row in frappe.get_all(
+        "Room Amenities",
+        filters={"parenttype": "Room", "parent": ["in", [room.name for room in rooms]]},
+        fields=["parent", "amenity"],
+    ):
+        amenities.setdefault(row.parent, set()).add(row.amenity)
+
+    return [dict(room, amenities=amenities.get(room.name, set())) for room in rooms]
+
+
+def get_taken_nights(origin, to_date, rooms):
+    """Nights already held in `rooms` by reservations that have a room and by stays still in house."""
+    if not rooms:
+        return []
+
+    rows = frappe.db.sql(
+        """
+        SELECT room, DATE(check_in_date) AS start, check_out_date AS end, nights, name, 0 AS in_house
+        FROM `tabReservation`
+        WHERE docstatus = 1 AND room IN %(rooms)s AND IFNULL(status, '') != 'No Show'
+            AND DATE(check_in_date) < %(to_date)s AND IFNULL(check_out_date, check_in_date) >= %(origin)s
+        UNION ALL
+        SELECT room, DATE(check_in_date), check_out_date, nights, name, 1
+        FROM `tabCheck In`
+        WHERE docstatus = 1 AND room IN %(rooms)s AND actual_checkout_date IS NULL
+            AND DATE(check_in_date) < %(to_date)s
+    """,
+        {"rooms": tuple(rooms), "origin": origin, "to_date": to_date},
+        as_dict=True,
+    )
+
+    taken = []
+    for row in rows:
+        start = get_day(row.start, origin)
+        end = max(get_day(row.end, origin) if row.end else start + cint(row.nights), start + 1)
+        if row.in_house:
+            # A guest still in house past their checkout date keeps the room at least tonight
+            end = max(end, 1)
+        taken.append((row.room, start, end, row.name))
+    return merge_taken(taken)
+
+
+def merge_taken(taken):
+    """Fold overlapping holds on the same room into one, so each room's schedule stays non-overlapping."""
+    merged = []
+    for room, start, end, owner in sorted(taken):
+        if merged and merged[-1][0] == room and start < merged[-1][2]:
+            merged[-1] = (room, merged[-1][1], max(end, merged[-1][2]), merged[-1][3])
+        else:
+            merged.append((room, start, end, owner))
+    return merged
+
+
+def save_assignments(assigned, origin):
+    from havano_hotel_management.havano_hotel_management_system.doctype.reservation.reservation import (
+        clear_reservation_rooms_cache,
+    )
+    from havano_hotel_management.havano_hotel_management_system.doctype.room.room import transition_status
+
+    for reservation, room in assigned.items():
+        frappe.db.set_value("Reservation", reservation, "room", room)
+        clear_reservation_rooms_cache(reservation)
+
+    # Guests arriving today hold their room now, as a reservation made for a room does at submit
+    arriving = frappe.get_all(
+        "Reservation",
+        filters={"name": ["in", list(assigned)], "check_in_date": ["<", add_days(origin, 1)]},
+        pluck="name",
+    )
+    for reservation in arriving:
+        transition_status("Room", assigned[reservation], "Reserved", holder=reservation, raise_exception=False)
@@ -0,0 +1,122 @@
+import frappe
+from frappe.utils import add_days, cint, date_diff, getdate, today
+
+from havano_hotel_management.instrumentation import instrument
+
+MAX_DAYS = 120
+
+# Run status codes; the legend is sent with every chart
+RESERVED, IN_HOUSE, CHECKED_OUT = 0, 1, 2
+STATUSES = ["Reserved", "In House", "Checked Out"]
+
+
+def get_chart_rooms(room_type=None, floor=None, rooms=None):
+    filters = {}
+    if room_type:
+        filters["room_type"] = room_type
+    if floor:
+        filters["floor"] = floor
+    if rooms:
+        filters["name"] = ["in", rooms]
+    return frappe.get_all(
+        "Room",
+        filters=filters,
+        fields=["name", "room_number", "room_type", "floor"],
+        order_by="floor, room_number, name",
+    )
+
+
+def get_chart_stays(rooms, start, end):
+    """Reservations and Check Ins in `rooms` overlapping [start, end), through the (room, check_in_date) indexes."""
+    params = {"rooms": tuple(rooms), "start": start, "end": end}
+    check_ins = frappe.db.sql(
+        """
+        SELECT name, room, guest_name AS guest, reservation,
+            DATE(check_in_date) AS check_in_date,
+            IFNULL(DATE(actual_checkout_date), check_out_date) AS check_out_date,
+            actual_checkout_date IS NOT NULL AS checked_out
+        FROM `tabCheck In`
+        WHERE room IN %(rooms)s AND docstatus = 1
+            AND check_in_date < %(end)s AND IFNULL(check_out_date, check_in_date) >= %(start)s
+    """,
+        params,
+        as_dict=True,
+    )
+    reservations = frappe.db.sql(
+        """
+        SELECT name, room, guest, DATE(check_in_date) AS check_in_date, check_out_date
+        FROM `tabReservation`
+        WHERE room IN %(rooms)s AND docstatus = 1 AND IFNULL(status, '') != 'No Show'
+            AND check_in_date < %(end)s AND IFNULL(check_out_date, check_in_date) >= %(start)s
+    """,
+        params,
+        as_dict=True,
+    )
+    return check_ins, reservations
+
+
+def encode_runs(check_ins, reservations, start, days):
+    """
+    room -> [start, length, status, doc, guest] runs, sorted by start.
+
+    `start` is the night's offset into the window and `guest` an index into
+    the returned guest list, so a guest booked many times is sent once. A
+    reservation that has been checked in is shown by its Check In.
+    """
+    guests, guest_index = [], {}
+    arrived = {check_in.reservation for check_in in check_ins if check_in.reservation}
+    stays = [(check_in, CHECKED_OUT if check_in.checked_out else IN_HOUSE) for check_in in check_ins]
+    stays += [(reservation, RESERVED) for reservation in reservations if reservation.name not in arrived]
+
+    runs = {}
+    for stay, status in stays:
+        first = date_diff(stay.check_in_date, start)
+        last = date_diff(stay.check_out_date, start) if stay.check_out_date else first + 1
+        first, last = max(first, 0), min(max(last, first + 1), days)
+        if first >= last:
+            continue
+
+        guest = stay.guest or ""
+        if guest not in guest_index:
+            guest_index[guest] = len(guests)
+            guests.append(guest)
+        runs.setdefault(stay.room, []).append([first, last - first, status, stay.name, guest_index[guest]])
+
+    for room_runs in runs.values():
+        room_runs.sort()
+    return runs, guests
+
+
+@frappe.whitelist()
+@instrument
+def get_tape_chart(from_date=None, days=30, room_type=None, floor=None, rooms=None):
+    """
+    The rooms x dates grid for the front desk, as run-length intervals.
+
+    Returns {"start", "days", "statuses", "guests", "rooms"} where each room
+    is [name, room_number, room_type, floor, runs] and each run is
+    [start, length, status, doc, guest] with `status` an index into
+    `statuses` and `guest` an index into `guests`.
+    """
+    frappe.has_permission("Room", "read", throw=True)
+    start = getdate(from_date or today())
+    days = min(max(cint(days), 1), MAX_DAYS)
+    if isinstance(rooms, str):
+        rooms = frappe.parse_json(rooms)
+
+    chart_rooms = get_chart_rooms(room_type, floor, rooms)
+    runs, guests = {}, []
+    if chart_rooms:
+        check_ins, reservations = get_chart_stays([room.name for room in chart_rooms], start, add_days(start, days))
+        runs, guests = encode_runs(check_ins, reservations, start, days)
+
+    return {
+        "start": start,
+        "days": days,
+        "statuses": STATUSES,
+        "guests": guests,
+        "rooms": [
+            [room.name, room.room_number, room.room_type, room.floor, runs.get(room.name, [])]
+            for room in chart_rooms
+        ],
+    }
@@ -0,0 +1,221 @@
+from bisect import bisect_left
+from datetime import timedelta
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, get_datetime, getdate, today
+
+from havano_hotel_management.instrumentation import instrument
+
+CACHE_KEY = "hotel_venue_schedule:{0}"
+TIMELINE_CACHE_KEY = "hotel_venue_timeline:{0}"
+# Backstop for changes that bypass the Booking hooks, such as direct database edits
+TIMELINE_CACHE_TTL = 6 * 3600
+
+
+class VenueSchedule:
+    """
+    A venue's bookings as [start, end) datetimes sorted by start.
+
+    `reach` holds the latest end among the bookings up to each index, so an
+    overlap search can stop walking back as soon as nothing earlier reaches
+    the slot, even when old bookings overlap each other.
+    """
+
+    def __init__(self, bookings=()):
+        bookings = sorted(bookings, key=lambda booking: booking[0])
+        self.starts = [booking[0] for booking in bookings]
+        self.ends = [booking[1] for booking in bookings]
+        self.names = [booking[2] for booking in bookings]
+        self.guests = [booking[3] for booking in bookings]
+        self.reach = []
+        for end in self.ends:
+            self.reach.append(max(end, self.reach[-1]) if self.reach else end)
+
+    def overlapping(self, start, end, exclude=None):
+        """Indexes of the bookings sharing any time with [start, end), in order of start."""
+        i = bisect_left(self.starts, end)
+        j = i
+        while j > 0 and self.reach[j - 1] > start:
+            j -= 1
+        return [k for k in range(j, i) if self.ends[k] > start and self.names[k] != exclude]
+
+    def free_slots(self, start, end, min_hours=0):
+        """The free [from, to) windows within [start, end) at least `min_hours` long."""
+        slots, cursor = [], start
+        for i in self.overlapping(start, end):
+            if self.starts[i] > cursor:
+                slots.append((cursor, self.starts[i]))
+            cursor = max(cursor, self.ends[i])
+        if cursor < end:
+            slots.append((cursor, end))
+        least = timedelta(hours=flt(min_hours))
+        return [(slot_start, slot_end) for slot_start, slot_end in slots if slot_end - slot_start >= least]
+
+
+def load_venue_bookings(venue):
+    """(start, end, name, guest) of the venue's active bookings, straight from the database."""
+    return frappe.db.sql(
+        """
+        SELECT TIMESTAMP(check_in_date, check_in_time), check_out_time, name, guest_name
+        FROM `tabBooking`
+        WHERE venue = %(venue)s AND docstatus = 1 AND status = 'Booked'
+            AND check_in_time IS NOT NULL AND check_out_time IS NOT NULL
+    """,
+        {"venue": venue},
+    )
+
+
+def get_venue_schedule(venue, cached=True):
+    """
+    The venue's active bookings as a VenueSchedule. The rows are cached per
+    venue for an hour, or until a Booking of the venue is submitted, updated
+    or cancelled.
+    """
+    bookings = frappe.cache().get_value(CACHE_KEY.format(venue)) if cached else None
+    if bookings is None:
+        bookings = [tuple(booking) for booking in load_venue_bookings(venue)]
+        if cached:
+            frappe.cache().set_value(CACHE_KEY.format(venue), bookings, expires_in_sec=3600)
+    return VenueSchedule(bookings)
+
+
+def clear_venue_schedule(venue):
+    if venue:
+        frappe.cache().delete_value(CACHE_KEY.format(venue))
+
+
+def get_booking_slot(check_in_date, check_in_time, check_out_time):
+    return get_datetime(f"{check_in_date} {check_in_time}"), get_datetime(check_out_time)
+
+
+@frappe.whitelist()
+@instrument
+def get_free_slots(venue, date, min_hours=0):
+    """The venue's free windows on `date`, as {"from", "to"} datetimes, from the cached schedule."""
+    frappe.has_permission("Booking", "read", throw=True)
+    start = get_datetime(getdate(date))
+    schedule = get_venue_schedule(venue)
+    return [
+        {"from": slot_start, "to": slot_end}
+        for slot_start, slot_end in schedule.free_slots(start, start + timedelta(days=1), min_hours)
+    ]
+
+
+def get_week_start(date):
+    date = getdate(date)
+    return date - timedelta(days=date.weekday())
+
+
+def get_bucket_occupancy(bookings, start, buckets, bucket_minutes):
+    """
+    venue -> busy minutes per bucket, in one pass over `bookings`.
+
+    `bookings` are (venue, start, end) datetimes; each adds its minutes to
+    the buckets it covers, clipped to the `buckets` x `bucket_minutes` window
+    from `start`.
+    """
+    occupancy = {}
+    bucket = timedelta(minutes=bucket_minutes)
+    window_end = start + bucket * buckets
+    for venue, booking_start, booking_end in bookings:
+        booking_start, booking_end = max(booking_start, start), min(booking_end, window_end)
+        if booking_start >= booking_end:
+            continue
+
+        minutes = occupancy.setdefault(venue, [0] * buckets)
+        first = int((booking_start - start) / bucket)
+        for i in range(first, buckets):
+            bucket_start = start + bucket * i
+            if bucket_start >= booking_end:
+                break
+            busy = min(booking_end, bucket_start + bucket) - max(booking_start, bucket_start)
+            minutes[i] += int(busy.total_seconds() // 60)
+    return occupancy
+
+
+def get_week_bookings(start, end):
+    return frappe.db.sql(
+        """
+        SELECT venue, name, guest_name, TIMESTAMP(check_in_date, check_in_time) AS starts, check_out_time AS ends
+        FROM `tabBooking`
+        WHERE docstatus = 1 AND IFNULL(venue, '') != ''
+            AND check_in_time IS NOT NULL AND check_out_time IS NOT NULL
+            AND check_in_date < %(end)s AND check_out_time > %(start)s
+        ORDER BY starts
+    """,
+        {"start": start, "end": end},
+        as_dict=True,
+    )
+
+
+def build_venue_timeline(start, bucket_minutes):
+    """venue -> {"occupancy": percent busy per bucket, "bookings": [[name, guest, starts, ends]]} for the week from `start`."""
+    buckets = 7 * 24 * 60 // bucket_minutes
+    bookings = get_week_bookings(start, start + timedelta(days=7))
+    occupancy = get_bucket_occupancy(
+        [(booking.venue, booking.starts, booking.ends) for booking in bookings], start, buckets, bucket_minutes
+    )
+
+    timeline = {
+        venue: {"occupancy": [min(cint(busy * 100 / bucket_minutes), 100) for busy in minutes], "bookings": []}
+        for venue, minutes in occupancy.items()
+    }
+    for booking in bookings:
+        if booking.venue in timeline:
+            timeline[booking.venue]["bookings"].append([booking.name, booking.guest_name, booking.starts, booking.ends])
+    return timeline
+
+
+def clear_venue_timeline(starts, ends):
+    """Drop the cached timelines of every week between `starts` and `ends`."""
+    week = get_week_start(starts)
+    while week <= getdate(ends):
+        frappe.cache().delete_value(TIMELINE_CACHE_KEY.format(week))
+        week += timedelta(days=7)
+
+
+@frappe.whitelist()
+@instrument
+def get_venue_timeline(week=None, bucket_minutes=60):
+    """
+    Every venue's occupancy over the week holding `week`, for banquet planning.
+
+    Returns {"start", "bucket_minutes", "buckets", "venues"} where each venue
+    is [name, venue_name, maximum_capacity, occupancy, bookings]: occupancy
+    gives the percent of each bucket that is booked and bookings lists
+    [name, guest, starts, ends]. Weeks are cached per bucket size for six
+    hours, or until a Booking in them is submitted, updated, cancelled or
+    checked out.
+    """
+    frappe.has_permission("Booking", "read", throw=True)
+    bucket_minutes = cint(bucket_minutes)
+    if bucket_minutes < 15 or (24 * 60) % bucket_minutes:
+        frappe.throw(_("Bucket size must divide a day into whole buckets of at least 15 minutes."))
+
+    start = get_datetime(get_week_start(week or today()))
+    key = TIMELINE_CACHE_KEY.format(start.date())
+    timeline = frappe.cache().hget(key, bucket_minutes)
+    if timeline is None:
+        timeline = build_venue_timeline(start, bucket_minutes)
+        frappe.cache().hset(key, bucket_minutes, timeline)
+        frappe.cache().expire(frappe.cache().make_key(key), TIMELINE_CACHE_TTL)
+
+    buckets = 7 * 24 * 60 // bucket_minutes
+    empty = {"occupancy": [0] * buckets, "bookings": []}
+    venues = frappe.get_all("Venue", fields=["name", "venue_name", "maximum_capacity"], order_by="venue_name, name")
+    return {
+        "start": start,
+        "bucket_minutes": bucket_minutes,
+        "buckets": buckets,
+        "venues": [
+            [
+                venue.name,
+                venue.venue_name,
+                venue.maximum_capacity,
+                timeline.get(venue.name, empty)["occupancy"],
+                timeline.get(venue.name, empty)["bookings"],
+            ]
+            for venue in venues
+        ],
+    }